@@ -8,10 +8,12 @@ import os
 from typing import TypeVar
 
 from dash import Dash
+from penn_chime.model.cache import warm_up
 from penn_chime.model.parameters import Parameters
 
 from chime_dash.app.config import from_object
 from chime_dash.app.pages.root import Root
+from chime_dash.app.services.downloads import add_download_route
 from chime_dash.app.utils.callbacks import wrap_callbacks
 
 DashAppInstance = TypeVar('DashAppInstance')
@@ -48,5 +50,9 @@ def create_app(context: str = 'prod') -> DashAppInstance:
     App.title = Env.CHIME_TITLE
     App.layout = body.html
     wrap_callbacks(App)
+    visualizations = body.components["index"].components["visualizations"]
+    add_download_route(App.server, visualizations.content)
+    # Before the worker serves its first request
+    body.components["index"].callbacks.warm(warm_up(os.environ))
 
     return Env, App
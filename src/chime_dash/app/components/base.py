@@ -93,7 +93,7 @@ class Page(Component):
 
     def __init__(self, language: str = "en", defaults: Parameters = None):
         super().__init__(language, defaults)
-        self.callbacks_cls(self)
+        self.callbacks = self.callbacks_cls(self)
 
 
 class HTMLComponentError(Exception):
@@ -13,6 +13,7 @@ from dash_html_components import Nav, Div
 
 from chime_dash.app.components.base import Page
 from chime_dash.app.services.callbacks import SidebarCallbacks
+from chime_dash.app.services.downloads import MAX_N_DAYS
 from chime_dash.app.utils import ReadOnlyDict
 from chime_dash.app.utils.templates import (
     create_switch_input,
@@ -91,7 +92,7 @@ _SIDEBAR_ELEMENTS = ReadOnlyDict(OrderedDict(
     ###
     line_break_3={"type": "linebreak"},
     display_parameters={"type": "header", "size": "h4"},
-    n_days={"type": "number", "min": 30, "step": 1},
+    n_days={"type": "number", "min": 30, "max": MAX_N_DAYS, "step": 1},
     current_date={
         "type": "date",
         "min_date_allowed": datetime(2019, 10, 1),
@@ -12,8 +12,9 @@ from chime_dash.app.utils import (
     prepare_visualization_group
 )
 from chime_dash.app.utils.callbacks import ChimeCallback, register_callbacks
-from penn_chime.model.sir import Sir
-from penn_chime.model.parameters import Parameters, Disposition
+from chime_dash.app.services.downloads import TABLES, encode_parameters, get_href
+from penn_chime.model.cache import get_cache
+from penn_chime.model.parameters import Parameters, Disposition, FrozenParameters
 
 
 class ComponentCallbacks:
@@ -30,14 +31,16 @@ class IndexCallbacks(ComponentCallbacks):
         return get_n_switch_values(not switch_value, 3)
 
     @staticmethod
-    def handle_model_change(i, sidebar_data):
+    def handle_model_change(i, sidebar_data, record=True):
         model = {}
         pars = None
+        token = None
         result = []
         viz_kwargs = {}
         if sidebar_data:
             pars = parameters_deserializer(sidebar_data["parameters"])
-            model = Sir(pars)
+            model = get_cache().model(pars, record)
+            token = encode_parameters(sidebar_data["parameters"])
             vis = i.components.get("visualizations", None) if i else None
             vis_content = vis.content if vis else None
 
@@ -48,10 +51,12 @@ class IndexCallbacks(ComponentCallbacks):
                 content=vis_content
             )
         result.extend(i.components["intro"].build(model, pars))
-        for df_key in ["admits_df", "census_df", "sim_sir_w_date_df"]:
+        for table, df_key in TABLES.items():
             df = None
             if model:
-                df = model.__dict__.get(df_key, None)
+                df = getattr(model, df_key, None)
+                # A short link: the tables are served on demand
+                viz_kwargs["href"] = get_href(token, table)
             result.extend(prepare_visualization_group(df, **viz_kwargs))
         return result
 
@@ -59,6 +64,31 @@ class IndexCallbacks(ComponentCallbacks):
         def handle_model_change_helper(sidebar_mod, sidebar_data):
             return IndexCallbacks.handle_model_change(component_instance, sidebar_data)
 
+        def handle_model_change_key(sidebar_mod, sidebar_data):
+            # Repeated parameters skip the model and the visualizations
+            if not sidebar_data:
+                return None
+            return parameters_deserializer(sidebar_data["parameters"]).freeze().digest
+
+        self.model_change = ChimeCallback(  # If the parameters or model change, update the text
+            changed_elements={"sidebar-store": "modified_timestamp"},
+            dom_updates={
+                "intro": "children",
+                "new_admissions_graph": "figure",
+                "new_admissions_table": "children",
+                "new_admissions_download": "href",
+                "admitted_patients_graph": "figure",
+                "admitted_patients_table": "children",
+                "admitted_patients_download": "href",
+                "SIR_graph": "figure",
+                "SIR_table": "children",
+                "SIR_download": "href",
+            },
+            callback_fn=handle_model_change_helper,
+            stores=["sidebar-store"],
+            memo_key=handle_model_change_key,
+        )
+
         super().__init__(
             component_instance=component_instance,
             callbacks=[
@@ -71,26 +101,19 @@ class IndexCallbacks(ComponentCallbacks):
                     },
                     callback_fn=IndexCallbacks.toggle_tables
                 ),
-                ChimeCallback(  # If the parameters or model change, update the text
-                    changed_elements={"sidebar-store": "modified_timestamp"},
-                    dom_updates={
-                        "intro": "children",
-                        "new_admissions_graph": "figure",
-                        "new_admissions_table": "children",
-                        "new_admissions_download": "href",
-                        "admitted_patients_graph": "figure",
-                        "admitted_patients_table": "children",
-                        "admitted_patients_download": "href",
-                        "SIR_graph": "figure",
-                        "SIR_table": "children",
-                        "SIR_download": "href",
-                    },
-                    callback_fn=handle_model_change_helper,
-                    stores=["sidebar-store"],
-                )
+                self.model_change,
             ]
         )
 
+    def warm(self, ps: List[FrozenParameters]):
+        """Render the visualizations of each of ps into the model change memo."""
+        def render(sidebar_mod, sidebar_data):
+            return IndexCallbacks.handle_model_change(self._component_instance, sidebar_data, record=False)
+
+        for p in ps:
+            sidebar_data = {"parameters": parameters_serializer(p.thaw())}
+            self.model_change.memo.warm(render, None, sidebar_data)
+
 
 class SidebarCallbacks(ComponentCallbacks):
 
@@ -158,6 +181,9 @@ class SidebarCallbacks(ComponentCallbacks):
                     dom_updates={"sidebar-store": "data"},
                     callback_fn=update_parameters_helper,
                     stores=["sidebar-store"],
+                    # The parameters carry today's current_date and
+                    # mitigation_date, which the form inputs don't key
+                    memoize=False,
                 )
             ]
         )
@@ -295,6 +321,8 @@ class RootCallbacks(ComponentCallbacks):
                     dom_states=sidebar.input_state_map,
                     callback_fn=stores_changed_helper,
                     stores=["root-store", "sidebar-store"],
+                    # Keyed by timestamps, so never repeated
+                    memoize=False,
                 ),
             ]
         )
@@ -0,0 +1,208 @@
+"""services/downloads
+
+Serves the tables of the cached projections as files, so callbacks return
+short links instead of inlining every table as a data URI.
+
+A link names its table and format, and carries the parameters of the
+projection compressed in its token, signed so that the route only projects
+parameters the app linked to: any worker with the same key can serve it,
+from the projection cache, without state of its own.
+
+Links are memoized with the callbacks that render them, so the key is
+shared as widely as their backend: DOWNLOAD_SECRET if set, which hosts
+behind one address need, else a key file beside a `shm` or `sqlite`
+CALLBACK_CACHE, else a key of the process.
+"""
+import hmac
+import os
+import secrets
+import zlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from hashlib import sha256
+from io import BytesIO
+from logging import getLogger
+from tempfile import mkstemp
+from typing import Dict, Iterator, Mapping, Optional
+
+from flask import Flask, Response, abort
+from pandas import DataFrame
+
+from chime_dash.app.utils import parameters_deserializer, prepare_download
+from chime_dash.app.utils.callbacks import get_callback_backend
+from penn_chime.model.cache import Backend, get_cache
+
+logger = getLogger(__name__)
+
+ROUTE = "/download"
+
+# Model frames by table, in the order of the visualizations
+TABLES = {
+    "admits": "admits_df",
+    "census": "census_df",
+    "sim_sir_w_date": "sim_sir_w_date_df",
+}
+
+# Media types by format; parquet and xlsx need pyarrow and openpyxl
+FORMATS = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+CHUNK_ROWS = 512
+
+# Bounds the parameters a token may inflate to, and the days it may project
+MAX_PARAMETERS_SIZE = 1 << 16
+MAX_N_DAYS = 1000
+
+# Bytes of HMAC-SHA256 a token keeps, and of a generated key
+SIGNATURE_SIZE = 16
+KEY_SIZE = 32
+
+KEY_FILE = "download.key"
+
+_secret: Optional[bytes] = None
+
+
+def read_key(path: str) -> bytes:
+    """The key in path, generated by whichever process gets there first."""
+    try:
+        with open(path, "rb") as fin:
+            return fin.read()
+    except FileNotFoundError:
+        pass
+    # Linked into place once written, so no process reads a partial key
+    fd, temporary = mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fout:
+            fout.write(secrets.token_bytes(KEY_SIZE))
+        os.link(temporary, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(temporary)
+    with open(path, "rb") as fin:
+        return fin.read()
+
+
+def load_secret(env: Mapping[str, str], backend: Backend) -> bytes:
+    """DOWNLOAD_SECRET, else the key shared beside backend, else a new key."""
+    secret = env.get("DOWNLOAD_SECRET")
+    if secret:
+        return secret.encode()
+    path = backend.shared_path(KEY_FILE)
+    if path is None:
+        logger.warning('DOWNLOAD_SECRET is not set: downloads are served by the process that linked them only')
+        return secrets.token_bytes(KEY_SIZE)
+    return read_key(path)
+
+
+def get_secret() -> bytes:
+    """The process-wide key, loaded from os.environ and the callback backend on first use."""
+    global _secret
+    if _secret is None:
+        _secret = load_secret(os.environ, get_callback_backend())
+    return _secret
+
+
+def sign(payload: str, secret: Optional[bytes] = None) -> str:
+    secret = get_secret() if secret is None else secret
+    digest = hmac.new(secret, payload.encode(), sha256).digest()[:SIGNATURE_SIZE]
+    return urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def encode_parameters(parameters: str, secret: Optional[bytes] = None) -> str:
+    """Signed token of serialized parameters (see parameters_serializer)."""
+    payload = urlsafe_b64encode(zlib.compress(parameters.encode(), 9)).decode().rstrip("=")
+    return f"{payload}.{sign(payload, secret)}"
+
+
+def decode_parameters(token: str, secret: Optional[bytes] = None) -> Optional[str]:
+    """Serialized parameters of token, or None for tokens that are not, or not signed by secret."""
+    payload, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(signature.encode(), sign(payload, secret).encode()):
+        return None
+    try:
+        data = urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        decompressor = zlib.decompressobj()
+        parameters = decompressor.decompress(data, MAX_PARAMETERS_SIZE)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            return None
+        return parameters.decode()
+    except (ValueError, zlib.error):
+        return None
+
+
+def get_href(token: str, table: str, fmt: str = "csv") -> str:
+    return f"{ROUTE}/{token}/{table}.{fmt}"
+
+
+def iter_csv(df: DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """The csv of df, chunk_rows rows at a time."""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=True, header=start == 0)
+
+
+def iter_gzip(chunks: Iterator[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def to_bytes(df: DataFrame, fmt: str) -> bytes:
+    """df as a parquet or xlsx file; raises ImportError without their engine."""
+    buffer = BytesIO()
+    if fmt == "parquet":
+        df.to_parquet(buffer)
+    else:
+        df.to_excel(buffer)
+    return buffer.getvalue()
+
+
+def download(token: str, filename: str, content: Dict[str, str] = None) -> Response:
+    """The table and format of filename of the projection of token."""
+    table, _, fmt = filename.partition(".")
+    if table not in TABLES or fmt not in FORMATS:
+        abort(404)
+    parameters = decode_parameters(token)
+    if parameters is None:
+        abort(404)
+    try:
+        pars = parameters_deserializer(parameters)
+    except (AssertionError, KeyError, TypeError, ValueError):
+        abort(404)
+    if pars.n_days > MAX_N_DAYS:
+        abort(400)
+
+    try:
+        model = get_cache().model(pars, record=False)
+    except (AssertionError, ValueError):
+        abort(400)
+    df = prepare_download(getattr(model, TABLES[table]), content)
+    headers = {
+        "Content-Disposition": f"attachment; filename={table}_{pars.current_date}.{fmt}",
+    }
+    if fmt == "csv":
+        body = iter_csv(df)
+    elif fmt == "csv.gz":
+        body = iter_gzip(iter_csv(df))
+    else:
+        try:
+            body = to_bytes(df, fmt)
+        except ImportError:
+            abort(501)
+    return Response(body, mimetype=FORMATS[fmt], headers=headers)
+
+
+def add_download_route(server: Flask, content: Dict[str, str] = None) -> None:
+    """Serve downloads on server, translated by the visualizations' content."""
+    get_secret()
+
+    def download_view(token, filename):
+        return download(token, filename, content)
+
+    server.add_url_rule(f"{ROUTE}/<token>/<filename>", "download", download_view)
@@ -12,15 +12,16 @@ from itertools import repeat
 from json import dumps, loads
 from collections import Mapping
 from datetime import date, datetime
-from typing import Any, List
+from typing import Any, Dict, List, Tuple
 from urllib.parse import quote
 
 from dateutil.parser import parse as parse_date
 from pandas import DataFrame
 
 from chime_dash.app.services.plotting import plot_dataframe
-from chime_dash.app.utils.templates import df_to_html_table
+from chime_dash.app.utils.templates import SKIPPED_TEXT, df_to_html_table
 
+from penn_chime.model.length_of_stay import KINDS
 from penn_chime.model.parameters import Parameters, Disposition
 from penn_chime.constants import DATE_FORMAT
 from penn_chime.view.charts import build_table
@@ -53,7 +54,14 @@ def _parameters_serializer_helper(obj):
 
 # todo handle versioning? we don"t currently persist Dash state, but we may. ¯\_(ツ)_/¯
 def parameters_serializer(p: Parameters):
-    return dumps(p, default=_parameters_serializer_helper, sort_keys=True)
+    values = dict(vars(p))
+    # Stays are tuples to json: keep their kind
+    kinds = {cls: kind for kind, cls in KINDS.items()}
+    values["lengths_of_stay"] = {
+        key: [kinds[type(stay)], *stay]
+        for key, stay in (p.lengths_of_stay or {}).items()
+    } or None
+    return dumps(values, default=_parameters_serializer_helper, sort_keys=True)
 
 
 def parameters_deserializer(p_json: str):
@@ -67,6 +75,14 @@ def parameters_deserializer(p_json: str):
             "mitigation_date",
         )
     }
+    other_dispositions = {
+        key: Disposition.create(days=days, rate=rate)
+        for key, (days, rate) in (values.get("other_dispositions") or {}).items()
+    }
+    lengths_of_stay = {
+        key: KINDS[kind](*stay)
+        for key, (kind, *stay) in (values.get("lengths_of_stay") or {}).items()
+    }
     return Parameters(
         current_date=dates["current_date"],
         current_hospitalized=values["current_hospitalized"],
@@ -93,6 +109,8 @@ def parameters_deserializer(p_json: str):
             days=values["ventilated"][0],
             rate=values["ventilated"][1],
         ),
+        other_dispositions=other_dispositions or None,
+        lengths_of_stay=lengths_of_stay or None,
     )
 
 
@@ -109,6 +127,36 @@ def get_n_switch_values(input_value, elements_to_update) -> List[bool]:
     return result
 
 
+# Rows of the tables, whatever the horizon; the downloads have every day
+TABLE_MAX_ROWS = 60
+
+
+def translate_dataframe(df: DataFrame, content: Dict[str, str] = None) -> Tuple[DataFrame, str, str]:
+    """Translates columns and index of df if content is specified.
+
+    Returns the translated data frame and its date and day columns.
+    """
+    date_column = "date"
+    day_column = "day"
+    if content:
+        columns = {col: content[col] for col in df.columns if col in content}
+        index = (
+            {df.index.name: content[df.index.name]}
+            if df.index.name and df.index.name in content
+            else None
+        )
+        df = df.rename(columns=columns, index=index)
+        date_column = content.get(date_column, date_column)
+        day_column = content.get(day_column, day_column)
+    return df, date_column, day_column
+
+
+def prepare_download(df: DataFrame, content: Dict[str, str] = None) -> DataFrame:
+    """The translated data frame, with lowercase column names, as downloaded."""
+    df, _, _ = translate_dataframe(df, content)
+    return df.rename(columns={col: col.lower() for col in df.columns})
+
+
 def prepare_visualization_group(df: DataFrame = None, **kwargs) -> List[Any]:
     """Creates plot, table and download link for data frame.
 
@@ -122,26 +170,19 @@ def prepare_visualization_group(df: DataFrame = None, **kwargs) -> List[Any]:
             Columns to display
         table_mod: int
             Displays only each `table_mod` row in table
+        table_max_rows: int
+            Displays at most this many rows, thinning long horizons
+        href: str
+            Link to download the data frame from, instead of inlining it
+            as a data URI
 
     """
     result = [{}, None, None]
     if df is not None and isinstance(df, DataFrame):
 
-        date_column = "date"
-        day_column = "day"
-
         # Translate column and index if specified
         content = kwargs.get("content", None)
-        if content:
-            columns = {col: content[col] for col in df.columns if col in content}
-            index = (
-                {df.index.name: content[df.index.name]}
-                if df.index.name and df.index.name in content
-                else None
-            )
-            df = df.rename(columns=columns, index=index)
-            date_column = content.get(date_column, date_column)
-            day_column = content.get(day_column, day_column)
+        df, date_column, day_column = translate_dataframe(df, content)
 
         plot_data = plot_dataframe(
             df.dropna().set_index(date_column).drop(columns=[day_column]),
@@ -162,15 +203,20 @@ def prepare_visualization_group(df: DataFrame = None, **kwargs) -> List[Any]:
                     float: int,
                     (date, datetime): lambda d: d.strftime(DATE_FORMAT),
                 },
+                date_format=DATE_FORMAT,
+                max_rows=kwargs.get("table_max_rows", TABLE_MAX_ROWS),
+                skipped_text=(content or {}).get("table-skipped-text", SKIPPED_TEXT),
             )
             # if kwargs.get("show_tables", None)
             # else None
         )
 
-        # Convert columnnames to lowercase
-        column_map = {col: col.lower() for col in df.columns}
-        csv = build_csv_download(df.rename(columns=column_map))
-        result = [plot_data, table, csv]
+        href = kwargs.get("href", None)
+        if href is None:
+            # Convert columnnames to lowercase
+            column_map = {col: col.lower() for col in df.columns}
+            href = build_csv_download(df.rename(columns=column_map))
+        result = [plot_data, table, href]
 
     return result
 
@@ -1,18 +1,118 @@
+import os
 from dash import Dash
 from dash.dependencies import Input, Output, State
 from collections.abc import Iterable, Mapping
-from typing import Callable, List
-from functools import lru_cache
+from datetime import date
+from hashlib import sha256
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+from penn_chime.constants import CHANGE_DATE, VERSION
+from penn_chime.model.cache import Backend, MemoryBackend, create_backend
+
+
+def canonical(value: Any) -> Any:
+    """A hashable key equal for equal callback arguments.
+
+    Mappings are compared by their sorted items, sequences by their items
+    and dates by their iso format, as they arrive from the browser.
+    """
+    if isinstance(value, Mapping):
+        return tuple(sorted((str(key), canonical(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(canonical(item) for item in value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class Memo:
+    """Results of a callback by its canonical arguments, with hit, miss and eviction counters.
+
+    Results are stored in backend, by default in this process only, under
+    VERSION, CHANGE_DATE, the callback's name and the digest of its key.
+    Calls raising, e.g. PreventUpdate, are not memoized.
+    """
+
+    def __init__(self, fn: Callable, key: Optional[Callable] = None, backend: Optional[Backend] = None) -> None:
+        self.fn = fn
+        self.key = key
+        self.backend = MemoryBackend() if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def digest(self, *args) -> str:
+        values = canonical(args if self.key is None else self.key(*args))
+        digest = sha256(repr(values).encode()).hexdigest()
+        return f"{VERSION}/{CHANGE_DATE.isoformat()}/{self.fn.__qualname__}/{digest}"
+
+    def __call__(self, *args):
+        key = self.digest(*args)
+        result = self.backend.get(key)
+        if result is not None:
+            with self.lock:
+                self.hits += 1
+            return result
+        result = self.fn(*args)
+        n_evicted = self.backend.set(key, result)
+        with self.lock:
+            self.misses += 1
+            self.evictions += n_evicted
+        return result
+
+    def warm(self, fn: Callable, *args) -> None:
+        """Store fn(*args) as the result of args, unless one is stored; counted as neither hit nor miss."""
+        key = self.digest(*args)
+        if self.backend.get(key) is None:
+            n_evicted = self.backend.set(key, fn(*args))
+            with self.lock:
+                self.evictions += n_evicted
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.backend),
+            "hit_rate": self.hits / calls if calls else 0.0,
+        }
+
+
+_backend: Optional[Backend] = None
+
+
+def get_callback_backend() -> Backend:
+    """The process-wide backend of memoized callbacks, configured from os.environ on first use.
+
+    CALLBACK_CACHE, CALLBACK_CACHE_SIZE and CALLBACK_CACHE_TTL are as for
+    PROJECTION_CACHE: with `shm` or `sqlite`, gunicorn workers share the
+    rendered figures and tables of each parameter set.
+    """
+    global _backend
+    if _backend is None:
+        _backend = create_backend(os.environ, "CALLBACK_CACHE", "chime_dash")
+    return _backend
 
 
 class ChimeCallback:
+    """A Dash callback, memoized by default.
+
+    memo_key maps the callback's arguments to those its result depends on,
+    e.g. leaving out a store's modified_timestamp; by default, all of them.
+    """
+
     def __init__(self,
                  changed_elements: Mapping,
                  callback_fn: Callable,
                  dom_updates: Mapping = None,
                  dom_states: Mapping = None,
                  stores: Iterable = None,
-                 memoize: bool = True
+                 memoize: bool = True,
+                 memo_key: Callable = None,
                  ):
         self.inputs = [
             Input(component_id=component_id, component_property=component_property)
@@ -22,6 +122,7 @@ class ChimeCallback:
         self.stores = []
         self.callback_fn = callback_fn
         self.memoize = memoize
+        self.memo = Memo(callback_fn, memo_key, get_callback_backend()) if memoize else None
         if dom_updates:
             self.outputs.extend(
                 Output(component_id=component_id, component_property=component_property)
@@ -41,16 +142,11 @@ class ChimeCallback:
 
     def wrap(self, app: Dash):
         print(f'Registering callback: \nOutputs: \n{self.outputs}, \nInputs:\n{self.inputs}, \nStore: \n{self.stores} \nUsing: {self.callback_fn}\n\n')
-        if self.memoize:
-            @lru_cache(maxsize=32)
-            @app.callback(self.outputs, self.inputs, self.stores)
-            def callback_wrapper(*args, **kwargs):
-                print(str(self.callback_fn))
-                return self.callback_fn(*args, **kwargs)
-        else:
-            @app.callback(self.outputs, self.inputs, self.stores)
-            def callback_wrapper(*args, **kwargs):
-                return self.callback_fn(*args, **kwargs)
+        fn = self.memo if self.memoize else self.callback_fn
+
+        @app.callback(self.outputs, self.inputs, self.stores)
+        def callback_wrapper(*args):
+            return fn(*args)
 
 
 __registered_callbacks: List[ChimeCallback] = []
@@ -64,3 +160,12 @@ def register_callbacks(callbacks: List[ChimeCallback]):
 def wrap_callbacks(app):
     for callback in __registered_callbacks:
         callback.wrap(app)
+
+
+def get_callback_stats() -> Dict[str, Dict[str, Any]]:
+    """Memo counters and hit rate of each memoized callback, by function name."""
+    return {
+        callback.callback_fn.__qualname__: callback.memo.stats
+        for callback in __registered_callbacks
+        if callback.memo is not None
+    }
@@ -4,16 +4,17 @@ templates themselves can be found in app/templates/en
 """
 import dash_daq as daq
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional
 
 from os import path
 
 from yaml import safe_load
 
-from numpy import mod
-from pandas import DataFrame
+from numpy import isfinite, mod
+from pandas import DataFrame, Series
+from pandas.api.types import is_datetime64_any_dtype, is_float_dtype
 
-from dash_html_components import Table, Thead, Tbody, Tr, Td, Th, H4, Hr
+from dash_html_components import Table, Thead, Tbody, Tfoot, Tr, Td, Th, H4, Hr
 from dash_core_components import DatePickerSingle
 from dash_bootstrap_components import FormGroup, Label, Input, Checklist
 
@@ -24,6 +25,8 @@ TEMPLATE_DIR = path.join(
     path.abspath(path.dirname(path.dirname(__file__))), "templates"
 )
 
+SKIPPED_TEXT = "{shown} of {total} rows shown: download the table for all of them"
+
 LABEL_STYLE = {"fontSize": "0.875rem", "marginBottom": "0.3333em"}
 
 HEADER_STYLE = {
@@ -89,9 +92,19 @@ def df_to_html_table(
     dataframe: DataFrame,
     data_only: bool = False,
     n_mod: Optional[int] = None,
-    formats: Optional[Dict[Any, str]] = None,
+    formats: Optional[Dict[Any, Callable]] = None,
+    date_format: Optional[str] = None,
+    max_rows: Optional[int] = None,
+    skipped_text: str = SKIPPED_TEXT,
 ) -> Table:
     """Converts pandas data frame to html table
+
+    Values are cast a column at a time: floats in bulk when cast to int,
+    datetime columns with `date_format` in one strftime, and anything else
+    by the first of `formats` it is an instance of. Tables longer than
+    `max_rows` keep every k-th row, so long horizons stay as small, and
+    say so in a footer: `skipped_text` formatted with the `shown` and
+    `total` rows.
     """
     formats = formats or {}
 
@@ -105,22 +118,42 @@ def df_to_html_table(
                     break
         return val
 
+    def cast_column(column: Series) -> List[Any]:
+        if is_datetime64_any_dtype(column) and date_format is not None:
+            return column.dt.strftime(date_format).tolist()
+        if is_float_dtype(column) and formats.get(float) is int:
+            values = column.to_numpy()
+            result = values.astype("object")
+            finite = isfinite(values)
+            result[finite] = values[finite].astype("int64").tolist()
+            return result.tolist()
+        return [cast_type(val) for val in column.tolist()]
+
     index_name = dataframe.index.name
     index_name = index_name or "#"
 
-    tmp = dataframe.copy()
+    tmp = dataframe
     if n_mod is not None:
-        tmp = tmp[mod(tmp.index, n_mod) == 0].copy()
+        tmp = tmp[mod(tmp.index, n_mod) == 0]
+    total = len(tmp)
+    if max_rows is not None and total > max_rows:
+        tmp = tmp.iloc[::-(-total // max_rows)]
 
+    index = cast_column(tmp.index.to_series())
+    columns = [cast_column(tmp.iloc[:, k]) for k in range(tmp.shape[1])]
     data = [
         Thead([Tr([Th(index_name)] + [Th(col) for col in tmp.columns])]),
         Tbody(
             [
-                Tr([Th(cast_type(idx))] + [Td(cast_type(col)) for col in row])
-                for idx, row in tmp.iterrows()
+                Tr([Th(idx)] + [Td(val) for val in row])
+                for idx, *row in zip(index, *columns)
             ]
         ),
     ]
+    if len(tmp) < total:
+        data.append(Tfoot([Tr([
+            Td(skipped_text.format(shown=len(tmp), total=total), colSpan=tmp.shape[1] + 1)
+        ])]))
     return data if data_only else Table(data)
 
 
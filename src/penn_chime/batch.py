@@ -0,0 +1,269 @@
+"""Batch projections.
+
+Projections of many hospitals or regions, one per row of a csv or jsonl
+file whose columns are the command line parameters, in one process:
+
+    penn_chime batch hospitals.csv --parameters defaults/cli.cfg \
+        --output projections --jobs 8
+
+Each row's tables are written to their own partition of the output
+directory, `<output>/id=<id>/`, and rows that cannot be projected are
+listed in `<output>/errors.csv`.
+
+With `--network`, rows are the hospitals of the region the --parameters
+file describes: they may only set market_share and dispositions, and the
+regional epidemic is simulated once for all of them (see Network).
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from argparse import ArgumentParser
+from itertools import islice
+from logging import INFO, basicConfig, getLogger
+from sys import stdout
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .model.cache import get_cache
+from .model.network import Hospital, Network
+from .model.parameters import ARGS, DISPOSITIONS, Parameters, to_cli, validator
+from .utils import map_chunks
+
+
+basicConfig(
+    level=INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    stream=stdout,
+)
+logger = getLogger(__name__)
+
+
+# Column validators by parameter name, as on the command line
+COLUMNS = {
+    name.replace("-", "_"): validator(to_cli(name), cast, min_value, max_value, required)
+    for name, cast, min_value, max_value, required in ARGS
+    if name != "parameters"
+}
+
+ID = "id"
+
+TABLES = ("sim_sir_w_date", "projected_admits", "projected_census")
+
+# Columns a hospital of a network may set
+HOSPITAL = ("market_share", *(
+    f"{key}_{field}"
+    for key in DISPOSITIONS
+    for field in ("days", "rate")
+))
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Rows of a csv file, or of a jsonl file (by extension), one at a time."""
+    with open(path, "r", newline="") as fin:
+        if path.endswith((".jsonl", ".json")):
+            for line in fin:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fin)
+
+
+def read_base(path: Optional[str]) -> Dict[str, Any]:
+    """Parameters from a defaults/*.cfg style file, that rows override."""
+    if path is None:
+        return {}
+    with open(path, "r") as fin:
+        a = Parameters.parser().parse_args(fin.read().split())
+    del a.parameters
+    return {key: value for key, value in vars(a).items() if value is not None}
+
+
+def parse_row(row: Dict[str, Any], base: Dict[str, Any]) -> Parameters:
+    """Parameters of one row, validated as on the command line.
+
+    Column names may use hyphens or underscores. Empty cells and nulls keep
+    the base value, so rows of a csv can leave out parameters of others.
+    """
+    values = dict(base)
+    for column, value in row.items():
+        name = column.strip().replace("-", "_")
+        if name == ID or value is None or str(value).strip() == "":
+            continue
+        if name not in COLUMNS:
+            raise ValueError(f"Unexpected parameter {column}")
+        values[name] = COLUMNS[name](str(value).strip())
+    return Parameters.from_args(values)
+
+
+def get_partition(output: str, key: str) -> str:
+    return os.path.join(output, f"{ID}={key.replace(os.sep, '_')}")
+
+
+def write_tables(output: str, key: str, m) -> None:
+    partition = get_partition(output, key)
+    os.makedirs(partition, exist_ok=True)
+    for df, name in zip((m.sim_sir_w_date_df, m.admits_df, m.census_df), TABLES):
+        df.to_csv(os.path.join(partition, f"{name}.csv"))
+
+
+def project_rows(
+    rows: List[Tuple[int, str, Dict[str, Any]]],
+    base: Dict[str, Any],
+    output: str,
+) -> Tuple[int, List[Tuple[int, str, str]]]:
+    """Write the tables of each (index, id, row) to its partition.
+
+    Returns the number of rows and the (index, id, error) of each failure.
+    """
+    cache = get_cache()
+    errors = []
+    for index, key, row in rows:
+        try:
+            m = cache.model(parse_row(row, base))
+        except (AssertionError, TypeError, ValueError) as e:
+            errors.append((index, key, str(e)))
+            continue
+        write_tables(output, key, m)
+    return len(rows), errors
+
+
+def batch(
+    path: str,
+    output: str,
+    base: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 16,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """Project every row of path into partitions of output; return the failures.
+
+    Rows are read and projected chunk_size at a time over n_jobs processes,
+    so memory does not depend on the number of rows. A row's id column, or
+    else its index, names its partition; rows repeating an id fail. The
+    failures, with their index, id and error, are also written to
+    `<output>/errors.csv`.
+    """
+    base = {} if base is None else base
+    os.makedirs(output, exist_ok=True)
+    errors: List[Tuple[int, str, str]] = []
+
+    def get_chunks() -> Iterator[tuple]:
+        rows = get_keyed_rows(path, errors)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk, base, output
+
+    n_rows = 0
+    for n, chunk_errors in map_chunks(project_rows, get_chunks(), n_jobs):
+        errors.extend(chunk_errors)
+        n_rows += n
+        logger.info('Projected %s rows', n_rows)
+
+    return write_errors(output, errors)
+
+
+def get_keyed_rows(path: str, errors: List[Tuple[int, str, str]]) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    """(index, id, row) of each row of path; rows repeating an id go to errors."""
+    keys = set()
+    for index, row in enumerate(read_rows(path)):
+        key = row.get(ID)
+        key = str(index) if key is None or str(key).strip() == "" else str(key).strip()
+        if key in keys:
+            errors.append((index, key, f"Duplicate {ID} {key}"))
+            continue
+        keys.add(key)
+        yield index, key, row
+
+
+def write_errors(output: str, errors: List[Tuple[int, str, str]]) -> pd.DataFrame:
+    errors.sort()
+    df = pd.DataFrame(errors, columns=["row", ID, "error"])
+    df.to_csv(os.path.join(output, "errors.csv"), index=False)
+    if errors:
+        logger.warning('%s rows failed, see %s', len(errors), os.path.join(output, "errors.csv"))
+    return df
+
+
+def write_models(models: Dict[str, Any], output: str) -> int:
+    """Write the tables of each model to its partition; returns their number."""
+    for key, m in models.items():
+        write_tables(output, key, m)
+    return len(models)
+
+
+def network(
+    path: str,
+    output: str,
+    base: Dict[str, Any],
+    chunk_size: int = 16,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """Project the hospitals in the rows of path on the one regional epidemic of base.
+
+    Rows may only set the HOSPITAL columns; rows setting any other column,
+    or failing validation, fail. The epidemic is simulated once, then the
+    tables of chunk_size hospitals at a time are written over n_jobs
+    processes. Partitions and errors are as for batch.
+    """
+    os.makedirs(output, exist_ok=True)
+    region = Parameters.from_args(base)
+    errors: List[Tuple[int, str, str]] = []
+    hospitals = {}
+    for index, key, row in get_keyed_rows(path, errors):
+        try:
+            for column, value in row.items():
+                name = column.strip().replace("-", "_")
+                if name not in (ID, *HOSPITAL) and value is not None and str(value).strip() != "":
+                    raise ValueError(f"{column} is shared by the region")
+            hospitals[key] = Hospital.from_parameters(parse_row(row, base))
+        except (AssertionError, TypeError, ValueError) as e:
+            errors.append((index, key, str(e)))
+
+    net = Network(region, hospitals)
+
+    def get_chunks() -> Iterator[tuple]:
+        names = iter(net.names)
+        while True:
+            chunk = list(islice(names, chunk_size))
+            if not chunk:
+                return
+            yield net.models(chunk), output
+
+    n_hospitals = 0
+    for n in map_chunks(write_models, get_chunks(), n_jobs):
+        n_hospitals += n
+        logger.info('Projected %s hospitals', n_hospitals)
+    return write_errors(output, errors)
+
+
+def parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="penn_chime batch",
+        description="Project every row of a csv or jsonl file of parameters.",
+    )
+    parser.add_argument("rows", help="csv or jsonl file, with a column per parameter")
+    parser.add_argument("--parameters", help="Parameters file with defaults for every row")
+    parser.add_argument("--output", default="batch", help="Output directory")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Rows per task")
+    parser.add_argument(
+        "--network",
+        action="store_true",
+        help="Rows are hospitals sharing the epidemic of the --parameters region",
+    )
+    return parser
+
+
+def run(argv: List[str]) -> None:
+    """Batch from command line arguments, after `batch`."""
+    a = parser().parse_args(argv)
+    base = read_base(a.parameters or os.environ.get("PARAMETERS"))
+    if a.network:
+        network(a.rows, a.output, base, chunk_size=a.chunk_size, n_jobs=a.jobs)
+        return
+    batch(a.rows, a.output, base, chunk_size=a.chunk_size, n_jobs=a.jobs)
@@ -3,12 +3,20 @@
 import os
 import sys
 
+from .model.cache import get_cache
 from .model.parameters import Parameters
-from .model.sir import Sir
+from . import batch, sweep
 
 def run(argv):
+    if argv[1:2] == ["sweep"]:
+        sweep.run(argv[2:])
+        return
+    if argv[1:2] == ["batch"]:
+        batch.run(argv[2:])
+        return
+
     p = Parameters.create(os.environ, argv[1:])
-    m = Sir(p)
+    m = get_cache().model(p)
 
     for df, name in (
         (m.sim_sir_w_date_df, "sim_sir_w_date"),
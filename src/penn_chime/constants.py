@@ -15,5 +15,8 @@ DOCS_URL = "https://code-for-philly.gitbook.io/chime"
 
 EPSILON = 1.0e-7
 
+# Dispositions every Parameters has; any others are other_dispositions
+DISPOSITIONS = ("hospitalized", "icu", "ventilated")
+
 FLOAT_INPUT_MIN = 0.0001
 FLOAT_INPUT_STEP = 0.1
@@ -0,0 +1,498 @@
+"""Projection cache.
+
+Projections are pure functions of their parameters, so each one is computed
+once and then shared by the CLI, the Streamlit app and the Dash app.
+
+Entries are keyed by VERSION, CHANGE_DATE and the digest of the parameters
+of their first stage: releasing a model change invalidates every older
+entry. An entry serves any parameters sharing that stage, running only the
+stages that changed, at any n_days its fit holds for.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import pickle
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from contextlib import closing
+from logging import INFO, basicConfig, getLogger
+from sys import stdout
+from tempfile import gettempdir, mkstemp
+from threading import Lock
+from time import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+from ..constants import CHANGE_DATE, VERSION
+from .parameters import FrozenParameters, Parameters
+from .projection import Projection
+from .sir import Sir, get_digests, project, resize, restage
+
+
+basicConfig(
+    level=INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    stream=stdout,
+)
+logger = getLogger(__name__)
+
+
+DEFAULT_MAX_SIZE = 128
+
+# Distinct parameters whose requests are counted, and replayed at warm up
+MAX_REQUESTS = 1024
+DEFAULT_REPLAY = 16
+
+
+def dumps(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data: bytes) -> Any:
+    return pickle.loads(data)
+
+
+class Backend(ABC):
+    """Storage for at most max_size projections, least recently used first out.
+
+    Entries older than ttl seconds, if given, are dropped when next read.
+    Any picklable value may be stored, e.g. the Dash app's rendered figures.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def expired(self, created: float) -> bool:
+        return self.ttl is not None and time() - created > self.ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """The value stored under key, marked as most recently used."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> int:
+        """Store value under key; return how many entries were evicted."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def shared_path(self, name: str) -> Optional[str]:
+        """A file named name beside the entries, for every process sharing them.
+
+        None when the entries are this process's own.
+        """
+        return None
+
+
+class MemoryBackend(Backend):
+    """Projections kept as objects in this process.
+
+    Hits return the stored projection itself rather than a copy; the
+    ProjectionCache freezes projections (see Projection.freeze), so writes to
+    their arrays raise rather than change later hits.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: Optional[float] = None) -> None:
+        super().__init__(max_size, ttl)
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self.expired(created):
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time(), value)
+            self.entries.move_to_end(key)
+            n_evicted = 0
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                n_evicted += 1
+            return n_evicted
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteBackend(Backend):
+    """Pickled projections in an SQLite database, shared by every process using path."""
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SIZE, ttl: Optional[float] = None) -> None:
+        super().__init__(max_size, ttl)
+        self.path = path
+        with self.connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS projections ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " used REAL NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30.0)
+
+    def shared_path(self, name):
+        return f"{self.path}.{name}"
+
+    def get(self, key):
+        with closing(self.connect()) as connection, connection as db:
+            row = db.execute(
+                "SELECT value, created FROM projections WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.expired(row[1]):
+                db.execute("DELETE FROM projections WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE projections SET used = ? WHERE key = ?", (time(), key))
+        return loads(row[0])
+
+    def set(self, key, value):
+        data = dumps(value)
+        now = time()
+        with closing(self.connect()) as connection, connection as db:
+            db.execute(
+                "INSERT OR REPLACE INTO projections (key, value, used, created) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(data), now, now),
+            )
+            return db.execute(
+                "DELETE FROM projections WHERE key IN ("
+                " SELECT key FROM projections ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            ).rowcount
+
+    def __len__(self):
+        with closing(self.connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM projections").fetchone()[0]
+
+
+class SharedMemoryBackend(Backend):
+    """Pickled projections as files on a memory-backed file system.
+
+    One file per entry under directory, /dev/shm/penn_chime by default, so
+    every process on the host shares the entries without a server. Writes
+    are atomic renames and recency is the file's modification time; the
+    time an entry was written is pickled with it.
+    (multiprocessing.shared_memory needs python 3.8 and a shared index.)
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: Optional[float] = None,
+        name: str = "penn_chime",
+    ) -> None:
+        super().__init__(max_size, ttl)
+        if directory is None:
+            root = "/dev/shm" if os.path.isdir("/dev/shm") else gettempdir()
+            directory = os.path.join(root, name)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace("/", "-") + ".pickle")
+
+    def shared_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fin:
+                data = fin.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        created, value = loads(data)
+        if self.expired(created):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return value
+
+    def set(self, key, value):
+        fd, temporary = mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fout:
+            fout.write(dumps((time(), value)))
+        os.replace(temporary, self.path(key))
+
+        entries = self.entries()
+        n_evicted = 0
+        for path in sorted(entries, key=entries.get)[:max(len(entries) - self.max_size, 0)]:
+            try:
+                os.remove(path)
+                n_evicted += 1
+            except FileNotFoundError:
+                pass
+        return n_evicted
+
+    def entries(self) -> Dict[str, float]:
+        """Modification time of each entry, by path."""
+        result = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pickle"):
+                try:
+                    result[entry.path] = entry.stat().st_mtime
+                except FileNotFoundError:
+                    pass
+        return result
+
+    def __len__(self):
+        return len(self.entries())
+
+
+def create_backend(env: Mapping[str, str], prefix: str, name: str = "penn_chime") -> Backend:
+    """The backend configured by the <prefix>, <prefix>_SIZE and <prefix>_TTL variables.
+
+    See ProjectionCache.create; name is the default file of `sqlite` and
+    directory of `shm`.
+    """
+    spec = env.get(prefix, "memory")
+    max_size = int(env.get(f"{prefix}_SIZE", DEFAULT_MAX_SIZE))
+    ttl = float(env[f"{prefix}_TTL"]) if env.get(f"{prefix}_TTL") else None
+    kind, _, location = spec.partition(":")
+
+    if kind == "memory":
+        backend: Backend = MemoryBackend(max_size, ttl)
+    elif kind == "sqlite":
+        backend = SQLiteBackend(location or os.path.join(gettempdir(), f"{name}.sqlite"), max_size, ttl)
+    elif kind == "shm":
+        backend = SharedMemoryBackend(location or None, max_size, ttl, name)
+    else:
+        raise ValueError(f"Unknown {prefix}: {spec}")
+
+    logger.info('Using %s: %s; size: %s; ttl: %s', prefix, spec, max_size, ttl)
+    return backend
+
+
+class ProjectionCache:
+    """Projections by parameters, with hit, miss and eviction counters.
+
+    `requests` counts how often each parameters were asked for, so the next
+    run can warm the cache with the most popular ones (see warm_up).
+    """
+
+    def __init__(self, backend: Optional[Backend] = None) -> None:
+        self.backend = MemoryBackend() if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.requests: Counter = Counter()
+        self.created = time()
+        self.lock = Lock()
+
+    @classmethod
+    def create(cls, env: Mapping[str, str]) -> ProjectionCache:
+        """Configure from the environment.
+
+        PROJECTION_CACHE is `memory` (the default), `sqlite:<path>`,
+        `shm` or `shm:<directory>`; PROJECTION_CACHE_SIZE bounds the
+        number of entries and PROJECTION_CACHE_TTL their age in seconds.
+        Gunicorn workers share `sqlite` and `shm` caches, so a projection
+        is computed once per node.
+        """
+        return cls(create_backend(env, "PROJECTION_CACHE"))
+
+    @staticmethod
+    def key(p: FrozenParameters, n_days: Optional[int] = None) -> str:
+        """Key of the projections sharing the sir stage of p; at n_days only, if given."""
+        key = f"{VERSION}/{CHANGE_DATE.isoformat()}/{get_digests(p)['sir']}"
+        return key if n_days is None else f"{key}/{n_days}"
+
+    def get(self, p: Union[Parameters, FrozenParameters], record: bool = True) -> Projection:
+        """The projection of p, computed only if it is not cached.
+
+        Projections are cached by the parameters of their sir stage, so a
+        projection of p differing only in later stages is restaged, running
+        just those (see sir.STAGES), and one at another horizon is resized
+        to p.n_days when its fit holds there. Projections whose fit only
+        holds for their own n_days are cached by it too.
+
+        Requests are counted, unless record is False, e.g. when warming up.
+        """
+        if isinstance(p, Parameters):
+            p = p.freeze()
+        if record:
+            self.record(p)
+        keys = (self.key(p), self.key(p, p.n_days))
+
+        entries = []
+        for key in keys:
+            entry = self.backend.get(key)
+            entries.append(entry)
+            if entry is None:
+                continue
+            restaged = restage(entry, p).freeze()
+            projection = resize(restaged, p)
+            if projection is None:
+                continue
+            projection.freeze()
+            # Kept at the longest horizon, with the latest later stages
+            longest = projection if projection.day.shape[0] > restaged.day.shape[0] else restaged
+            n_evicted = 0 if longest is entry else self.backend.set(key, longest)
+            with self.lock:
+                self.hits += 1
+                self.evictions += n_evicted
+            return projection
+
+        projection = project(p).freeze()
+        summary = projection.summary
+        resizable = summary["min_n_days"] < summary["max_n_days"]
+        key = keys[0] if resizable and entries[0] is None else keys[1]
+        n_evicted = self.backend.set(key, projection)
+        with self.lock:
+            self.misses += 1
+            self.evictions += n_evicted
+        return projection
+
+    def model(self, p: Union[Parameters, FrozenParameters], record: bool = True) -> Sir:
+        """A model of p, built from the cached projection."""
+        return Sir.from_projection(self.get(p, record), p)
+
+    def record(self, p: FrozenParameters) -> None:
+        with self.lock:
+            self.requests[p] += 1
+            if len(self.requests) > MAX_REQUESTS:
+                self.requests = Counter(dict(self.requests.most_common(MAX_REQUESTS // 2)))
+
+    def save_requests(self, path: str) -> None:
+        """Write the request counts to path, adding those other processes of this run wrote.
+
+        Counts in path written before this cache was created are a previous
+        run's, and are replaced.
+        """
+        with self.lock:
+            requests = Counter(self.requests)
+        try:
+            if os.path.getmtime(path) >= self.created:
+                requests.update(load_requests(path))
+        except OSError:
+            pass
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary = mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fout:
+            fout.write(dumps(requests.most_common(MAX_REQUESTS)))
+        os.replace(temporary, path)
+
+    def warm(self, ps: Iterable[Union[Parameters, FrozenParameters]]) -> List[FrozenParameters]:
+        """Project each of ps into the cache, without counting them as requests.
+
+        Returns the parameters projected; invalid ones are logged and skipped.
+        """
+        warmed = []
+        for p in ps:
+            try:
+                p = p.freeze() if isinstance(p, Parameters) else p
+                self.get(p, record=False)
+            except (AssertionError, TypeError, ValueError) as e:
+                logger.warning('Not warming %s: %s', p, e)
+                continue
+            warmed.append(p)
+        return warmed
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.backend),
+        }
+
+
+_cache: Optional[ProjectionCache] = None
+
+
+def get_cache() -> ProjectionCache:
+    """The process-wide cache, configured from os.environ on first use."""
+    global _cache
+    if _cache is None:
+        _cache = ProjectionCache.create(os.environ)
+    return _cache
+
+
+def load_requests(path: str) -> Counter:
+    """Request counts by parameters, as written by ProjectionCache.save_requests.
+
+    Missing or unreadable files, e.g. of another version, count nothing.
+    """
+    try:
+        with open(path, "rb") as fin:
+            return Counter(dict(loads(fin.read())))
+    except FileNotFoundError:
+        return Counter()
+    except (AttributeError, EOFError, ImportError, TypeError, ValueError, pickle.UnpicklingError) as e:
+        logger.warning('Ignoring requests in %s: %s', path, e)
+        return Counter()
+
+
+_warmed: Optional[List[FrozenParameters]] = None
+
+
+def get_served(p: Union[Parameters, FrozenParameters]) -> FrozenParameters:
+    """The parameters the apps project for p: its doubling time, if any, wins.
+
+    Parameters files such as defaults/webapp.cfg set both a doubling time
+    and a date_first_hospitalized for the apps to start from, but the apps
+    project one or the other, and Sir takes only one.
+    """
+    frozen = p.freeze()
+    if frozen.doubling_time is not None and frozen.date_first_hospitalized is not None:
+        return frozen.replace(date_first_hospitalized=None)
+    return frozen
+
+
+def warm_up(env: Mapping[str, str]) -> List[FrozenParameters]:
+    """Warm the process-wide cache, once per process; return the parameters warmed.
+
+    Projects the default parameters, Parameters.create(env, []), those of
+    each file in WARM_PARAMETERS (separated by os.pathsep), both as the
+    apps serve them (see get_served), and, when
+    REQUEST_LOG names a file, the WARM_REPLAY (16) parameters most
+    requested in the previous run, as recorded there: this run's requests
+    are written to it at exit.
+    """
+    global _warmed
+    if _warmed is not None:
+        return _warmed
+    cache = get_cache()
+
+    ps: List[Union[Parameters, FrozenParameters]] = []
+    for argv in ([], *(
+        ["--parameters", path]
+        for path in env.get("WARM_PARAMETERS", "").split(os.pathsep)
+        if path
+    )):
+        try:
+            ps.append(get_served(Parameters.create(env, argv)))
+        except (AssertionError, OSError, TypeError, ValueError) as e:
+            logger.warning('Not warming %s: %s', argv or "the defaults", e)
+
+    path = env.get("REQUEST_LOG")
+    if path:
+        n = int(env.get("WARM_REPLAY", DEFAULT_REPLAY))
+        ps.extend(p for p, _ in load_requests(path).most_common(n))
+        atexit.register(cache.save_requests, path)
+
+    start = time()
+    warmed = list(dict.fromkeys(cache.warm(ps)))
+    logger.info('Warmed %s parameters in %.2fs', len(warmed), time() - start)
+    _warmed = warmed
+    return warmed
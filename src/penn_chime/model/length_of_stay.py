@@ -0,0 +1,161 @@
+"""Length of stay.
+
+Distributions of the number of days patients of a disposition stay, in
+place of its average `days`.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from functools import lru_cache
+from math import erf, exp, floor, lgamma, log, sqrt
+from typing import Any, Union
+
+import numpy as np
+
+
+# Days past which the tail of a gamma or lognormal stay is dropped
+TAIL = 1e-4
+MAX_DAYS = 365
+
+
+class LengthOfStay(ABC):
+    """Probabilities of staying 1, 2, ... days; see `get_pmf`.
+
+    Distributions are named tuples of their parameters, but only equal to
+    distributions of the same kind.
+    """
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self).__name__, tuple(self)))
+
+    @abstractmethod
+    def cdf(self, days: float) -> float:
+        """Probability of staying at most days days."""
+
+
+_Histogram = namedtuple("_Histogram", ("weights",))
+
+
+class Histogram(LengthOfStay, _Histogram):
+    """Empirical stays: weights[k] is how often patients stayed k + 1 days."""
+
+    __slots__ = ()
+
+    def __new__(cls, weights):
+        return super().__new__(cls, tuple(float(weight) for weight in weights))
+
+    def cdf(self, days: float) -> float:
+        return sum(self.weights[:max(floor(days), 0)]) / sum(self.weights)
+
+
+_Gamma = namedtuple("_Gamma", ("mean", "sd"))
+
+
+class Gamma(LengthOfStay, _Gamma):
+    """Gamma distributed stays, by their mean and standard deviation in days."""
+
+    __slots__ = ()
+
+    def cdf(self, days: float) -> float:
+        shape = (self.mean / self.sd) ** 2
+        scale = self.sd ** 2 / self.mean
+        return gammainc(shape, days / scale)
+
+
+_LogNormal = namedtuple("_LogNormal", ("mean", "sd"))
+
+
+class LogNormal(LengthOfStay, _LogNormal):
+    """Lognormal stays, by their mean and standard deviation in days."""
+
+    __slots__ = ()
+
+    def cdf(self, days: float) -> float:
+        if days <= 0.0:
+            return 0.0
+        sigma2 = log(1.0 + (self.sd / self.mean) ** 2)
+        mu = log(self.mean) - sigma2 / 2.0
+        return 0.5 * (1.0 + erf((log(days) - mu) / sqrt(2.0 * sigma2)))
+
+
+KINDS = {
+    "histogram": Histogram,
+    "gamma": Gamma,
+    "lognormal": LogNormal,
+}
+
+
+@lru_cache(maxsize=256)
+def get_pmf(stay: LengthOfStay) -> np.ndarray:
+    """Probability of staying 1, 2, ..., max days: read only, summing to 1.
+
+    Continuous stays are rounded to the nearest day, of at least one, and
+    cut off where fewer than TAIL of them would stay longer, or at MAX_DAYS.
+    """
+    if isinstance(stay, Histogram):
+        pmf = np.array(stay.weights, dtype="float")
+    else:
+        cdf = [stay.cdf(1.5)]
+        while cdf[-1] < 1.0 - TAIL and len(cdf) < MAX_DAYS:
+            cdf.append(stay.cdf(len(cdf) + 1.5))
+        pmf = np.diff(np.array(cdf), prepend=0.0)
+    pmf = np.trim_zeros(pmf, "b")
+    pmf /= pmf.sum()
+    pmf.setflags(write=False)
+    return pmf
+
+
+def get_max_los(los: Union[LengthOfStay, Any]) -> int:
+    """Longest stay of a distribution, or of an array of whole days."""
+    if isinstance(los, LengthOfStay):
+        return get_pmf(los).shape[0]
+    return int(np.max(los))
+
+
+def gammainc(a: float, x: float) -> float:
+    """Regularized lower incomplete gamma function P(a, x).
+
+    By its series below a + 1 and its continued fraction above, as in
+    Numerical Recipes 6.2.
+    """
+    if x <= 0.0:
+        return 0.0
+    scale = exp(-x + a * log(x) - lgamma(a))
+    if x < a + 1.0:
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1.0
+            term *= x / n
+            total += term
+        return total * scale
+
+    tiny = 1e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    i = 0
+    while True:
+        i += 1
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            return 1.0 - scale * h
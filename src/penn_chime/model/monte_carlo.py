@@ -0,0 +1,462 @@
+"""Monte Carlo.
+
+Uncertainty bands from projections of sampled parameters.
+
+Changes affecting results or their presentation should also update
+constants.py `CHANGE_DATE`.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from logging import INFO, basicConfig, getLogger
+from sys import stdout
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ..constants import EPSILON
+from ..utils import map_chunks
+from .length_of_stay import LengthOfStay, get_max_los
+from .parameters import DISPOSITIONS, Parameters
+from .quantiles import DEFAULT_COMPRESSION, Digest
+from .sir import (
+    calculate_replicates,
+    get_admits,
+    get_beta,
+    get_census,
+    get_ever,
+    get_growth_rate,
+    get_loss,
+    sim_sir_batch,
+)
+
+
+basicConfig(
+    level=INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    stream=stdout,
+)
+logger = getLogger(__name__)
+
+
+# Parameters that can be sampled, named as their command line arguments;
+# so can the <disposition>_rate and _days of any other disposition
+SAMPLED = (
+    "doubling_time",
+    "market_share",
+    "relative_contact_rate",
+    *(f"{key}_rate" for key in DISPOSITIONS),
+    *(f"{key}_days" for key in DISPOSITIONS),
+)
+
+PERCENTILES = (5.0, 25.0, 50.0, 75.0, 95.0)
+
+
+class Distribution(ABC):
+    """Values of one parameter across replicates."""
+
+    @abstractmethod
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        pass
+
+
+class Fixed(Distribution):
+
+    def __init__(self, value: float) -> None:
+        self.value = value
+
+    def sample(self, rng, n):
+        return np.full(n, self.value, dtype="float")
+
+
+class Uniform(Distribution):
+
+    def __init__(self, low: float, high: float) -> None:
+        self.low = low
+        self.high = high
+
+    def sample(self, rng, n):
+        return rng.uniform(self.low, self.high, n)
+
+
+class Triangular(Distribution):
+
+    def __init__(self, low: float, mode: float, high: float) -> None:
+        self.low = low
+        self.mode = mode
+        self.high = high
+
+    def sample(self, rng, n):
+        return rng.triangular(self.low, self.mode, self.high, n)
+
+
+class Normal(Distribution):
+
+    def __init__(self, mean: float, sd: float) -> None:
+        self.mean = mean
+        self.sd = sd
+
+    def sample(self, rng, n):
+        return rng.normal(self.mean, self.sd, n)
+
+
+def get_values(p: Parameters) -> Dict[str, float]:
+    """The point values of SAMPLED, and of any other disposition, in p."""
+    values = {
+        "doubling_time": p.doubling_time,
+        "market_share": p.market_share,
+        "relative_contact_rate": p.relative_contact_rate,
+    }
+    for key, disposition in p.dispositions.items():
+        values[f"{key}_rate"] = disposition.rate
+        values[f"{key}_days"] = disposition.days
+    return values
+
+
+def sample(
+    p: Parameters,
+    distributions: Dict[str, Distribution],
+    n_replicates: int,
+    seed: Union[None, int, np.random.SeedSequence] = None,
+) -> Dict[str, np.ndarray]:
+    """Draw n_replicates values of every SAMPLED parameter.
+
+    Parameters without a distribution keep their value in p. Draws are
+    clipped into each parameter's valid range, and lengths of stay are
+    rounded to whole days.
+    """
+    point_values = get_values(p)
+    for key in distributions:
+        if key not in point_values:
+            raise ValueError(f"Cannot sample parameter {key}")
+
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for key, value in point_values.items():
+        distribution = distributions.get(key, Fixed(value))
+        if value is None and key not in distributions:
+            raise ValueError(f"A distribution or a value is required for {key}")
+        values = distribution.sample(rng, n_replicates)
+
+        if key.endswith("_days"):
+            values = np.maximum(np.rint(values), 1).astype("int")
+        elif key == "doubling_time":
+            values = np.maximum(values, EPSILON)
+        elif key in ("market_share", "hospitalized_rate"):
+            # Both divide the seed of infections
+            values = np.clip(values, EPSILON, 1.0)
+        else:
+            values = np.clip(values, 0.0, 1.0)
+        samples[key] = values
+    return samples
+
+
+class Bands:
+    """Per-day percentiles of each census_* and admits_* series.
+
+    Days run from the present (day 0) to n_days, the part of the projection
+    that is shared by every replicate whatever its i_day.
+    """
+
+    def __init__(
+        self,
+        day: np.ndarray,
+        date: np.ndarray,
+        percentiles: Sequence[float],
+        values: Dict[str, np.ndarray],
+        n_replicates: int,
+    ) -> None:
+        self.day = day
+        self.date = date
+        self.percentiles = tuple(percentiles)
+        # Series name -> (n_percentiles, n_days) array
+        self.values = values
+        self.n_replicates = n_replicates
+
+    def frame(self, key: str) -> pd.DataFrame:
+        """A day, date and one column per percentile (p5, p50...) frame."""
+        return pd.DataFrame({
+            "day": self.day,
+            "date": self.date,
+            **{
+                f"p{percentile:g}": band
+                for percentile, band in zip(self.percentiles, self.values[key])
+            }
+        })
+
+
+def monte_carlo(
+    p: Parameters,
+    distributions: Dict[str, Distribution],
+    n_replicates: int = 1000,
+    percentiles: Sequence[float] = PERCENTILES,
+    seed: Optional[int] = None,
+    chunk_size: int = 256,
+    n_jobs: int = 1,
+    compression: int = DEFAULT_COMPRESSION,
+) -> Bands:
+    """Project n_replicates samples of p and summarize them as percentile bands.
+
+    Replicates are sampled and projected as in doubling time mode (see Sir)
+    chunk_size at a time, as one vectorized batch, and the chunks are spread
+    over n_jobs processes. Each chunk is folded into a Digest as it arrives,
+    so memory depends on chunk_size, n_jobs and compression but not on
+    n_replicates; see Digest for how close the bands are to exact
+    percentiles. Results depend on seed and chunk_size, not on n_jobs.
+    """
+    if n_replicates < 1:
+        raise ValueError(f"At least one replicate is required, not {n_replicates}")
+    if chunk_size < 1:
+        raise ValueError(f"Chunks of at least one replicate are required, not {chunk_size}")
+    sizes = [
+        min(chunk_size, n_replicates - start)
+        for start in range(0, n_replicates, chunk_size)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = ((p, distributions, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds))
+
+    keys: Tuple[str, ...] = ()
+    digest = None
+    for result in map_chunks(project_chunk, chunks, n_jobs):
+        if digest is None:
+            keys = tuple(result)
+            digest = Digest((len(keys), p.n_days + 1), compression)
+        digest.update(np.stack([result[key] for key in keys], axis=1))
+
+    bands = digest.quantiles(percentiles)
+    values = {key: bands[:, k] for k, key in enumerate(keys)}
+
+    day = np.arange(p.n_days + 1)
+    date = day.astype("timedelta64[D]") + np.datetime64(p.current_date)
+    logger.info('Projected %s replicates', n_replicates)
+    return Bands(day, date.astype("datetime64[ns]"), percentiles, values, n_replicates)
+
+
+def project_chunk(
+    p: Parameters,
+    distributions: Dict[str, Distribution],
+    n_replicates: int,
+    seed: np.random.SeedSequence,
+) -> Dict[str, np.ndarray]:
+    return project_replicates(p, sample(p, distributions, n_replicates, seed))
+
+
+def get_seeds(p: Parameters, samples: Dict[str, np.ndarray]) -> Tuple[np.ndarray, ...]:
+    """Susceptible, infected, beta and beta_t of each replicate, as Sir seeds them."""
+    infected = 1.0 / samples["market_share"] / samples["hospitalized_rate"]
+    susceptible = p.population - infected
+    gamma = 1.0 / p.infectious_days
+    # Growth rates one at a time, to round exactly as Sir does
+    intrinsic_growth_rate = np.array([
+        get_growth_rate(doubling_time)
+        for doubling_time in samples["doubling_time"]
+    ])
+    beta = get_beta(intrinsic_growth_rate, gamma, susceptible, 0.0)
+    beta_t = get_beta(intrinsic_growth_rate, gamma, susceptible, samples["relative_contact_rate"])
+    return susceptible, infected, beta, beta_t
+
+
+def project_replicates(p: Parameters, samples: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Project one chunk of replicates from the present to n_days.
+
+    Returns an (n_replicates, n_days + 1) array for each census_* and
+    admits_* series; row k matches Sir run on the k-th replicate's values.
+    Dispositions with a length of stay distribution in p stay by it in
+    every replicate, whatever their sampled days.
+    """
+    susceptible, infected, beta, beta_t = get_seeds(p, samples)
+    gamma = 1.0 / p.infectious_days
+    mitigation_day = -(p.current_date - p.mitigation_date).days
+
+    i_days = get_argmin_i_days(p, samples, susceptible, infected, beta, beta_t)
+
+    total_days = i_days + p.n_days
+    pre_mitigation_days = np.clip(i_days + mitigation_day, 0, total_days)
+    n_steps = int(total_days.max())
+    schedule = np.where(
+        np.arange(n_steps) < pre_mitigation_days[:, None],
+        beta[:, None],
+        beta_t[:, None],
+    )
+    raw = sim_sir_batch(susceptible, infected, p.recovered, gamma, 0, [(schedule, n_steps)])
+
+    # Every replicate from its own present day onward
+    window = i_days[:, None] + np.arange(p.n_days + 1)
+    lengths_of_stay = p.lengths_of_stay or {}
+    result = {}
+    for key in p.dispositions:
+        _, admits, census = calculate_replicates(
+            raw["ever_infected"],
+            samples[f"{key}_rate"],
+            samples["market_share"],
+            lengths_of_stay.get(key, samples[f"{key}_days"]),
+        )
+        result["admits_" + key] = np.take_along_axis(admits, window, axis=-1)
+        result["census_" + key] = np.take_along_axis(census, window, axis=-1)
+    return result
+
+
+def get_argmin_i_days(
+    p: Parameters,
+    samples: Dict[str, np.ndarray],
+    susceptible: np.ndarray,
+    infected: np.ndarray,
+    beta: np.ndarray,
+    beta_t: np.ndarray,
+    max_rows: int = 4096,
+    n_checked: int = 3,
+) -> np.ndarray:
+    """The i_day of each replicate, as Sir.get_argmin_i_day fits it.
+
+    Candidate i_day c is unmitigated for j = max(c + mitigation_day, 0) days
+    and mitigated from then until day c + n_days, so every candidate
+    continues one unmitigated simulation per replicate from its day j, and
+    only the days after j are simulated per candidate: up to its present
+    day for its loss, and on to day c + n_days only for the candidates the
+    peak filter is checked on, the n_checked best losses of each replicate
+    first. When mitigation starts on or after the present day, j >= c and
+    the unmitigated simulation is all the loss reads; the peak filter is
+    then applied up to the present day only, as the census of an
+    unmitigated epidemic does not rise again after its peak.
+    """
+    gamma = 1.0 / p.infectious_days
+    mitigation_day = -(p.current_date - p.mitigation_date).days
+    n_replicates = beta.shape[0]
+    rate = samples["hospitalized_rate"]
+    market_share = samples["market_share"]
+    los = (p.lengths_of_stay or {}).get("hospitalized", samples["hospitalized_days"])
+
+    if mitigation_day >= 0:
+        raw = sim_sir_batch(susceptible, infected, p.recovered, gamma, 0, [(beta, p.n_days - 1)])
+        _, _, census = calculate_replicates(raw["ever_infected"], rate, market_share, los)
+        past = np.empty_like(census)
+        past[:, 0] = -np.inf
+        np.maximum.accumulate(census[:, :-1], axis=-1, out=past[:, 1:])
+
+        losses = get_loss(census, p.current_hospitalized)
+        losses[census <= past] = np.inf
+        return losses.argmin(axis=1)
+
+    # Candidates c > -mitigation_day each start mitigating on their own day
+    # j = c + mitigation_day, -mitigation_day days before their present; all
+    # earlier candidates share j = 0.
+    offset = -mitigation_day
+    n_starts = max(p.n_days - offset, 1)
+    n_steps = p.n_days + offset
+    n_shared = min(1 + offset, p.n_days)
+
+    i_days = np.empty(n_replicates, dtype="int")
+    # Chunks hold as many days of continued simulations as max_rows whole
+    # ones, and the replicates whose checked candidates fail are continued over
+    # the whole horizon max_rows at a time
+    chunk_size = max(max_rows * (n_steps + 1) // (n_starts * (offset + 1)), 1)
+    fallback_size = max(max_rows // n_starts, 1)
+    for start in range(0, n_replicates, chunk_size):
+        index = np.arange(start, min(start + chunk_size, n_replicates))
+        stay = los if isinstance(los, LengthOfStay) else los[index]
+        max_los = get_max_los(stay)
+        raw = sim_sir_batch(
+            susceptible[index], infected[index], p.recovered, gamma, 0,
+            [(beta[index], p.n_days - 1)],
+        )
+        admits = get_admits(get_ever(raw["ever_infected"], rate[index], market_share[index]))
+        cumsum = np.zeros((index.shape[0], p.n_days + max_los))
+        np.cumsum(admits[:, 1:], axis=-1, out=cumsum[:, max_los + 1:])
+        # Highest census before each day j
+        past = np.empty((index.shape[0], n_starts))
+        past[:, 0] = -np.inf
+        np.maximum.accumulate(
+            get_census(cumsum, stay, max_los)[:, :n_starts - 1], axis=-1, out=past[:, 1:]
+        )
+
+        population = susceptible[index] + infected[index]
+        population += p.recovered
+
+        def get_mitigated_census(rows: np.ndarray, starts: np.ndarray, n_days: int) -> np.ndarray:
+            """Census of each replicate of rows, mitigated from its day of starts for n_days.
+
+            Admits are summed since day 0, from max_los days before each
+            start on: the unmitigated sums up to it, then the mitigated
+            admits after it, accumulated in the same order as for a whole
+            projection.
+            """
+            mitigated = sim_sir_batch(
+                raw["susceptible"][rows, starts],
+                raw["infected"][rows, starts],
+                raw["recovered"][rows, starts],
+                gamma,
+                0,
+                [(beta_t[index[rows]], n_days)],
+                population=population[rows],
+            )
+            mitigated_admits = get_admits(
+                get_ever(mitigated["ever_infected"], rate[index[rows]], market_share[index[rows]])
+            )
+            continued = np.empty((rows.shape[0], max_los + n_days + 1))
+            days = starts[:, None] + np.arange(max_los + 1)
+            continued[:, :max_los + 1] = cumsum[rows[:, None], days]
+            continued[:, max_los + 1:] = mitigated_admits[:, 1:]
+            np.cumsum(continued[:, max_los:], axis=-1, out=continued[:, max_los:])
+            stays = stay if isinstance(stay, LengthOfStay) else stay[rows]
+            return get_census(continued, stays, max_los)
+
+        rows = np.arange(index.shape[0])
+        losses = np.empty((index.shape[0], p.n_days))
+
+        # Don't fit against results that put the peak before the present day
+        shared = get_mitigated_census(rows, np.zeros_like(rows), n_steps)
+        for c in range(n_shared):
+            losses[:, c] = get_loss(shared[:, c], p.current_hospitalized)
+            before = shared[:, :c].max(axis=-1) if c else -np.inf
+            losses[before >= shared[:, c:c + p.n_days + 1].max(axis=-1), c] = np.inf
+
+        # The loss of each later candidate reads only the offset days up to
+        # its present day, and so does the highest census before it
+        later = np.empty((index.shape[0], 0))
+        if n_starts > 1:
+            census = get_mitigated_census(
+                np.repeat(rows, n_starts - 1),
+                np.tile(np.arange(1, n_starts), index.shape[0]),
+                offset,
+            ).reshape(index.shape[0], n_starts - 1, offset + 1)
+            losses[:, n_shared:] = get_loss(census[..., offset], p.current_hospitalized)
+            later = np.maximum(past[:, 1:], census[..., :offset].max(axis=-1))
+
+        # The peak filter needs the whole mitigated horizon of a candidate:
+        # check it on the best few candidates of each replicate, in the order
+        # argmin would pick them, and on every later candidate of the
+        # replicates none of those pass
+        order = np.argsort(losses, axis=1, kind="stable")
+        chosen = np.zeros(index.shape[0], dtype="int")
+        pending = rows
+        for rank in range(min(n_checked, p.n_days)):
+            candidates = order[pending, rank]
+            # Only infinite losses are left: argmin picks 0
+            finite = np.isfinite(losses[pending, candidates])
+            pending, candidates = pending[finite], candidates[finite]
+            # Shared candidates were filtered above
+            is_later = candidates >= n_shared
+            chosen[pending[~is_later]] = candidates[~is_later]
+            pending, candidates = pending[is_later], candidates[is_later]
+            if not pending.shape[0]:
+                break
+            starts = candidates - n_shared + 1
+            census = get_mitigated_census(pending, starts, n_steps)
+            passed = later[pending, starts - 1] < census[:, offset:].max(axis=-1)
+            chosen[pending[passed]] = candidates[passed]
+            pending = pending[~passed]
+        failed = pending
+        for first in range(0, failed.shape[0], fallback_size):
+            pending = failed[first:first + fallback_size]
+            census = get_mitigated_census(
+                np.repeat(pending, n_starts - 1),
+                np.tile(np.arange(1, n_starts), pending.shape[0]),
+                n_steps,
+            ).reshape(pending.shape[0], n_starts - 1, n_steps + 1)
+            rejected = later[pending] >= census[..., offset:].max(axis=-1)
+            losses[pending, n_shared:] = np.where(rejected, np.inf, losses[pending, n_shared:])
+            chosen[pending] = losses[pending].argmin(axis=1)
+        i_days[index] = chosen
+    return i_days
@@ -0,0 +1,119 @@
+"""Network.
+
+Hospitals sharing one regional epidemic.
+
+Changes affecting results or their presentation should also update
+constants.py `CHANGE_DATE`.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .optimizers import Optimizer
+from .parameters import Disposition, Parameters
+from .projection import Projection
+from .sir import Sir, calculate_replicates
+from .validators import Rate, ValDisposition
+
+
+class Hospital:
+    """One hospital of a region: its market share and dispositions.
+
+    Dispositions left out are the region's.
+    """
+
+    def __init__(self, market_share: float, dispositions: Optional[Dict[str, Disposition]] = None) -> None:
+        Rate(key="market_share", value=market_share)
+        dispositions = {} if dispositions is None else dispositions
+        for key, disposition in dispositions.items():
+            ValDisposition(key=key, value=disposition)
+        self.market_share = market_share
+        self.dispositions = dispositions
+
+    @classmethod
+    def from_parameters(cls, p: Parameters) -> Hospital:
+        return cls(p.market_share, dict(p.dispositions))
+
+
+class Network:
+    """The regional epidemic of p, simulated once, fanned out to each hospital.
+
+    p describes the region with its hospitals combined: its market share,
+    dispositions and current_hospitalized seed the infected and fit i_day,
+    exactly as for Sir. Each hospital's dispositions, admits and census are
+    then the region's ever_infected times the hospital's market share and
+    rates, with its lengths of stay: one (n_hospitals, n_days) array per
+    series, computed for every hospital at once. Dispositions with a length
+    of stay distribution in p stay by it at every hospital.
+    """
+
+    def __init__(
+        self,
+        p: Parameters,
+        hospitals: Dict[str, Hospital],
+        optimizer: Optional[Optimizer] = None,
+    ) -> None:
+        self.model = Sir(p, optimizer)
+        self.p = p
+        self.hospitals = hospitals
+        self.names = list(hospitals)
+        self.keys = list(p.dispositions)
+
+        ever_infected = self.model.raw["ever_infected"]
+        n_hospitals = len(self.names)
+        market_share = np.array([hospitals[name].market_share for name in self.names])
+        shape = (n_hospitals, ever_infected.shape[0])
+
+        lengths_of_stay = p.lengths_of_stay or {}
+        self.series: Dict[str, np.ndarray] = {}
+        for key in self.keys:
+            dispositions = [hospitals[name].dispositions.get(key, p.dispositions[key]) for name in self.names]
+            rate = np.array([disposition.rate for disposition in dispositions], dtype="float")
+            los = np.array([disposition.days for disposition in dispositions], dtype="int")
+
+            ever, admits, census = calculate_replicates(
+                np.broadcast_to(ever_infected, shape), rate, market_share, lengths_of_stay.get(key, los)
+            )
+            self.series["ever_" + key] = ever
+            self.series["admits_" + key] = admits
+            self.series["census_" + key] = census
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def projection(self, name: str) -> Projection:
+        """One hospital's projection, on the regional sir series."""
+        k = self.names.index(name)
+        region = self.model.raw
+        raw = {
+            key: region[key]
+            for key in ("day", "susceptible", "infected", "recovered", "ever_infected", "date")
+        }
+        for key, values in self.series.items():
+            raw[key] = values[k]
+        projection = Projection.from_raw(raw, self.keys)
+        projection.summary = dict(self.model.projection.summary)
+        projection.fit = self.model.fit
+        return projection
+
+    def models(self, names: Optional[Sequence[str]] = None) -> Dict[str, Sir]:
+        """Models of each hospital, for the views."""
+        names = self.names if names is None else names
+        models = {}
+        for name in names:
+            model = Sir.from_projection(self.projection(name), self.p)
+            dispositions = self.hospitals[name].dispositions
+            model.rates = {
+                key: dispositions.get(key, disposition).rate
+                for key, disposition in self.p.dispositions.items()
+            }
+            model.days.update(
+                (key, disposition.days)
+                for key, disposition in dispositions.items()
+                if key not in (self.p.lengths_of_stay or {})
+            )
+            models[name] = model
+        return models
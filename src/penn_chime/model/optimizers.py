@@ -0,0 +1,206 @@
+"""One-dimensional optimizers for fitting the doubling time.
+
+Each optimizer minimizes a vectorized loss: a callable that takes an array
+of candidate values and returns an array of losses, so candidates that are
+known up front (a grid) are evaluated in a single batched projection.
+
+Sir defaults to GridSearch, which reproduces released results; Brent and
+GoldenSection need fewer projections but land on slightly different doubling
+times, so making one the default should also update constants.py
+`CHANGE_DATE`.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from math import sqrt
+from typing import Callable, Tuple
+
+import numpy as np
+
+
+Loss = Callable[[np.ndarray], np.ndarray]
+
+OptimizeResult = namedtuple("OptimizeResult", ("x", "loss", "n_evaluations"))
+
+GOLDEN = 0.5 * (3.0 - sqrt(5.0))
+SQRT_EPSILON = sqrt(np.finfo(float).eps)
+
+
+class CountedLoss:
+    """Counts how many candidates a loss has been evaluated on."""
+
+    def __init__(self, loss: Loss):
+        self.loss = loss
+        self.n_evaluations = 0
+
+    def __call__(self, xs: np.ndarray) -> np.ndarray:
+        xs = np.atleast_1d(np.asarray(xs, dtype="float"))
+        self.n_evaluations += xs.shape[0]
+        return np.asarray(self.loss(xs), dtype="float")
+
+    def scalar(self, x: float) -> float:
+        return float(self(np.array([x]))[0])
+
+
+class Optimizer(ABC):
+
+    def __call__(self, loss: Loss, lower: float, upper: float) -> OptimizeResult:
+        counted = CountedLoss(loss)
+        x, fx = self.minimize(counted, lower, upper)
+        return OptimizeResult(x, fx, counted.n_evaluations)
+
+    @abstractmethod
+    def minimize(self, loss: CountedLoss, lower: float, upper: float) -> Tuple[float, float]:
+        pass
+
+
+def argmin_grid(loss: CountedLoss, dts: np.ndarray) -> Tuple[int, float]:
+    """Index and value of the smallest loss on a grid, ignoring nan."""
+    losses = loss(dts)
+    index = int(np.nanargmin(losses))
+    return index, losses[index]
+
+
+def neighbours(dts: np.ndarray, index: int) -> Tuple[float, float]:
+    """Grid points on either side of index, clamped to the grid."""
+    return dts[max(index - 1, 0)], dts[min(index + 1, dts.shape[0] - 1)]
+
+
+class GridSearch(Optimizer):
+    """A coarse grid refined around its minimum a fixed number of times.
+
+    Always spends n_points * (n_refinements + 1) evaluations.
+    """
+
+    def __init__(self, n_points: int = 15, n_refinements: int = 4) -> None:
+        self.n_points = n_points
+        self.n_refinements = n_refinements
+
+    def minimize(self, loss, lower, upper):
+        dts = np.linspace(lower, upper, self.n_points)
+        min_loss, fx = argmin_grid(loss, dts)
+
+        for _ in range(self.n_refinements):
+            dts = np.linspace(*neighbours(dts, min_loss), self.n_points)
+            min_loss, fx = argmin_grid(loss, dts)
+
+        return dts[min_loss], fx
+
+
+class Bracketing(Optimizer):
+    """Brackets the minimum on a coarse grid, then refines inside the bracket.
+
+    The loss need not be unimodal over [lower, upper], only within one grid
+    step of its global minimum. The coarse grid is a single batched
+    evaluation; refinement stops once the bracket is narrower than xtol or
+    max_evaluations have been spent in total.
+    """
+
+    def __init__(
+        self,
+        xtol: float = 1.e-4,
+        max_evaluations: int = 50,
+        n_points: int = 15,
+    ) -> None:
+        self.xtol = xtol
+        self.max_evaluations = max_evaluations
+        self.n_points = n_points
+
+    def minimize(self, loss, lower, upper):
+        if self.n_points >= 3:
+            dts = np.linspace(lower, upper, self.n_points)
+            lower, upper = neighbours(dts, argmin_grid(loss, dts)[0])
+        return self.refine(loss, lower, upper)
+
+    @abstractmethod
+    def refine(self, loss: CountedLoss, a: float, b: float) -> Tuple[float, float]:
+        pass
+
+
+class GoldenSection(Bracketing):
+    """Golden-section search."""
+
+    def refine(self, loss, a, b):
+        c = a + GOLDEN * (b - a)
+        d = b - GOLDEN * (b - a)
+        fc = loss.scalar(c)
+        fd = loss.scalar(d)
+        while (b - a) > self.xtol and loss.n_evaluations < self.max_evaluations:
+            if fc < fd:
+                b, d, fd = d, c, fc
+                c = a + GOLDEN * (b - a)
+                fc = loss.scalar(c)
+            else:
+                a, c, fc = c, d, fd
+                d = b - GOLDEN * (b - a)
+                fd = loss.scalar(d)
+        return (c, fc) if fc < fd else (d, fd)
+
+
+class Brent(Bracketing):
+    """Brent's bounded minimization: parabolic steps with a golden fallback."""
+
+    def refine(self, loss, a, b):
+        xf = fulc = nfc = a + GOLDEN * (b - a)
+        fx = ffulc = fnfc = loss.scalar(xf)
+        rat = e = 0.0
+        xm = 0.5 * (a + b)
+        tol1 = SQRT_EPSILON * abs(xf) + self.xtol / 3.0
+        tol2 = 2.0 * tol1
+
+        while abs(xf - xm) > (tol2 - 0.5 * (b - a)):
+            if loss.n_evaluations >= self.max_evaluations:
+                break
+
+            golden = True
+            if abs(e) > tol1:
+                # Try a parabola through the three best points
+                r = (xf - nfc) * (fx - ffulc)
+                q = (xf - fulc) * (fx - fnfc)
+                p = (xf - fulc) * q - (xf - nfc) * r
+                q = 2.0 * (q - r)
+                if q > 0.0:
+                    p = -p
+                q = abs(q)
+                r, e = e, rat
+
+                if abs(p) < abs(0.5 * q * r) and q * (a - xf) < p < q * (b - xf):
+                    golden = False
+                    rat = p / q
+                    x = xf + rat
+                    if (x - a) < tol2 or (b - x) < tol2:
+                        rat = tol1 if xm >= xf else -tol1
+
+            if golden:
+                e = (a - xf) if xf >= xm else (b - xf)
+                rat = GOLDEN * e
+
+            x = xf + (1.0 if rat >= 0.0 else -1.0) * max(abs(rat), tol1)
+            fu = loss.scalar(x)
+
+            if fu <= fx:
+                if x >= xf:
+                    a = xf
+                else:
+                    b = xf
+                fulc, ffulc = nfc, fnfc
+                nfc, fnfc = xf, fx
+                xf, fx = x, fu
+            else:
+                if x < xf:
+                    a = x
+                else:
+                    b = x
+                if fu <= fnfc or nfc == xf:
+                    fulc, ffulc = nfc, fnfc
+                    nfc, fnfc = x, fu
+                elif fu <= ffulc or fulc == xf or fulc == nfc:
+                    fulc, ffulc = x, fu
+
+            xm = 0.5 * (a + b)
+            tol1 = SQRT_EPSILON * abs(xf) + self.xtol / 3.0
+            tol2 = 2.0 * tol1
+
+        return xf, fx
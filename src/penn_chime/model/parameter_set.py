@@ -0,0 +1,252 @@
+"""Parameter sets.
+
+Many scenarios' parameters as columns, validated and projected together.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .monte_carlo import project_replicates
+from .parameters import DISPOSITIONS, VALIDATORS, Disposition, Parameters
+from .sir import project
+
+
+DATES = ("current_date", "date_first_hospitalized", "mitigation_date")
+
+NUMBERS = (
+    "current_hospitalized",
+    "doubling_time",
+    "infectious_days",
+    "market_share",
+    "max_y_axis",
+    "n_days",
+    "population",
+    "recovered",
+    "relative_contact_rate",
+)
+
+# Columns, with each disposition as <disposition>_days and <disposition>_rate
+COLUMNS = (
+    *DATES,
+    *NUMBERS,
+    "region",
+    *(f"{key}_{field}" for key in DISPOSITIONS for field in ("days", "rate")),
+)
+
+# Values that must be equal for scenarios to be projected as one batch
+SHARED = (
+    "current_hospitalized",
+    "current_date",
+    "infectious_days",
+    "mitigation_date",
+    "n_days",
+    "population",
+    "recovered",
+)
+
+
+def to_dates(values: Any, n: int) -> np.ndarray:
+    if values is None or isinstance(values, (date, str)):
+        values = [values] * n
+    return np.array(
+        [np.datetime64("NaT") if value is None else value for value in values],
+        dtype="datetime64[D]",
+    )
+
+
+def to_numbers(values: Any, n: int) -> np.ndarray:
+    if values is None or np.ndim(values) == 0:
+        values = [values] * n
+    return np.array([np.nan if value is None else value for value in values], dtype="float")
+
+
+class ParameterSet:
+    """The parameters of n scenarios, one numpy column per parameter.
+
+    Columns are named as the command line arguments: the DISPOSITIONS are
+    split into <disposition>_days and <disposition>_rate (scenarios have no
+    other dispositions, nor length of stay distributions). Dates are
+    datetime64[D], with NaT for None, other values are floats, with nan for
+    None, and region holds objects. Scalars apply to every scenario, and,
+    as for Parameters, current_date and mitigation_date default to today.
+
+    `errors` validates every scenario at once, by the rules of
+    penn_chime.model.validators that Parameters applies one at a time: it is
+    the first error each scenario's Parameters would raise, or ''.
+    """
+
+    def __init__(self, n: int, **columns: Any) -> None:
+        for key in columns:
+            if key not in COLUMNS:
+                raise ValueError(f"Unexpected parameter {key}")
+        self.n = n
+        today = np.datetime64(date.today(), "D")
+        self.columns: Dict[str, np.ndarray] = {}
+        for key in COLUMNS:
+            values = columns.get(key)
+            if key in DATES:
+                self.columns[key] = to_dates(values, n)
+            elif key == "region":
+                self.columns[key] = np.array(
+                    [values] * n if values is None or np.ndim(values) == 0 else list(values),
+                    dtype="object",
+                )
+            else:
+                self.columns[key] = to_numbers(values, n)
+            assert self.columns[key].shape == (n,), f"{key} needs {n} values."
+        for key in ("current_date", "mitigation_date"):
+            self.columns[key][np.isnat(self.columns[key])] = today
+        self._errors: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_parameters(cls, ps: Sequence[Parameters]) -> ParameterSet:
+        columns: Dict[str, List[Any]] = {key: [] for key in COLUMNS}
+        for p in ps:
+            for key in (*DATES, *NUMBERS, "region"):
+                columns[key].append(getattr(p, key))
+            for key in DISPOSITIONS:
+                disposition = getattr(p, key)
+                columns[f"{key}_days"].append(disposition.days)
+                columns[f"{key}_rate"].append(disposition.rate)
+        return cls(len(ps), **columns)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Mapping[str, Any]]) -> ParameterSet:
+        """From one mapping of column values per scenario; missing values are None."""
+        return cls(len(rows), **{
+            key: [row.get(key) for row in rows]
+            for key in COLUMNS
+        })
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.columns[key]
+
+    def disposition(self, key: str) -> np.ndarray:
+        """(n, 2) days and rate, the layout of Disposition."""
+        return np.stack([self.columns[f"{key}_days"], self.columns[f"{key}_rate"]], axis=1)
+
+    @property
+    def errors(self) -> np.ndarray:
+        """The first validation error of each scenario, or ''."""
+        if self._errors is None:
+            errors = np.full(self.n, "", dtype="object")
+
+            def add(new):
+                np.copyto(errors, new, where=(errors == "") & (new != ""))
+
+            for key, validator in VALIDATORS.items():
+                if key in DISPOSITIONS:
+                    values = self.disposition(key)
+                elif key in ("region", "other_dispositions", "lengths_of_stay"):
+                    continue
+                else:
+                    values = self.columns[key]
+                add(validator.validate_array(key, values))
+
+            missing = np.array([region is None for region in self.columns["region"]])
+            missing &= np.isnan(self.columns["population"])
+            add(np.where(missing, "population or regions must be provided.", ""))
+            self._errors = errors
+        return self._errors
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.errors == ""
+
+    def take(self, index: Any) -> ParameterSet:
+        """The scenarios at an integer or boolean index."""
+        columns = {key: values[index] for key, values in self.columns.items()}
+        return ParameterSet(len(columns["n_days"]), **columns)
+
+    def row(self, k: int) -> Parameters:
+        """The Parameters of scenario k; raises its validation error, if any."""
+        values: Dict[str, Any] = {}
+        for key in DATES:
+            value = self.columns[key][k]
+            values[key] = None if np.isnat(value) else value.astype(date)
+        for key in NUMBERS:
+            value = float(self.columns[key][k])
+            if np.isnan(value):
+                values[key] = None
+            elif value.is_integer() and key not in ("doubling_time", "market_share", "relative_contact_rate"):
+                values[key] = int(value)
+            else:
+                values[key] = value
+        values["region"] = self.columns["region"][k]
+        for key in DISPOSITIONS:
+            days, rate = self.disposition(key)[k]
+            if np.isnan(days) or np.isnan(rate):
+                values[key] = None
+            else:
+                values[key] = Disposition(int(days) if float(days).is_integer() else days, float(rate))
+        return Parameters(**values)
+
+    def project(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Admits and census of every scenario, and each scenario's error.
+
+        Returns an (n, max n_days + 1) array per admits_* and census_*
+        series, from the present day (day 0) on, and the errors: validation
+        errors, or errors raised projecting the scenario. Scenarios that
+        fail, and days past a scenario's n_days, are nan.
+
+        Valid doubling time scenarios sharing the SHARED values are projected
+        as one batch of replicates (see project_replicates); any other
+        scenario is projected by Sir on its own.
+        """
+        errors = self.errors.copy()
+        n_days = np.nan_to_num(self.columns["n_days"]).astype("int")
+        width = int(n_days.max(initial=0)) + 1
+        series = {
+            f"{group}_{key}": np.full((self.n, width), np.nan)
+            for group in ("admits", "census")
+            for key in DISPOSITIONS
+        }
+
+        batched = (
+            (errors == "")
+            & np.isnat(self.columns["date_first_hospitalized"])
+            & ~np.isnan(self.columns["doubling_time"])
+            & ~np.isnan(self.columns["population"])
+        )
+        for key in DISPOSITIONS:
+            # Batches take whole days of stay
+            batched &= np.mod(self.columns[f"{key}_days"], 1.0) == 0.0
+        shared = np.stack([
+            self.columns[key].astype("float") if key not in DATES
+            else self.columns[key].astype("int64").astype("float")
+            for key in SHARED
+        ], axis=1)
+        groups = np.full(self.n, -1)
+        if batched.any():
+            _, groups[batched] = np.unique(shared[batched], axis=0, return_inverse=True)
+
+        for group in np.unique(groups[groups >= 0]):
+            index = np.flatnonzero(groups == group)
+            p = self.row(index[0])
+            samples = {"doubling_time": self.columns["doubling_time"][index]}
+            for key in ("market_share", "relative_contact_rate"):
+                samples[key] = self.columns[key][index]
+            for key in DISPOSITIONS:
+                samples[f"{key}_rate"] = self.columns[f"{key}_rate"][index]
+                samples[f"{key}_days"] = self.columns[f"{key}_days"][index].astype("int")
+            result = project_replicates(p, samples)
+            for key, values in series.items():
+                values[index, :p.n_days + 1] = result[key]
+
+        for k in np.flatnonzero((errors == "") & ~batched):
+            try:
+                projection = project(self.row(k))
+            except (AssertionError, TypeError, ValueError) as e:
+                errors[k] = str(e)
+                continue
+            i_day = int(projection.summary["i_day"])
+            for key, values in series.items():
+                values[k, :n_days[k] + 1] = projection.column(key)[i_day:]
+        return series, errors
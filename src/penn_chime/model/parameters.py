@@ -6,21 +6,27 @@ constants.py `change_date``.
 
 from __future__ import annotations
 
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 from collections import namedtuple
 from datetime import date, datetime
+from hashlib import sha256
 from logging import INFO, basicConfig, getLogger
 from sys import stdout
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 
 from ..constants import (
     CHANGE_DATE,
+    DISPOSITIONS,
     VERSION,
 )
+from .length_of_stay import KINDS, LengthOfStay
 from .validators import (
     Date,
     GteOne,
     OptionalDate,
+    OptionalDispositions,
+    OptionalLengthsOfStay,
     OptionalValue,
     OptionalStrictlyPositive,
     Positive,
@@ -85,6 +91,27 @@ def cast_date(string):
     return datetime.strptime(string, '%Y-%m-%d').date()
 
 
+def cast_disposition(string):
+    """A NAME:DAYS:RATE command line argument as (name, Disposition)."""
+    name, days, rate = string.split(":")
+    return name, Disposition.create(days=int(days), rate=float(rate))
+
+
+def cast_length_of_stay(string):
+    """A NAME:KIND:VALUES command line argument as (name, LengthOfStay).
+
+    KIND is gamma or lognormal, with the MEAN:SD of the stay in days, or
+    histogram, with comma separated weights of stays of 1, 2, ... days.
+    """
+    name, kind, *values = string.split(":")
+    if kind not in KINDS:
+        raise ValueError(f"{kind} needs to be one of {', '.join(KINDS)}.")
+    if kind == "histogram":
+        return name, KINDS[kind](float(weight) for weight in ":".join(values).split(","))
+    mean, sd = values
+    return name, KINDS[kind](float(mean), float(sd))
+
+
 def declarative_validator(cast):
     """Validator."""
 
@@ -136,12 +163,42 @@ VALIDATORS = {
     "ventilated": ValDisposition,
     "hospitalized": ValDisposition,
     "icu": ValDisposition,
+    "other_dispositions": OptionalDispositions,
+    "lengths_of_stay": OptionalLengthsOfStay,
 }
 
 
+LABELS = MappingProxyType({
+    "hospitalized": "Hospitalized",
+    "icu": "ICU",
+    "ventilated": "Ventilated",
+    "day": "Day",
+    "date": "Date",
+    "susceptible": "Susceptible",
+    "infected": "Infected",
+    "recovered": "Recovered",
+})
+
+
+def get_labels(
+    dispositions: Mapping[str, Disposition],
+    labels: Optional[Mapping[str, str]] = None,
+) -> Dict[str, str]:
+    """LABELS and labels, with a label for every other one of dispositions."""
+    labels = {**LABELS, **(labels or {})}
+    for key in dispositions:
+        labels.setdefault(key, key.replace("_", " ").capitalize())
+    return labels
+
+
 HELP = {
     "current_hospitalized": "Currently hospitalized COVID-19 patients (>= 0)",
     "current_date": "Date on which the projection should be based (default is today)",
+    "disposition": "Another disposition, as NAME:DAYS:RATE (repeatable)",
+    "length_of_stay": (
+        "Length of stay distribution of a disposition, in place of its days, as"
+        " NAME:gamma:MEAN:SD, NAME:lognormal:MEAN:SD or NAME:histogram:W1,W2,... (repeatable)"
+    ),
     "date_first_hospitalized": "Date the first patient was hospitalized",
     "doubling_time": "Doubling time before social distancing (days)",
     "hospitalized_days": "Average hospital length of stay (in days)",
@@ -319,6 +376,20 @@ class Parameters:
                 type=validator(arg, cast, min_value, max_value, required),
                 help=HELP.get(name),
             )
+        parser.add_argument(
+            "--disposition",
+            action="append",
+            type=cast_disposition,
+            metavar="NAME:DAYS:RATE",
+            help=HELP["disposition"],
+        )
+        parser.add_argument(
+            "--length-of-stay",
+            action="append",
+            type=cast_length_of_stay,
+            metavar="NAME:KIND:VALUES",
+            help=HELP["length_of_stay"],
+        )
         return parser
 
     @classmethod
@@ -339,6 +410,24 @@ class Parameters:
                 parser.parse_args(fin.read().split(), a)
 
         del a.parameters
+        return cls.from_args(vars(a))
+
+    @classmethod
+    def from_args(cls, args: Dict[str, Any]) -> Parameters:
+        """Parameters from parsed arguments, by name with underscores.
+
+        Arguments that are missing are None, as when they are not passed on
+        the command line.
+        """
+        a = Namespace(**{
+            name.replace("-", "_"): None
+            for name, *_ in ARGS
+            if name != "parameters"
+        })
+        a.disposition = None
+        a.length_of_stay = None
+        for key, value in args.items():
+            setattr(a, key, value)
 
         Positive(key='hospitalized_days', value=a.hospitalized_days)
         Positive(key='icu_days', value=a.icu_days)
@@ -368,10 +457,17 @@ class Parameters:
         del a.ventilated_days
         del a.ventilated_rate
 
+        other_dispositions = dict(a.disposition) if a.disposition else None
+        del a.disposition
+        lengths_of_stay = dict(a.length_of_stay) if a.length_of_stay else None
+        del a.length_of_stay
+
         return cls(
             hospitalized=hospitalized,
             icu=icu,
             ventilated=ventilated,
+            other_dispositions=other_dispositions,
+            lengths_of_stay=lengths_of_stay,
             **vars(a),
         )
 
@@ -395,6 +491,8 @@ class Parameters:
         self.relative_contact_rate = None
         self.recovered = None
         self.ventilated = None
+        self.other_dispositions: Optional[Dict[str, Disposition]] = None
+        self.lengths_of_stay: Optional[Dict[str, LengthOfStay]] = None
 
         passed_and_default_parameters = {}
         for key, value in kwargs.items():
@@ -423,19 +521,161 @@ class Parameters:
         Date(key='current_date', value=self.current_date)
         Date(key='mitigation_date', value=self.mitigation_date)
 
-        self.labels = {
-            "hospitalized": "Hospitalized",
-            "icu": "ICU",
-            "ventilated": "Ventilated",
-            "day": "Day",
-            "date": "Date",
-            "susceptible": "Susceptible",
-            "infected": "Infected",
-            "recovered": "Recovered",
-        }
-
-        self.dispositions = {
-            "hospitalized": self.hospitalized,
-            "icu": self.icu,
-            "ventilated": self.ventilated,
-        }
+        self.dispositions = get_dispositions(self)
+        self.labels = get_labels(self.dispositions)
+        for key in self.lengths_of_stay or {}:
+            if key not in self.dispositions:
+                raise ValueError(f"lengths_of_stay: {key} needs to be a disposition.")
+
+    def freeze(self) -> FrozenParameters:
+        """An immutable, hashable copy, suitable as a cache key."""
+        return FrozenParameters(self)
+
+
+def get_dispositions(p: Any) -> Dict[str, Disposition]:
+    """Every disposition of p by name: DISPOSITIONS, then other_dispositions."""
+    return {
+        **{key: getattr(p, key) for key in DISPOSITIONS},
+        **(p.other_dispositions or {}),
+    }
+
+
+def get_lengths_of_stay(p: Any) -> Dict[str, Union[int, LengthOfStay]]:
+    """The days of each disposition of p, or its length of stay distribution."""
+    lengths_of_stay = p.lengths_of_stay or {}
+    return {
+        key: lengths_of_stay.get(key, disposition.days)
+        for key, disposition in p.dispositions.items()
+    }
+
+
+def get_fields(p: Any) -> Dict[str, Any]:
+    """Canonical values of p, with each disposition split into fields.
+
+    Every disposition has <disposition>.days, .rate and .length_of_stay
+    (None without a distribution); other values keep their names.
+    """
+    fields = {
+        key: canonical(getattr(p, key))
+        for key in VALIDATORS
+        if key not in (*DISPOSITIONS, "other_dispositions", "lengths_of_stay")
+    }
+    lengths_of_stay = p.lengths_of_stay or {}
+    for key, disposition in p.dispositions.items():
+        fields[f"{key}.days"] = disposition.days
+        fields[f"{key}.rate"] = disposition.rate
+        fields[f"{key}.length_of_stay"] = canonical(lengths_of_stay.get(key))
+    return fields
+
+
+def canonical(value: Any) -> Any:
+    """A plain, order-stable representation of one parameter value."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Disposition):
+        return (value.days, value.rate)
+    if isinstance(value, LengthOfStay):
+        return (type(value).__name__, *value)
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, canonical(item)) for key, item in value.items()))
+    if isinstance(value, Regions):
+        return tuple(sorted(vars(value).items()))
+    return value
+
+
+def copy_regions(region: Regions) -> Regions:
+    return Regions(**{
+        key: value
+        for key, value in vars(region).items()
+        if key != "population"
+    })
+
+
+class FrozenParameters:
+    """Parameters that can no longer change.
+
+    Built with `Parameters.freeze()`. Compares and hashes by value, and
+    `digest` is a hash of the same canonical key that is stable across
+    processes and runs, so frozen parameters can key in-memory and on-disk
+    caches alike. `replace()` returns a new instance with some values
+    changed; `thaw()` returns mutable Parameters again.
+    """
+
+    __slots__ = tuple(VALIDATORS) + ("_key",)
+
+    def __init__(self, p: Parameters):
+        for key in VALIDATORS:
+            value = getattr(p, key)
+            if isinstance(value, Regions):
+                value = copy_regions(value)
+            elif isinstance(value, Mapping):
+                value = MappingProxyType(dict(value))
+            object.__setattr__(self, key, value)
+        object.__setattr__(
+            self,
+            "_key",
+            tuple((key, canonical(getattr(self, key))) for key in VALIDATORS),
+        )
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"Cannot set '{key}': parameters are frozen.")
+
+    def __delattr__(self, key):
+        raise AttributeError(f"Cannot delete '{key}': parameters are frozen.")
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenParameters):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __repr__(self):
+        values = ", ".join(f"{key}={getattr(self, key)!r}" for key in VALIDATORS)
+        return f"FrozenParameters({values})"
+
+    def __reduce__(self):
+        return (freeze, (self.asdict(),))
+
+    @property
+    def key(self) -> Tuple[Tuple[str, Any], ...]:
+        """Canonical (name, value) pairs, in a fixed order."""
+        return self._key
+
+    @property
+    def digest(self) -> str:
+        """Hex sha256 of the canonical key."""
+        return sha256(repr(self._key).encode()).hexdigest()
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        return get_labels(self.dispositions)
+
+    @property
+    def dispositions(self) -> Dict[str, Disposition]:
+        return get_dispositions(self)
+
+    def asdict(self) -> Dict[str, Any]:
+        values = {}
+        for key in VALIDATORS:
+            value = getattr(self, key)
+            if isinstance(value, MappingProxyType):
+                value = dict(value)
+            values[key] = value
+        return values
+
+    def replace(self, **kwargs) -> FrozenParameters:
+        """A copy with some values changed, validated like Parameters."""
+        return freeze({**self.asdict(), **kwargs})
+
+    def thaw(self) -> Parameters:
+        """A mutable copy."""
+        values = self.asdict()
+        if values["region"] is not None:
+            values["region"] = copy_regions(values["region"])
+        return Parameters(**values)
+
+
+def freeze(values: Dict[str, Any]) -> FrozenParameters:
+    return Parameters(**values).freeze()
@@ -0,0 +1,179 @@
+"""Projection.
+
+A single columnar store for everything a projection produces.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .optimizers import OptimizeResult
+
+
+SIR_KEYS = ("susceptible", "infected", "recovered")
+
+# Scalars Sir derives alongside the series
+SUMMARY_KEYS = (
+    "i_day",
+    "doubling_time",
+    "doubling_time_t",
+    "intrinsic_growth_rate",
+    "daily_growth_rate",
+    "daily_growth_rate_t",
+    "beta",
+    "beta_t",
+    "gamma",
+    "r_naught",
+    "r_t",
+    "infected",
+    "susceptible",
+    "recovered",
+    "min_n_days",
+    "max_n_days",
+)
+
+
+class Projection:
+    """All output series of a projection in one (n_columns, n_days) block.
+
+    Series are grouped so that every group is a contiguous range of rows of
+    the block, and share a single `day` and `date` axis:
+
+        sir             susceptible, infected, recovered
+        ever_infected   ever_infected
+        dispositions    ever_<disposition>
+        admits          admits_<disposition>
+        census          census_<disposition>
+        sir_floor       floor of the sir group
+        admits_floor    floor of the admits group
+        census_floor    floor of the census group
+
+    `frame(group)` and `raw` are views of the block rather than copies, so a
+    projection costs one block however many of its frames are in use.
+
+    `summary` maps SUMMARY_KEYS to the scalars of the model that produced it;
+    its fit holds for any n_days from min_n_days to max_n_days. `digests`
+    identify the parameters of each of its stages (see sir.STAGES), and
+    `fit` is the doubling time fit, if any (see Sir.fit).
+
+    Cached projections are shared: `freeze()` makes the block read only, so
+    frames and raw series of it cannot be written to.
+    """
+
+    def __init__(
+        self,
+        day: np.ndarray,
+        date: np.ndarray,
+        groups: Dict[str, Sequence[str]],
+        values: np.ndarray,
+        summary: Optional[Dict[str, float]] = None,
+    ):
+        self.day = day
+        self.date = date
+        self.values = values
+        self.summary: Dict[str, float] = {} if summary is None else summary
+        self.digests: Dict[str, str] = {}
+        self.fit: Optional[OptimizeResult] = None
+        self.groups: Dict[str, Tuple[str, ...]] = {}
+        self.slices: Dict[str, slice] = {}
+
+        start = 0
+        for group, columns in groups.items():
+            self.groups[group] = tuple(columns)
+            self.slices[group] = slice(start, start + len(columns))
+            start += len(columns)
+        assert start == values.shape[0], "Every row of values must belong to a group."
+
+    @classmethod
+    def from_raw(cls, raw: Dict[str, np.ndarray], dispositions: Sequence[str]) -> Projection:
+        """Pack a raw dictionary, as built by Sir, into a single block."""
+        dispositions = list(dispositions)
+        admits = ["admits_" + key for key in dispositions]
+        census = ["census_" + key for key in dispositions]
+        groups = {
+            "sir": SIR_KEYS,
+            "ever_infected": ("ever_infected",),
+            "dispositions": ["ever_" + key for key in dispositions],
+            "admits": admits,
+            "census": census,
+            "sir_floor": SIR_KEYS,
+            "admits_floor": admits,
+            "census_floor": census,
+        }
+        n_columns = sum(len(columns) for columns in groups.values())
+        values = np.empty((n_columns, raw["day"].shape[0]))
+
+        row = 0
+        for group, columns in groups.items():
+            for column in columns:
+                if group.endswith("_floor"):
+                    np.floor(raw[column], out=values[row])
+                else:
+                    values[row] = raw[column]
+                row += 1
+
+        return cls(raw["day"], raw["date"].astype("datetime64[ns]"), groups, values)
+
+    def head(self, n: int) -> Projection:
+        """The first n days, sharing this block."""
+        result = Projection(
+            self.day[:n],
+            self.date[:n],
+            self.groups,
+            self.values[:, :n],
+            dict(self.summary),
+        )
+        result.digests = dict(self.digests)
+        result.fit = self.fit
+        return result
+
+    def freeze(self) -> Projection:
+        """Make the block, day and date read only; returns self."""
+        for array in (self.values, self.day, self.date):
+            array.setflags(write=False)
+        return self
+
+    def group(self, group: str) -> np.ndarray:
+        """The (n_columns, n_days) view of one group."""
+        return self.values[self.slices[group]]
+
+    def frame(self, group: str) -> pd.DataFrame:
+        """A day, date and group columns frame sharing memory with the block."""
+        df = pd.DataFrame(self.group(group).T, columns=self.groups[group], copy=False)
+        df.insert(0, "day", self.day)
+        df.insert(1, "date", self.date)
+        return df
+
+    @property
+    def raw(self) -> Dict[str, np.ndarray]:
+        """The raw dictionary layout Sir has always exposed, as views."""
+        result: Dict[str, np.ndarray] = {"day": self.day}
+        for column, row in zip(self.groups["sir"], self.group("sir")):
+            result[column] = row
+        result["ever_infected"] = self.group("ever_infected")[0]
+
+        dispositions = [column[len("ever_"):] for column in self.groups["dispositions"]]
+        for key, row in zip(dispositions, self.group("dispositions")):
+            result["ever_" + key] = row
+            result[key] = self.column("admits_" + key)
+        for group in ("admits", "census"):
+            for column, row in zip(self.groups[group], self.group(group)):
+                result[column] = row
+
+        result["date"] = self.date
+        return result
+
+    def column(self, column: str, group: str = None) -> np.ndarray:
+        """One series, looked up in group or else in the first group holding it."""
+        groups: List[str] = [group] if group is not None else list(self.groups)
+        for name in groups:
+            if column in self.groups[name]:
+                return self.values[self.slices[name].start + self.groups[name].index(column)]
+        raise KeyError(column)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.day.nbytes + self.date.nbytes
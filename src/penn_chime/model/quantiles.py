@@ -0,0 +1,108 @@
+"""Quantiles.
+
+Streaming quantile estimates in constant memory.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+DEFAULT_COMPRESSION = 200
+
+
+class Digest:
+    """Streaming quantiles of many variables at once, in constant memory.
+
+    A merging digest, after the t-digest: each variable is summarized by at
+    most `compression` centroids (a mean and a weight), each covering an
+    equal share of the observations seen so far. `update` merges a chunk of
+    observations into the centroids; `quantiles` interpolates between them.
+    Memory is proportional to the number of variables times compression,
+    however many observations are added. Every variable is handled by the
+    same vectorized operations.
+
+    Tolerance: with the default compression of 200, the estimate of the q-th
+    percentile lies between the exact (q - 1)-th and (q + 1)-th percentiles
+    of the observations, that is within one percentage point of rank. The
+    error in rank shrinks in proportion to 1 / compression. Variables with a
+    single distinct value are exact to within rounding.
+
+    NaN observations are ignored, as by np.nanpercentile.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], compression: int = DEFAULT_COMPRESSION) -> None:
+        self.shape = tuple(shape)
+        self.compression = compression
+        n_variables = int(np.prod(self.shape))
+        # Sorted by mean within each row; unused centroids have weight 0
+        # and a nan mean, and sort last
+        self.means = np.full((n_variables, 0), np.nan)
+        self.weights = np.zeros((n_variables, 0))
+        self.count = 0
+
+    def update(self, values: np.ndarray) -> None:
+        """Add observations shaped (n_observations, *shape)."""
+        values = np.asarray(values, dtype="float")
+        n_variables = self.means.shape[0]
+        values = values.reshape(-1, n_variables).T
+
+        means = np.concatenate([self.means, values], axis=1)
+        weights = np.concatenate([self.weights, np.isfinite(values).astype("float")], axis=1)
+        order = np.argsort(means, axis=1, kind="stable")
+        means = np.take_along_axis(means, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+
+        # Each observation or centroid joins the centroid of its rank
+        total = weights.sum(axis=1, keepdims=True)
+        rank = np.cumsum(weights, axis=1)
+        rank -= 0.5 * weights
+        np.divide(rank, total, out=rank, where=total > 0.0)
+        bins = np.minimum((rank * self.compression).astype("int"), self.compression - 1)
+        bins += np.arange(n_variables)[:, None] * self.compression
+
+        means = np.where(weights > 0.0, means, 0.0)
+        size = n_variables * self.compression
+        self.weights = np.bincount(bins.ravel(), weights.ravel(), size).reshape(n_variables, -1)
+        sums = np.bincount(bins.ravel(), (weights * means).ravel(), size).reshape(n_variables, -1)
+        means = np.full_like(sums, np.nan)
+        np.divide(sums, self.weights, out=means, where=self.weights > 0.0)
+
+        # Move unused centroids last
+        order = np.argsort(means, axis=1, kind="stable")
+        self.means = np.take_along_axis(means, order, axis=1)
+        self.weights = np.take_along_axis(self.weights, order, axis=1)
+        self.count += values.shape[1]
+
+    def quantiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        """Estimates shaped (n_percentiles, *shape); nan for variables without observations."""
+        # Centroids sit at the middle of the ranks they cover
+        total = self.weights.sum(axis=1)
+        centers = np.cumsum(self.weights, axis=1) - 0.5 * self.weights
+        n_centroids = (self.weights > 0.0).sum(axis=1)
+        last = np.maximum(n_centroids - 1, 0)
+        rows = np.arange(self.means.shape[0])
+
+        result = []
+        for percentile in percentiles:
+            target = total * percentile / 100.0
+            # The centroids on either side of the target rank
+            right = (centers < target[:, None]).sum(axis=1)
+            right = np.minimum(right, last)
+            left = np.maximum(right - 1, 0)
+            x0, x1 = self.means[rows, left], self.means[rows, right]
+            c0, c1 = centers[rows, left], centers[rows, right]
+            span = c1 - c0
+            fraction = np.clip(
+                np.divide(target - c0, span, out=np.zeros_like(span), where=span > 0.0), 0.0, 1.0
+            )
+            estimate = x0 + fraction * (x1 - x0)
+            estimate[n_centroids == 0] = np.nan
+            result.append(estimate.reshape(self.shape))
+        return np.array(result)
+
+    @property
+    def nbytes(self) -> int:
+        return self.means.nbytes + self.weights.nbytes
@@ -6,15 +6,23 @@ constants.py `change_date`,
 
 from __future__ import annotations
 
+from collections import namedtuple
 from datetime import datetime, timedelta
+from fnmatch import fnmatchcase
+from hashlib import sha256
 from logging import INFO, basicConfig, getLogger
 from sys import stdout
-from typing import Dict, Tuple, Sequence, Optional
+from typing import Any, Dict, Tuple, Sequence, Optional, Union
 
 import numpy as np
 import pandas as pd
 
-from .parameters import Parameters
+from ..utils import cached_property
+from .length_of_stay import LengthOfStay, get_max_los, get_pmf
+from .optimizers import GridSearch, Optimizer
+from .parameters import Parameters, get_fields, get_lengths_of_stay
+from .projection import SUMMARY_KEYS, Projection
+from .workspace import Workspace, empty
 
 
 basicConfig(
@@ -25,19 +33,88 @@ basicConfig(
 logger = getLogger(__name__)
 
 
+MIN_DOUBLING_TIME = 1.0
+MAX_DOUBLING_TIME = 15.0
+
+# Length of stay distributions are convolved by FFT when their support times
+# the days projected exceeds FFT_COST times the transform's n log2 n
+FFT_COST = 2.0
+
+
+def project(p: Parameters, optimizer: Optional[Optimizer] = None) -> Projection:
+    """Project p, without ever writing to it.
+
+    Pass FrozenParameters to use the result as a cache entry: the
+    projection's `summary` holds the scalars, such as a fitted doubling_time,
+    that Sir would otherwise be needed for.
+    """
+    return Sir(p, optimizer).projection
+
+
+def resize(projection: Projection, p: Parameters) -> Optional[Projection]:
+    """Project p from a projection of p at another horizon, or None.
+
+    projection must be of parameters that differ from p in n_days at most.
+    When its fit holds for p.n_days (see Sir), a shorter horizon is the head
+    of its block, and a longer one continues its last susceptible, infected
+    and recovered, simulating only the days it lacks: either way, the same
+    values as project(p).
+    """
+    summary = projection.summary
+    if not summary["min_n_days"] <= p.n_days <= summary["max_n_days"]:
+        return None
+    i_day = int(summary["i_day"])
+    n_days = projection.day.shape[0] - i_day - 1
+    if p.n_days == n_days:
+        return projection
+    if p.n_days < n_days:
+        return projection.head(i_day + p.n_days + 1)
+
+    # The policy of gen_policy, for the steps after the last one simulated
+    before = projection.raw
+    pre_mitigation_days = i_day - (p.current_date - p.mitigation_date).days
+    pre_mitigation_days = min(max(pre_mitigation_days, 0), i_day + p.n_days)
+    steps = i_day + n_days
+    extended = sim_sir(
+        before["susceptible"][-1],
+        before["infected"][-1],
+        before["recovered"][-1],
+        summary["gamma"],
+        int(before["day"][-1]),
+        [
+            (summary["beta"], max(pre_mitigation_days - steps, 0)),
+            (summary["beta_t"], i_day + p.n_days - max(pre_mitigation_days, steps)),
+        ],
+        population=before["susceptible"][0] + before["infected"][0] + before["recovered"][0],
+    )
+    raw = {
+        key: np.concatenate((before[key], extended[key][1:]))
+        for key in ("day", "susceptible", "infected", "recovered", "ever_infected")
+    }
+    for stage in STAGES:
+        if stage.run is not None:
+            stage.run(raw, p)
+    raw["date"] = raw["day"].astype("timedelta64[D]") + np.datetime64(p.current_date)
+
+    result = Projection.from_raw(raw, p.dispositions)
+    result.summary = dict(summary)
+    result.digests = dict(projection.digests)
+    result.fit = projection.fit
+    return result
+
+
 class Sir:
 
-    def __init__(self, p: Parameters):
+    def __init__(self, p: Parameters, optimizer: Optional[Optimizer] = None):
+        if optimizer is None:
+            optimizer = GridSearch()
 
         self.rates = {
             key: d.rate
             for key, d in p.dispositions.items()
         }
 
-        self.days = {
-            key: d.days
-            for key, d in p.dispositions.items()
-        }
+        self.days = get_lengths_of_stay(p)
 
         self.keys = ("susceptible", "infected", "recovered")
 
@@ -58,11 +135,17 @@ class Sir:
         self.infected = infected
         self.recovered = p.recovered
 
+        # The horizons this fit holds for, the ones resize may serve
+        self.min_n_days = self.max_n_days = p.n_days
+        # The doubling time fit, when date_first_hospitalized is given
+        self.fit = None
+
         if p.date_first_hospitalized is None and p.doubling_time is not None:
             # Back-projecting to when the first hospitalized case would have been admitted
             logger.info('Using doubling_time: %s', p.doubling_time)
 
-            intrinsic_growth_rate = get_growth_rate(p.doubling_time)
+            self.doubling_time = p.doubling_time
+            intrinsic_growth_rate = get_growth_rate(self.doubling_time)
             self.beta = get_beta(intrinsic_growth_rate,  gamma, self.susceptible, 0.0)
             self.beta_t = get_beta(intrinsic_growth_rate, self.gamma, self.susceptible, p.relative_contact_rate)
 
@@ -75,24 +158,15 @@ class Sir:
 
                 logger.info('Set i_day = %s', i_day)
             else:
-                projections = {}
-                best_i_day = -1
-                best_i_day_loss = float('inf')
-                for i_day in range(p.n_days):
-                    self.i_day = i_day
-                    raw = self.run_projection(p, self.gen_policy(p))
-
-                    # Don't fit against results that put the peak before the present day
-                    if raw["census_hospitalized"].argmax() < i_day:
-                        continue
-
-                    loss = get_loss(raw["census_hospitalized"][i_day], p.current_hospitalized)
-                    if loss < best_i_day_loss:
-                        best_i_day_loss = loss
-                        best_i_day = i_day
-                        self.raw = raw
+                self.i_day = self.get_argmin_i_day(p)
+                self.raw = self.run_projection(p, self.gen_policy(p))
 
-                self.i_day = best_i_day
+                # Losses fall to i_day and rise after it: any horizon
+                # keeping i_day as a candidate fits it, unless it was the
+                # last candidate and the losses might still be falling
+                if self.i_day < p.n_days - 1:
+                    self.min_n_days = self.i_day + 1
+                    self.max_n_days = np.inf
 
             logger.info(
                 'Estimated date_first_hospitalized: %s; current_date: %s; i_day: %s',
@@ -104,6 +178,9 @@ class Sir:
             # Fitting spread parameter to observed hospital census (dates of 1 patient and today)
             self.i_day = (p.current_date - p.date_first_hospitalized).days
             self.current_hospitalized = p.current_hospitalized
+            # Only the days up to the present are fit
+            self.min_n_days = 1
+            self.max_n_days = np.inf
             logger.info(
                 'Using date_first_hospitalized: %s; current_date: %s; i_day: %s, current_hospitalized: %s',
                 p.date_first_hospitalized,
@@ -112,19 +189,21 @@ class Sir:
                 p.current_hospitalized,
             )
 
-            # Make an initial coarse estimate
-            dts = np.linspace(1, 15, 15)
-            min_loss = self.get_argmin_doubling_time(p, dts)
-
-            # Refine the coarse estimate
-            for iteration in range(4):
-                dts = np.linspace(dts[min_loss-1], dts[min_loss+1], 15)
-                min_loss = self.get_argmin_doubling_time(p, dts)
-
-            p.doubling_time = dts[min_loss]
+            workspace = Workspace()
+            self.fit = optimizer(
+                lambda dts: self.get_doubling_time_losses(p, dts, workspace),
+                MIN_DOUBLING_TIME,
+                MAX_DOUBLING_TIME,
+            )
+            # Kept on the model: p is never written to
+            self.doubling_time = self.fit.x
 
-            logger.info('Estimated doubling_time: %s', p.doubling_time)
-            intrinsic_growth_rate = get_growth_rate(p.doubling_time)
+            logger.info(
+                'Estimated doubling_time: %s; evaluations: %s',
+                self.doubling_time,
+                self.fit.n_evaluations,
+            )
+            intrinsic_growth_rate = get_growth_rate(self.doubling_time)
             self.beta = get_beta(intrinsic_growth_rate, self.gamma, self.susceptible, 0.0)
             self.beta_t = get_beta(intrinsic_growth_rate, self.gamma, self.susceptible, p.relative_contact_rate)
             self.raw = self.run_projection(p, self.gen_policy(p))
@@ -139,36 +218,15 @@ class Sir:
             raise AssertionError('doubling_time or date_first_hospitalized must be provided.')
 
         self.raw["date"] = self.raw["day"].astype("timedelta64[D]") + np.datetime64(p.current_date)
-
-        self.raw_df = pd.DataFrame(data=self.raw)
-        self.dispositions_df = pd.DataFrame(data={
-            'day': self.raw['day'],
-            'date': self.raw['date'],
-            'ever_hospitalized': self.raw['ever_hospitalized'],
-            'ever_icu': self.raw['ever_icu'],
-            'ever_ventilated': self.raw['ever_ventilated'],
-        })
-        self.admits_df = pd.DataFrame(data={
-            'day': self.raw['day'],
-            'date': self.raw['date'],
-            'admits_hospitalized': self.raw['admits_hospitalized'],
-            'admits_icu': self.raw['admits_icu'],
-            'admits_ventilated': self.raw['admits_ventilated'],
-        })
-        self.census_df = pd.DataFrame(data={
-            'day': self.raw['day'],
-            'date': self.raw['date'],
-            'census_hospitalized': self.raw['census_hospitalized'],
-            'census_icu': self.raw['census_icu'],
-            'census_ventilated': self.raw['census_ventilated'],
-        })
+        self.projection = Projection.from_raw(self.raw, self.rates.keys())
+        self.raw = self.projection.raw
 
         logger.info('len(np.arange(-i_day, n_days+1)): %s', len(np.arange(-self.i_day, p.n_days+1)))
-        logger.info('len(raw_df): %s', len(self.raw_df))
+        logger.info('len(raw): %s', len(self.raw['day']))
 
-        self.infected = self.raw_df['infected'].values[self.i_day]
-        self.susceptible = self.raw_df['susceptible'].values[self.i_day]
-        self.recovered = self.raw_df['recovered'].values[self.i_day]
+        self.infected = self.raw['infected'][self.i_day]
+        self.susceptible = self.raw['susceptible'][self.i_day]
+        self.recovered = self.raw['recovered'][self.i_day]
 
         self.intrinsic_growth_rate = intrinsic_growth_rate
 
@@ -180,35 +238,145 @@ class Sir:
             self.beta_t * susceptible - gamma + 1)
         self.doubling_time_t = doubling_time_t
 
-        self.sim_sir_w_date_df = build_sim_sir_w_date_df(self.raw_df, p.current_date, self.keys)
-
-        self.sim_sir_w_date_floor_df = build_floor_df(self.sim_sir_w_date_df, self.keys, "")
-        self.admits_floor_df = build_floor_df(self.admits_df, p.dispositions.keys(), "admits_")
-        self.census_floor_df = build_floor_df(self.census_df, p.dispositions.keys(), "census_")
-
-        self.daily_growth_rate = get_growth_rate(p.doubling_time)
+        self.daily_growth_rate = get_growth_rate(self.doubling_time)
         self.daily_growth_rate_t = get_growth_rate(self.doubling_time_t)
 
-    def get_argmin_doubling_time(self, p: Parameters, dts):
-        losses = np.full(dts.shape[0], np.inf)
-        for i, i_dt in enumerate(dts):
-            intrinsic_growth_rate = get_growth_rate(i_dt)
-            self.beta = get_beta(intrinsic_growth_rate, self.gamma, self.susceptible, 0.0)
-            self.beta_t = get_beta(intrinsic_growth_rate, self.gamma, self.susceptible, p.relative_contact_rate)
-
-            raw = self.run_projection(p, self.gen_policy(p))
-
-            # Skip values the would put the fit past peak
-            peak_admits_day = raw["admits_hospitalized"].argmax()
-            if peak_admits_day < 0:
-                continue
-
-            predicted = raw["census_hospitalized"][self.i_day]
-            loss = get_loss(self.current_hospitalized, predicted)
-            losses[i] = loss
-
-        min_loss = pd.Series(losses).argmin()
-        return min_loss
+        self.projection.summary = {
+            key: float(getattr(self, key))
+            for key in SUMMARY_KEYS
+        }
+        self.projection.digests = get_digests(p)
+        self.projection.fit = self.fit
+
+    @classmethod
+    def from_projection(cls, projection: Projection, p: Parameters) -> Sir:
+        """A model of p with the results of an earlier projection of p, without fitting again."""
+        self = cls.__new__(cls)
+        self.rates = {key: d.rate for key, d in p.dispositions.items()}
+        self.days = get_lengths_of_stay(p)
+        self.keys = ("susceptible", "infected", "recovered")
+        self.current_hospitalized = p.current_hospitalized
+        self.population = p.population
+        self.projection = projection
+        self.raw = projection.raw
+        self.fit = projection.fit
+        for key, value in projection.summary.items():
+            setattr(self, key, value)
+        self.i_day = int(self.i_day)
+        return self
+
+    # The frames below are views of self.projection, built on first access
+
+    @cached_property
+    def raw_df(self) -> pd.DataFrame:
+        return pd.DataFrame(data=self.raw)
+
+    @cached_property
+    def dispositions_df(self) -> pd.DataFrame:
+        return self.projection.frame("dispositions")
+
+    @cached_property
+    def admits_df(self) -> pd.DataFrame:
+        return self.projection.frame("admits")
+
+    @cached_property
+    def census_df(self) -> pd.DataFrame:
+        return self.projection.frame("census")
+
+    @cached_property
+    def sim_sir_w_date_df(self) -> pd.DataFrame:
+        return self.projection.frame("sir")
+
+    @cached_property
+    def sim_sir_w_date_floor_df(self) -> pd.DataFrame:
+        return self.projection.frame("sir_floor")
+
+    @cached_property
+    def admits_floor_df(self) -> pd.DataFrame:
+        return self.projection.frame("admits_floor")
+
+    @cached_property
+    def census_floor_df(self) -> pd.DataFrame:
+        return self.projection.frame("census_floor")
+
+    def get_doubling_time_losses(
+        self,
+        p: Parameters,
+        dts: np.ndarray,
+        workspace: Optional[Workspace] = None,
+    ) -> np.ndarray:
+        """Evaluate every candidate doubling time in one batched projection."""
+        intrinsic_growth_rates = np.array([get_growth_rate(i_dt) for i_dt in dts])
+        self.beta = get_beta(intrinsic_growth_rates, self.gamma, self.susceptible, 0.0)
+        self.beta_t = get_beta(intrinsic_growth_rates, self.gamma, self.susceptible, p.relative_contact_rate)
+
+        # Only the census on the present day is compared
+        raw = self.run_fit_projection(p, self.gen_policy(p), self.i_day, workspace)
+
+        predicted = raw["census_hospitalized"][:, self.i_day]
+        losses = get_loss(self.current_hospitalized, predicted)
+
+        # Skip values the would put the fit past peak
+        peak_admits_day = raw["admits_hospitalized"].argmax(axis=1)
+        losses[peak_admits_day < 0] = np.inf
+        return losses
+
+    def get_argmin_i_day(self, p: Parameters, chunk_size: int = 256) -> int:
+        """Find the i_day whose census best matches current_hospitalized.
+
+        Same result as running `run_projection` with `gen_policy` for every
+        i_day in range(p.n_days), but every candidate starts from the same
+        seed and differs only in the day mitigation begins, so a chunk of
+        candidates is stepped together as one batch with a per-candidate
+        beta schedule.
+        """
+        mitigation_day = -(p.current_date - p.mitigation_date).days
+        workspace = Workspace(min(chunk_size, p.n_days), 2 * p.n_days)
+
+        best_i_day = -1
+        best_i_day_loss = float('inf')
+        for start in range(0, p.n_days, chunk_size):
+            i_days = np.arange(start, min(start + chunk_size, p.n_days))
+            total_days = i_days + p.n_days
+            pre_mitigation_days = np.clip(i_days + mitigation_day, 0, total_days)
+
+            n_steps = total_days[-1]
+            days = workspace.get("days", n_steps + 1, dtype="int")
+            days[:] = np.arange(n_steps + 1)
+            mask = workspace.get("mask", i_days.shape[0], n_steps + 1, dtype="bool")
+
+            # One beta per candidate and day: beta until mitigation, then beta_t
+            schedule = workspace.get("schedule", i_days.shape[0], n_steps)
+            np.less(days[:-1], pre_mitigation_days[:, None], out=mask[:, :-1])
+            schedule[:] = self.beta_t
+            np.copyto(schedule, self.beta, where=mask[:, :-1])
+            raw = self.run_fit_projection(p, [(schedule, n_steps)], workspace=workspace)
+
+            # Each candidate only projects i_day + n_days days
+            census = workspace.get("census", i_days.shape[0], n_steps + 1)
+            census[:] = -np.inf
+            np.less_equal(days, total_days[:, None], out=mask)
+            np.copyto(census, raw["census_hospitalized"], where=mask)
+            with np.errstate(over="ignore"):
+                losses = get_loss(
+                    census[np.arange(i_days.shape[0]), i_days],
+                    float(p.current_hospitalized),
+                )
+
+            # Don't fit against results that put the peak before the present day
+            losses[census.argmax(axis=1) < i_days] = np.inf
+
+            k = losses.argmin()
+            if losses[k] < best_i_day_loss:
+                best_i_day_loss = losses[k]
+                best_i_day = int(i_days[k])
+
+        if best_i_day < 0:
+            raise ValueError(
+                f"No i_day before the census peak matches current_hospitalized"
+                f" {p.current_hospitalized}."
+            )
+        return best_i_day
 
     def gen_policy(self, p: Parameters) -> Sequence[Tuple[float, int]]:
         if p.mitigation_date is not None:
@@ -222,6 +390,8 @@ class Sir:
             mitigation_day = -self.i_day
 
         pre_mitigation_days = self.i_day + mitigation_day
+        if pre_mitigation_days > total_days:
+            pre_mitigation_days = total_days
         post_mitigation_days = total_days - pre_mitigation_days
 
         return [
@@ -239,9 +409,46 @@ class Sir:
             policy
         )
 
-        calculate_dispositions(raw, self.rates, p.market_share)
-        calculate_admits(raw, self.rates)
-        calculate_census(raw, self.days)
+        for stage in STAGES:
+            if stage.run is not None:
+                stage.run(raw, p)
+
+        return raw
+
+    def run_fit_projection(
+        self,
+        p: Parameters,
+        policy: Sequence[Tuple[np.ndarray, int]],
+        n_days: Optional[int] = None,
+        workspace: Optional[Workspace] = None,
+    ):
+        """Project only what the fitting losses read, for a batch of policies.
+
+        Only the hospitalized disposition is calculated, and the simulation
+        stops after n_days steps when given. Days are counted from the seed
+        rather than the present. The full set of dispositions is left to
+        `run_projection` for the winning parameters.
+
+        With a workspace, the arrays returned are its buffers and are only
+        valid until the next fit projection into it.
+        """
+        if n_days is not None:
+            policy = truncate_policy(policy, n_days)
+
+        raw = sim_sir_batch(
+            self.susceptible,
+            self.infected,
+            p.recovered,
+            self.gamma,
+            0,
+            policy,
+            workspace,
+        )
+
+        rates = {"hospitalized": self.rates["hospitalized"]}
+        calculate_dispositions(raw, rates, p.market_share, workspace)
+        calculate_admits(raw, rates, workspace)
+        calculate_census(raw, {"hospitalized": self.days["hospitalized"]}, workspace)
 
         return raw
 
@@ -291,14 +498,23 @@ def sir(
 
 
 def sim_sir(
-    s: float, i: float, r: float, gamma: float, i_day: int, policies: Sequence[Tuple[float, int]]
+    s: float,
+    i: float,
+    r: float,
+    gamma: float,
+    i_day: int,
+    policies: Sequence[Tuple[float, int]],
+    population: Optional[float] = None,
 ):
     """Simulate SIR model forward in time, returning a dictionary of daily arrays
     Parameter order has changed to allow multiple (beta, n_days)
     to reflect multiple changing social distancing policies.
+
+    Every step rescales to population, s + i + r by default; pass the
+    population of the original seed to continue an earlier simulation.
     """
     s, i, r = (float(v) for v in (s, i, r))
-    n = s + i + r
+    n = s + i + r if population is None else float(population)
     d = i_day
 
     total_days = 1
@@ -335,6 +551,134 @@ def sim_sir(
     }
 
 
+def sim_sir_batch(
+    s: np.ndarray,
+    i: np.ndarray,
+    r: np.ndarray,
+    gamma: np.ndarray,
+    i_day: int,
+    policies: Sequence[Tuple[np.ndarray, int]],
+    workspace: Optional[Workspace] = None,
+    population: Optional[np.ndarray] = None,
+):
+    """Simulate many SIR scenarios forward in time at once.
+
+    Takes the same arguments as `sim_sir`, but `s`, `i`, `r`, `gamma` and the
+    beta of each policy may be arrays holding one value per scenario (scalars
+    are broadcast). A beta may also be an (n_scenarios, n_days) array with a
+    separate beta for every scenario and day of the policy. All scenarios
+    share `i_day` and the policy lengths, and are stepped together, so the
+    Python loop runs once per day rather than once per day per scenario.
+
+    Returns a dictionary of arrays shaped (n_scenarios, n_days), except for
+    "day" which is shared by all scenarios. Row k matches `sim_sir` run on
+    the k-th scenario. With a workspace, the arrays are views of its buffers
+    and nothing is allocated per day or per call.
+
+    Every step rescales to `population`, s + i + r by default; pass the
+    population of the original seed to continue an earlier simulation from
+    one of its days exactly.
+    """
+    n_scenarios = max(
+        np.shape(v)[0] if np.ndim(v) else 1
+        for v in (s, i, r, gamma, *(beta for beta, _ in policies))
+    )
+
+    total_days = 1
+    for _, days in policies:
+        total_days += days
+
+    d_a = empty(workspace, "day", total_days, dtype="int")
+    # Stored day by day, so that each step reads and writes contiguous rows,
+    # and returned transposed
+    s_a = empty(workspace, "susceptible", total_days, n_scenarios)
+    i_a = empty(workspace, "infected", total_days, n_scenarios)
+    r_a = empty(workspace, "recovered", total_days, n_scenarios)
+    ever_a = empty(workspace, "ever_infected", n_scenarios, total_days)
+    n = empty(workspace, "n", n_scenarios)
+    a = empty(workspace, "a", n_scenarios)
+    b = empty(workspace, "b", n_scenarios)
+
+    d_a[:] = np.arange(i_day, i_day + total_days)
+    s_a[0] = s
+    i_a[0] = i
+    r_a[0] = r
+    if population is None:
+        np.add(s_a[0], i_a[0], out=n)
+        n += r_a[0]
+    else:
+        n[:] = population
+
+    index = 0
+    for beta, n_days in policies:
+        beta = np.asarray(beta, dtype="float")
+        for day in range(n_days):
+            sir_into(
+                s_a[index],
+                i_a[index],
+                r_a[index],
+                beta[:, day] if beta.ndim == 2 else beta,
+                gamma,
+                n,
+                s_a[index + 1],
+                i_a[index + 1],
+                r_a[index + 1],
+                a,
+                b,
+            )
+            index += 1
+
+    np.add(i_a.T, r_a.T, out=ever_a)
+    return {
+        "day": d_a,
+        "susceptible": s_a.T,
+        "infected": i_a.T,
+        "recovered": r_a.T,
+        "ever_infected": ever_a
+    }
+
+
+def sir_into(s, i, r, beta, gamma, n, s_n, i_n, r_n, a, b):
+    """The SIR model, one time step, written into s_n, i_n and r_n.
+
+    Performs the same floating point operations as `sir`, using a and b as
+    scratch space so that no temporaries are allocated.
+    """
+    np.negative(beta, out=a)
+    a *= s
+    a *= i
+    np.add(a, s, out=s_n)
+
+    np.multiply(beta, s, out=a)
+    a *= i
+    np.multiply(gamma, i, out=b)
+    a -= b
+    np.add(a, i, out=i_n)
+
+    np.add(b, r, out=r_n)
+
+    np.add(s_n, i_n, out=a)
+    a += r_n
+    np.divide(n, a, out=a)
+    s_n *= a
+    i_n *= a
+    r_n *= a
+
+
+def truncate_policy(
+    policies: Sequence[Tuple[float, int]], n_days: int
+) -> Sequence[Tuple[float, int]]:
+    """Cut policies short so they cover at most n_days days in total."""
+    result = []
+    for beta, days in policies:
+        days = min(days, n_days)
+        if np.ndim(beta) == 2:
+            beta = beta[:, :days]
+        result.append((beta, days))
+        n_days -= days
+    return result
+
+
 def build_sim_sir_w_date_df(
     raw_df: pd.DataFrame,
     current_date: datetime,
@@ -367,34 +711,281 @@ def calculate_dispositions(
     raw: Dict,
     rates: Dict[str, float],
     market_share: float,
+    workspace: Optional[Workspace] = None,
 ):
-    """Build dispositions dataframe of patients adjusted by rate and market_share."""
-    for key, rate in rates.items():
-        raw["ever_" + key] = raw["ever_infected"] * rate * market_share
-        raw[key] = raw["ever_infected"] * rate * market_share
-
+    """Build dispositions dataframe of patients adjusted by rate and market_share.
 
-def calculate_admits(raw: Dict, rates):
-    """Build admits dataframe from dispositions."""
-    for key in rates.keys():
-        ever = raw["ever_" + key]
-        admit = np.empty_like(ever)
-        admit[0] = np.nan
-        admit[1:] = ever[1:] - ever[:-1]
-        raw["admits_"+key] = admit
-        raw[key] = admit
+    Every disposition is computed at once, as one (n_dispositions, ...,
+    n_days) block of which raw["ever_<disposition>"] are views.
+    """
+    ever_infected = raw["ever_infected"]
+    keys = list(rates)
+    rate = np.array([rates[key] for key in keys], dtype="float")
+    ever = empty(workspace, "ever_dispositions", len(keys), *ever_infected.shape)
+    np.multiply(ever_infected, rate.reshape((-1,) + (1,) * ever_infected.ndim), out=ever)
+    ever *= market_share
+    for key, row in zip(keys, ever):
+        raw["ever_" + key] = row
+        raw[key] = row
+
+
+def calculate_admits(raw: Dict, rates, workspace: Optional[Workspace] = None):
+    """Build admits dataframe from dispositions, for every disposition at once."""
+    keys = list(rates)
+    ever = stack(raw, "ever_", keys, workspace)
+    admits = empty(workspace, "admits_dispositions", *ever.shape)
+    admits[..., 0] = np.nan
+    np.subtract(ever[..., 1:], ever[..., :-1], out=admits[..., 1:])
+    for key, row in zip(keys, admits):
+        raw["admits_" + key] = row
+        raw[key] = row
 
 
 def calculate_census(
     raw: Dict,
-    lengths_of_stay: Dict[str, int],
+    lengths_of_stay: Dict[str, Union[int, LengthOfStay]],
+    workspace: Optional[Workspace] = None,
 ):
-    """Average Length of Stay for each disposition of COVID-19 case (total guesses)"""
+    """Average Length of Stay for each disposition of COVID-19 case (total guesses)
+
+    Admits of every disposition are summed in one pass, then differenced
+    one distinct length of stay at a time. Dispositions whose length of
+    stay is a LengthOfStay distribution are convolved with it instead.
+    """
+    keys = list(lengths_of_stay)
     n_days = raw["day"].shape[0]
-    for key, los in lengths_of_stay.items():
-        cumsum = np.empty(n_days + los)
-        cumsum[:los+1] = 0.0
-        cumsum[los+1:] = raw["admits_" + key][1:].cumsum()
+    los = [lengths_of_stay[key] for key in keys]
+    max_los = max(get_max_los(value) for value in los)
+
+    admits = stack(raw, "admits_", keys, workspace)
+    shape = admits.shape[:-1]
+    cumsum = empty(workspace, "cumsum", *shape, n_days + max_los)
+    cumsum[..., :max_los + 1] = 0.0
+    np.cumsum(admits[..., 1:], axis=-1, out=cumsum[..., max_los + 1:])
+
+    census = empty(workspace, "census_dispositions", *shape, n_days)
+    if any(isinstance(value, LengthOfStay) for value in los):
+        for k, value in enumerate(los):
+            get_census(cumsum[k], value if isinstance(value, LengthOfStay) else [value], max_los, census[k])
+    else:
+        get_census(cumsum, np.array(los, dtype="int"), max_los, census)
+    for key, row in zip(keys, census):
+        raw["census_" + key] = row
+
+
+def stack(raw: Dict, prefix: str, keys: Sequence[str], workspace: Optional[Workspace] = None) -> np.ndarray:
+    """raw[prefix + key] of each key as one (n_keys, ...) block."""
+    first = raw[prefix + keys[0]]
+    block = empty(workspace, prefix + "stack", len(keys), *first.shape)
+    for k, key in enumerate(keys):
+        block[k] = raw[prefix + key]
+    return block
+
+
+def calculate_replicates(
+    ever_infected: np.ndarray,
+    rate: np.ndarray,
+    market_share: np.ndarray,
+    los: Union[np.ndarray, LengthOfStay],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ever, admits and census of one disposition, with a rate and length of stay per replicate.
+
+    ever_infected is shaped (n_replicates, ..., n_days). Performs the same
+    operations as calculate_dispositions, calculate_admits and
+    calculate_census do for a single replicate. A LengthOfStay as los is
+    every replicate's.
+    """
+    ever = get_ever(ever_infected, rate, market_share)
+    admits = get_admits(ever)
+    max_los = get_max_los(los)
+    cumsum = np.zeros(admits.shape[:-1] + (admits.shape[-1] + max_los,))
+    np.cumsum(admits[..., 1:], axis=-1, out=cumsum[..., max_los + 1:])
+    return ever, admits, get_census(cumsum, los, max_los)
+
+
+def get_ever(ever_infected: np.ndarray, rate: np.ndarray, market_share: np.ndarray) -> np.ndarray:
+    shape = (-1,) + (1,) * (ever_infected.ndim - 1)
+    ever = ever_infected * np.reshape(rate, shape)
+    ever *= np.reshape(market_share, shape)
+    return ever
+
+
+def get_admits(ever: np.ndarray) -> np.ndarray:
+    admits = np.empty_like(ever)
+    admits[..., 0] = np.nan
+    np.subtract(ever[..., 1:], ever[..., :-1], out=admits[..., 1:])
+    return admits
+
+
+def get_census(
+    cumsum: np.ndarray,
+    los: Union[np.ndarray, LengthOfStay],
+    max_los: int,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Census from admits summed since day 0, behind max_los days of zeros.
+
+    census[t] = cumsum[t + max_los] - cumsum[t + max_los - los], computed one
+    length of stay at a time; los has one value per row of cumsum. When los
+    is a LengthOfStay, every row is convolved with it (see convolve_census).
+    """
+    n_days = cumsum.shape[-1] - max_los
+    census = np.empty(cumsum.shape[:-1] + (n_days,)) if out is None else out
+    if isinstance(los, LengthOfStay):
+        return convolve_census(cumsum, get_pmf(los), max_los, census)
+    los = np.asarray(los).ravel()
+    for value in np.unique(los):
+        rows = los == value
+        if rows.all():
+            np.subtract(
+                cumsum[..., max_los:],
+                cumsum[..., max_los - value:max_los - value + n_days],
+                out=census,
+            )
+        else:
+            census[rows] = (
+                cumsum[rows, ..., max_los:]
+                - cumsum[rows, ..., max_los - value:max_los - value + n_days]
+            )
+    return census
+
+
+def convolve_census(cumsum: np.ndarray, pmf: np.ndarray, max_los: int, out: np.ndarray) -> np.ndarray:
+    """Census of stays of k days with probability pmf[k - 1], into out.
 
-        census = cumsum[los:] - cumsum[:-los]
-        raw["census_" + key] = census
+    The census of each length of stay, as get_census has it, weighted by its
+    probability: census[t] = sum(pmf[k - 1] * (cumsum[t + max_los] -
+    cumsum[t + max_los - k])), the convolution of the admits with the
+    probability of still staying. Long supports over long horizons are
+    convolved by FFT, along the last axis of every row at once.
+    """
+    support = pmf.shape[0]
+    n_days = out.shape[-1]
+    size = 1 << int(np.ceil(np.log2(cumsum.shape[-1] + support)))
+    current = cumsum[..., max_los:]
+    if support * cumsum.shape[-1] <= FFT_COST * size * np.log2(size):
+        out[:] = 0.0
+        stayed = np.empty_like(out)
+        for k in range(1, support + 1):
+            np.subtract(current, cumsum[..., max_los - k:max_los - k + n_days], out=stayed)
+            stayed *= pmf[k - 1]
+            out += stayed
+        return out
+
+    kernel = np.zeros(support + 1)
+    kernel[1:] = pmf
+    left = np.fft.irfft(np.fft.rfft(cumsum, size) * np.fft.rfft(kernel, size), size)
+    np.multiply(current, pmf.sum(), out=out)
+    out -= left[..., max_los:max_los + n_days]
+    # Rounding can leave days without admits just below zero
+    return np.maximum(out, 0.0, out=out)
+
+
+def run_dispositions(raw: Dict, p: Parameters) -> None:
+    calculate_dispositions(raw, {key: d.rate for key, d in p.dispositions.items()}, p.market_share)
+
+
+def run_admits(raw: Dict, p: Parameters) -> None:
+    calculate_admits(raw, {key: d.rate for key, d in p.dispositions.items()})
+
+
+def run_census(raw: Dict, p: Parameters) -> None:
+    calculate_census(raw, get_lengths_of_stay(p))
+
+
+Stage = namedtuple("Stage", ("name", "fields", "run"))
+
+# The stages of a projection, in order, with the fields of the parameters
+# (see get_fields) each one reads, as patterns: a field belongs to the first
+# stage matching it. Changing a field recomputes its stage and the ones
+# after it. Sir fits and simulates the first stage, and the others run
+# on raw.
+STAGES = (
+    Stage("sir", (
+        "current_date",
+        "current_hospitalized",
+        "date_first_hospitalized",
+        "doubling_time",
+        "infectious_days",
+        "market_share",
+        "mitigation_date",
+        "n_days",
+        "population",
+        "recovered",
+        "region",
+        "relative_contact_rate",
+        # Seeds the infected and fits i_day or the doubling time
+        "hospitalized.*",
+    ), None),
+    Stage("dispositions", ("*.rate",), run_dispositions),
+    Stage("admits", (), run_admits),
+    Stage("census", ("*.days", "*.length_of_stay"), run_census),
+)
+
+# Fields only the charts read
+VIEW_FIELDS = ("max_y_axis",)
+
+
+def get_stage(field: str) -> Optional[str]:
+    """The stage a field belongs to, or None for VIEW_FIELDS; raises KeyError for others."""
+    if field in VIEW_FIELDS:
+        return None
+    for stage in STAGES:
+        if any(fnmatchcase(field, pattern) for pattern in stage.fields):
+            return stage.name
+    raise KeyError(f"{field} belongs to no stage.")
+
+
+def get_digests(p: Any) -> Dict[str, str]:
+    """Hex sha256 of the fields of each stage and the ones before it.
+
+    Leaves out n_days, so projections that resize can serve each other
+    share their digests.
+    """
+    fields = get_fields(p)
+    stages = {field: get_stage(field) for field in fields}
+    digests = {}
+    key: list = []
+    for stage in STAGES:
+        key.extend(sorted(
+            (field, value)
+            for field, value in fields.items()
+            if stages[field] == stage.name and field != "n_days"
+        ))
+        digests[stage.name] = sha256(repr(key).encode()).hexdigest()
+    return digests
+
+
+def restage(projection: Projection, p: Parameters) -> Projection:
+    """Project p from a projection whose sir stage p shares.
+
+    Only the stages after the first one whose digest changed are run, on
+    the series the projection has for the ones before it; the projection
+    itself when none changed.
+    """
+    digests = get_digests(p)
+    if digests["sir"] != projection.digests["sir"]:
+        raise ValueError("Projections must share the sir stage.")
+    changed = [stage.name for stage in STAGES if digests[stage.name] != projection.digests[stage.name]]
+    if not changed:
+        return projection
+
+    before = projection.raw
+    names = [stage.name for stage in STAGES]
+    start = names.index(changed[0])
+    raw = {
+        key: before[key]
+        for key in ("day", "susceptible", "infected", "recovered", "ever_infected", "date")
+    }
+    for stage in STAGES[1:start]:
+        prefix = "ever_" if stage.name == "dispositions" else stage.name + "_"
+        for key in p.dispositions:
+            raw[prefix + key] = before[prefix + key]
+    for stage in STAGES[start:]:
+        stage.run(raw, p)
+
+    result = Projection.from_raw(raw, p.dispositions)
+    result.summary = dict(projection.summary)
+    result.digests = digests
+    result.fit = projection.fit
+    return result
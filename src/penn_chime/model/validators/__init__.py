@@ -1,6 +1,6 @@
 """the callable validator design pattern"""
 
-from ...constants import EPSILON
+from ...constants import DISPOSITIONS, EPSILON
 from .validators import (
     OptionalValue as ValOptionalValue,
     Bounded as ValBounded,
@@ -9,6 +9,8 @@ from .validators import (
     Date as ValDate,
     OptionalDate as ValOptionalDate,
     ValDisposition as ValValDisposition,
+    OptionalDispositions as ValOptionalDispositions,
+    OptionalLengthsOfStay as ValOptionalLengthsOfStay,
 )
 
 OptionalValue = ValOptionalValue()
@@ -20,5 +22,7 @@ Rate = ValRate()
 Date = ValDate()
 OptionalDate = ValOptionalDate()
 ValDisposition = ValValDisposition()
+OptionalDispositions = ValOptionalDispositions(reserved=DISPOSITIONS)
+OptionalLengthsOfStay = ValOptionalLengthsOfStay()
 # # rolling a custom validator for doubling time in case DS wants to add upper bound
 # DoublingTime = OptionalBounded(lower_bound=0-EPSILON, upper_bound=None)
@@ -2,6 +2,8 @@
 
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 class Validator(ABC):
     def __set_name__(self, owner, name):
         self.private_name = f"_{name}"
@@ -13,3 +15,25 @@ class Validator(ABC):
     @abstractmethod
     def validate(self, key, value):
         pass
+
+    def validate_array(self, key, values):
+        """The error of each value, or '' where it is valid.
+
+        Applies validate to one value at a time; validators override this
+        with array operations following the same rules.
+        """
+        errors = np.full(len(values), "", dtype="object")
+        for k, value in enumerate(values):
+            try:
+                self.validate(key, value)
+            except (TypeError, ValueError) as e:
+                errors[k] = str(e)
+        return errors
+
+
+def get_errors(key, values, invalid, message):
+    """'' for each value, or message formatted with key and value where invalid."""
+    errors = np.full(len(values), "", dtype="object")
+    for k in np.flatnonzero(invalid):
+        errors[k] = message.format(key=key, value=values[k])
+    return errors
@@ -3,7 +3,10 @@
 from typing import Optional
 from datetime import date
 
-from .base import Validator
+import numpy as np
+
+from ..length_of_stay import Histogram, LengthOfStay
+from .base import Validator, get_errors
 
 EPSILON = 1.e-7
 
@@ -40,6 +43,23 @@ class Bounded(Validator):
            or (self.lower_bound is not None and value < self.lower_bound):
             raise ValueError(f"{key}: {value} needs to be {self.message[(self.lower_bound, self.upper_bound)]}.")
 
+    def validate_array(self, key, values):
+        """Values are numbers, with nan for None."""
+        values = np.asarray(values, dtype="float")
+        errors = self.validate_missing(key, values)
+        invalid = np.zeros(values.shape, dtype="bool")
+        with np.errstate(invalid="ignore"):
+            if self.upper_bound is not None:
+                invalid |= values > self.upper_bound
+            if self.lower_bound is not None:
+                invalid |= values < self.lower_bound
+        message = "{key}: {value} needs to be " + self.message[(self.lower_bound, self.upper_bound)] + "."
+        out_of_bounds = get_errors(key, values, invalid, message)
+        return np.where(errors == "", out_of_bounds, errors)
+
+    def validate_missing(self, key, values):
+        return get_errors(key, values, np.isnan(values), "{key} is required.")
+
 
 class OptionalBounded(Bounded):
     """a bounded number or a None."""
@@ -54,6 +74,9 @@ class OptionalBounded(Bounded):
             return None
         super().validate(key, value)
 
+    def validate_missing(self, key, values):
+        return np.full(values.shape, "", dtype="object")
+
 
 class Rate(Validator):
     """A rate in [0,1]."""
@@ -67,6 +90,18 @@ class Rate(Validator):
             raise ValueError(
                 f"{key}: {value} needs to be a rate (i.e. in [0,1]).")
 
+    def validate_array(self, key, values):
+        """Values are numbers, with nan for None."""
+        values = np.asarray(values, dtype="float")
+        missing = np.isnan(values)
+        errors = get_errors(key, values, missing, "{key} is required.")
+        invalid = ~missing & ((values < 0.0) | (values > 1.0))
+        return np.where(
+            missing,
+            errors,
+            get_errors(key, values, invalid, "{key}: {value} needs to be a rate (i.e. in [0,1])."),
+        )
+
 
 class Date(Validator):
     """A date."""
@@ -79,6 +114,13 @@ class Date(Validator):
         if not isinstance(value, (date,)):
             raise ValueError(f"{key}: {value} must be a date.")
 
+    def validate_array(self, key, values):
+        """Values are datetime64, with NaT for None."""
+        return self.validate_missing(key, np.asarray(values, dtype="datetime64[D]"))
+
+    def validate_missing(self, key, values):
+        return get_errors(key, values, np.isnat(values), "{key} is required.")
+
 
 class OptionalDate(Date):
     def __init__(self) -> None:
@@ -89,13 +131,63 @@ class OptionalDate(Date):
             return None
         super().validate(key, value)
 
+    def validate_missing(self, key, values):
+        return np.full(values.shape, "", dtype="object")
+
 
 class ValDisposition(Validator):
     def __init__(self) -> None:
-        pass
+        self.days = Bounded(lower_bound=EPSILON)
+        self.rate = Rate()
 
     def validate(self, key, value):
         if value is None:
             raise ValueError(f"{key} is required.")
-        Bounded(lower_bound=EPSILON)(key=key + '_days', value=value.days)
-        Rate()(key=key + '_rate', value=value.rate)
+        self.days(key=key + '_days', value=value.days)
+        self.rate(key=key + '_rate', value=value.rate)
+
+    def validate_array(self, key, values):
+        """Values are (days, rate) rows, like Disposition, with nan for None."""
+        values = np.asarray(values, dtype="float").reshape(-1, 2)
+        days = self.days.validate_array(key + '_days', values[:, 0])
+        return np.where(days == "", self.rate.validate_array(key + '_rate', values[:, 1]), days)
+
+
+class OptionalDispositions(Validator):
+    """Dispositions by name, or None; reserved names are taken."""
+    def __init__(self, reserved=()) -> None:
+        self.reserved = tuple(reserved)
+        self.disposition = ValDisposition()
+
+    def validate(self, key, value):
+        if value is None:
+            return None
+        for name, disposition in value.items():
+            if not isinstance(name, str) or not name.isidentifier():
+                raise ValueError(f"{key}: {name} needs to be a valid name.")
+            if name in self.reserved:
+                raise ValueError(f"{key}: {name} is already a parameter.")
+            self.disposition(key=name, value=disposition)
+
+
+class OptionalLengthsOfStay(Validator):
+    """Length of stay distributions by disposition name, or None."""
+    def __init__(self) -> None:
+        self.positive = Bounded(lower_bound=EPSILON)
+        self.weight = Bounded(lower_bound=0.0)
+
+    def validate(self, key, value):
+        if value is None:
+            return None
+        for name, stay in value.items():
+            if not isinstance(stay, LengthOfStay):
+                raise ValueError(f"{key}: {name} needs to be a length of stay distribution.")
+            if isinstance(stay, Histogram):
+                if not stay.weights:
+                    raise ValueError(f"{key}: {name} needs weights.")
+                for weight in stay.weights:
+                    self.weight(key=name + '_weights', value=weight)
+                self.positive(key=name + '_weights', value=sum(stay.weights))
+            else:
+                for field, number in stay._asdict().items():
+                    self.positive(key=f"{name}_{field}", value=number)
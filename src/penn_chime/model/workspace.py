@@ -0,0 +1,51 @@
+"""Workspace.
+
+Reusable buffers for batched projections.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class Workspace:
+    """Named buffers handed out as views, allocated once and then reused.
+
+    A fit projects dozens or hundreds of candidates of the same size, so
+    `sim_sir_batch` and the `calculate_*` functions take their arrays from a
+    workspace when one is given rather than allocating new ones. Buffers grow
+    on demand; `n_allocations` counts how often that happened.
+
+    Arrays returned from a projection into a workspace are overwritten by the
+    next projection into the same workspace: copy anything that must outlive
+    it.
+    """
+
+    def __init__(self, n_scenarios: int = 1, n_days: int = 1) -> None:
+        # Capacity reserved up front for 2-D buffers, to avoid regrowing
+        self.capacity = n_scenarios * n_days
+        self.buffers: Dict[str, np.ndarray] = {}
+        self.n_allocations = 0
+
+    def get(self, name: str, *shape: int, dtype="float") -> np.ndarray:
+        """A contiguous, uninitialized array of the given shape."""
+        size = int(np.prod(shape))
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape[0] < size or buffer.dtype != np.dtype(dtype):
+            buffer = np.empty(max(size, self.capacity), dtype)
+            self.buffers[name] = buffer
+            self.n_allocations += 1
+        return buffer[:size].reshape(shape)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self.buffers.values())
+
+
+def empty(workspace: Optional[Workspace], name: str, *shape: int, dtype="float") -> np.ndarray:
+    """Take an array from workspace if there is one, otherwise allocate it."""
+    if workspace is None:
+        return np.empty(shape, dtype)
+    return workspace.get(name, *shape, dtype=dtype)
@@ -0,0 +1,339 @@
+"""Parameter sweeps.
+
+Projections of every combination of swept parameter values, summarized as
+one row per combination:
+
+    penn_chime sweep --parameters defaults/cli.cfg \
+        --sweep doubling-time=3:6:0.5 \
+        --sweep relative-contact-rate=0.1,0.3,0.5 \
+        --capacity hospitalized=500 \
+        --jobs 8
+"""
+
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from itertools import islice, product
+from logging import INFO, basicConfig, getLogger
+from math import floor
+from sys import stdout
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .model.monte_carlo import SAMPLED, get_values, project_replicates
+from .model.parameters import (
+    ARGS,
+    DISPOSITIONS,
+    Disposition,
+    FrozenParameters,
+    Parameters,
+    to_cli,
+    validator,
+)
+from .model.sir import project
+from .utils import map_chunks
+
+
+basicConfig(
+    level=INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    stream=stdout,
+)
+logger = getLogger(__name__)
+
+
+# Sweepable parameters by name, as (cast, min_value, max_value)
+SWEPT = {
+    name.replace("-", "_"): (cast, min_value, max_value)
+    for name, cast, min_value, max_value, _ in ARGS
+    if name != "parameters"
+}
+
+
+def parse_values(name: str, spec: str) -> List[Any]:
+    """The values of one swept parameter.
+
+    spec is a comma separated list (`0.1,0.3,0.5`) or an inclusive
+    `start:stop:step` range (`3:6:0.5`); date ranges step in days. Every
+    value is validated as it would be on the command line.
+    """
+    if name not in SWEPT:
+        raise ValueError(f"Cannot sweep parameter {name}")
+    cast, min_value, max_value = SWEPT[name]
+    validate = validator(to_cli(name), cast, min_value, max_value)
+
+    tokens = spec.split(":")
+    if len(tokens) == 1:
+        strings = [token.strip() for token in spec.split(",")]
+    elif len(tokens) == 3:
+        start, stop = validate(tokens[0].strip()), validate(tokens[1].strip())
+        step = (float if cast is float else int)(tokens[2])
+        if step <= 0:
+            raise ValueError(f"{to_cli(name)} step must be greater than 0.")
+        if isinstance(start, date):
+            n = (stop - start).days // step + 1
+            strings = [str(start + timedelta(days=k * step)) for k in range(n)]
+        else:
+            # Tolerate rounding in (stop - start) / step; 12 significant
+            # digits drop the noise of start + k * step
+            n = floor((stop - start) / step + 1e-9) + 1
+            strings = [str(cast(float(f"{start + k * step:.12g}"))) for k in range(n)]
+    else:
+        raise ValueError(f"{to_cli(name)} expects a list or start:stop:step, got {spec}")
+
+    values = [validate(string) for string in strings]
+    if not values:
+        raise ValueError(f"{to_cli(name)} has no values in {spec}")
+    return values
+
+
+def parse_capacity(spec: str, dispositions: Iterable[str]) -> Tuple[str, float]:
+    key, _, value = spec.partition("=")
+    if key not in dispositions:
+        raise ValueError(f"Unknown disposition {key}")
+    return key, float(value)
+
+
+def override(p: FrozenParameters, values: Dict[str, Any]) -> FrozenParameters:
+    """p with swept values, <disposition>_days and _rate applied to each Disposition."""
+    changes: Dict[str, Any] = {}
+    dispositions = {key: disposition._asdict() for key, disposition in p.dispositions.items()}
+    for name, value in values.items():
+        key, _, field = name.rpartition("_")
+        if key in dispositions and field in ("days", "rate"):
+            dispositions[key][field] = value
+        else:
+            changes[name] = value
+
+    others = dict(p.other_dispositions or {})
+    for key, disposition in dispositions.items():
+        if disposition == p.dispositions[key]._asdict():
+            continue
+        if key in DISPOSITIONS:
+            changes[key] = Disposition.create(**disposition)
+        else:
+            others[key] = Disposition.create(**disposition)
+            changes["other_dispositions"] = others
+    return p.replace(**changes)
+
+
+def get_combinations(sweeps: Dict[str, Sequence[Any]]) -> Iterator[Dict[str, Any]]:
+    names = list(sweeps)
+    for values in product(*(sweeps[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def get_chunks(iterable: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_vectorized(p: FrozenParameters, names: Iterable[str]) -> bool:
+    """Whether combinations can be projected as one batch, see project_replicates."""
+    return (
+        p.date_first_hospitalized is None
+        and p.doubling_time is not None
+        and all(name in SAMPLED for name in names)
+    )
+
+
+def sweep_chunk(
+    p: FrozenParameters,
+    start: int,
+    combinations: List[Dict[str, Any]],
+    capacity: Dict[str, float],
+    trajectories: bool,
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """Summary rows, and optionally trajectories, of combinations numbered from start."""
+    index = np.arange(start, start + len(combinations))
+    names = list(combinations[0]) if combinations else []
+    if is_vectorized(p, names):
+        series, current_dates, errors = project_vectorized(p, combinations)
+    else:
+        series, current_dates, errors = project_each(p, combinations)
+
+    day = np.arange(p.n_days + 1)
+    dates = current_dates[:, None] + day.astype("timedelta64[D]")
+    summary = pd.DataFrame({"combination": index})
+    for name in names:
+        summary[name] = [combination[name] for combination in combinations]
+    summary["error"] = errors
+    for key in p.dispositions:
+        census = series["census_" + key]
+        finite = np.isfinite(census).any(axis=1)
+        peak = np.where(np.isfinite(census), census, -np.inf).argmax(axis=1)
+        summary["peak_census_" + key] = np.where(finite, census[np.arange(len(index)), peak], np.nan)
+        summary["peak_date_" + key] = pd.Series(
+            np.where(finite, dates[np.arange(len(index)), peak], np.datetime64("NaT"))
+        ).dt.date
+        over = census > capacity.get(key, np.inf)
+        summary["over_capacity_date_" + key] = pd.Series(
+            np.where(over.any(axis=1), dates[np.arange(len(index)), over.argmax(axis=1)], np.datetime64("NaT"))
+        ).dt.date
+
+    if not trajectories:
+        return summary, None
+    trajectory = pd.DataFrame({
+        "combination": np.repeat(index, day.shape[0]),
+        "day": np.tile(day, len(index)),
+        "date": pd.Series(dates.ravel()).dt.date,
+        **{key: values.ravel() for key, values in series.items()},
+    })
+    return summary, trajectory[~np.repeat(np.array(errors) != "", day.shape[0])]
+
+
+def project_vectorized(
+    p: FrozenParameters,
+    combinations: List[Dict[str, Any]],
+) -> Tuple[Dict[str, np.ndarray], np.ndarray, List[str]]:
+    """All combinations in one batch of replicates."""
+    n = len(combinations)
+    samples = {
+        key: np.array([combination.get(key, value) for combination in combinations])
+        for key, value in get_values(p).items()
+    }
+    series = project_replicates(p, samples)
+    series = {
+        f"{group}_{key}": series[f"{group}_{key}"]
+        for group in ("admits", "census")
+        for key in p.dispositions
+    }
+    current_dates = np.full(n, np.datetime64(p.current_date, "D"))
+    return series, current_dates, [""] * n
+
+
+def project_each(
+    p: FrozenParameters,
+    combinations: List[Dict[str, Any]],
+) -> Tuple[Dict[str, np.ndarray], np.ndarray, List[str]]:
+    """One projection per combination; combinations failing validation become errors."""
+    n = len(combinations)
+    series = {
+        f"{group}_{key}": np.full((n, p.n_days + 1), np.nan)
+        for group in ("admits", "census")
+        for key in p.dispositions
+    }
+    current_dates = np.full(n, np.datetime64(p.current_date, "D"))
+    errors = [""] * n
+    for k, combination in enumerate(combinations):
+        try:
+            q = override(p, combination)
+            projection = project(q)
+        except (AssertionError, ValueError) as e:
+            errors[k] = str(e)
+            continue
+        i_day = int(projection.summary["i_day"])
+        # n_days may be swept; keep the days every combination shares
+        for column, values in series.items():
+            row = projection.column(column)[i_day:i_day + p.n_days + 1]
+            values[k, :row.shape[0]] = row
+        current_dates[k] = np.datetime64(q.current_date, "D")
+    return series, current_dates, errors
+
+
+def sweep(
+    p: FrozenParameters,
+    sweeps: Dict[str, Sequence[Any]],
+    capacity: Optional[Dict[str, float]] = None,
+    chunk_size: int = 256,
+    n_jobs: int = 1,
+    trajectories: bool = False,
+) -> Iterator[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+    """Summaries (and trajectories) of every combination of sweeps, one chunk at a time.
+
+    Combinations vary the swept values of p, and are generated, projected
+    and yielded chunk_size at a time over n_jobs processes, so memory does
+    not depend on the number of combinations. When only parameters that
+    Monte Carlo samples are swept over a doubling time projection, each
+    chunk is projected as one vectorized batch; otherwise each combination
+    is projected alone.
+
+    Days run from the present (day 0) to n_days of p.
+    """
+    capacity = {} if capacity is None else capacity
+    total = int(np.prod([len(values) for values in sweeps.values()]))
+    chunks = (
+        (p, start, combinations, capacity, trajectories)
+        for start, combinations in zip(
+            range(0, total, chunk_size),
+            get_chunks(get_combinations(sweeps), chunk_size),
+        )
+    )
+    done = 0
+    for summary, trajectory in map_chunks(sweep_chunk, chunks, n_jobs):
+        done += summary.shape[0]
+        logger.info('Swept %s of %s combinations', done, total)
+        yield summary, trajectory
+
+
+def parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="penn_chime sweep",
+        description="Project every combination of swept parameters. "
+        "Other arguments set the base parameters, as for penn_chime.",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        metavar="NAME=SPEC",
+        help="Values of one parameter: a list (0.1,0.3) or start:stop:step",
+    )
+    parser.add_argument(
+        "--capacity",
+        action="append",
+        default=[],
+        metavar="DISPOSITION=VALUE",
+        help="Census capacity of one disposition, for the over capacity dates",
+    )
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Combinations per task")
+    parser.add_argument("--output", help="Summary csv (default is <current-date>_sweep.csv)")
+    parser.add_argument("--trajectories", help="Also write every trajectory to this csv")
+    return parser
+
+
+def run(argv: List[str]) -> None:
+    """Sweep from command line arguments, after `sweep`."""
+    sweep_parser = parser()
+    a, rest = sweep_parser.parse_known_args(argv)
+    p = Parameters.create(os.environ, rest).freeze()
+
+    try:
+        sweeps = {}
+        for spec in a.sweep:
+            name, _, values = spec.partition("=")
+            name = name.strip().lstrip("-").replace("-", "_")
+            if name in sweeps:
+                raise ValueError(f"{to_cli(name)} is swept more than once")
+            sweeps[name] = parse_values(name, values)
+        capacity = dict(parse_capacity(spec, p.dispositions) for spec in a.capacity)
+    except ValueError as e:
+        sweep_parser.error(str(e))
+    if not sweeps:
+        sweep_parser.error("at least one --sweep is required")
+
+    output = a.output or f"{p.current_date}_sweep.csv"
+    first = True
+    for summary, trajectory in sweep(
+        p,
+        sweeps,
+        capacity,
+        chunk_size=a.chunk_size,
+        n_jobs=a.jobs,
+        trajectories=a.trajectories is not None,
+    ):
+        mode = "w" if first else "a"
+        summary.to_csv(output, mode=mode, header=first, index=False)
+        if trajectory is not None:
+            trajectory.to_csv(a.trajectories, mode=mode, header=first, index=False)
+        first = False
+    logger.info('Wrote %s', output)
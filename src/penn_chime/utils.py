@@ -1,6 +1,9 @@
 """Utils."""
 
 from base64 import b64encode
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator
 
 import pandas as pd
 
@@ -16,3 +19,45 @@ def dataframe_to_base64(df: pd.DataFrame) -> str:
     csv = df.to_csv(index=False)
     b64 = b64encode(csv.encode()).decode()
     return b64
+
+
+class cached_property:
+    """A property computed on first access and then stored on the instance.
+
+    Stands in for functools.cached_property, which needs python 3.8.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.__doc__ = fn.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name] = self.fn(instance)
+        return value
+
+
+def map_chunks(fn: Callable, chunks: Iterable[tuple], n_jobs: int) -> Iterator[Any]:
+    """fn applied to each chunk of arguments, in order.
+
+    With n_jobs > 1, chunks run in a pool of n_jobs processes with at most
+    2 * n_jobs of them in flight, so results can be consumed as they arrive
+    without holding them all.
+    """
+    if n_jobs <= 1:
+        for chunk in chunks:
+            yield fn(*chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(fn, *chunk))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from altair import Chart
 import pandas as pd
@@ -7,6 +7,11 @@ import numpy as np
 from ..constants import DATE_FORMAT
 
 
+def get_fold(df: pd.DataFrame, prefix: str) -> List[str]:
+    """The columns of every disposition in df, such as admits_<disposition>."""
+    return [column for column in df.columns if column.startswith(prefix)]
+
+
 def build_admits_chart(
     *, alt, admits_floor_df: pd.DataFrame, max_y_axis: Optional[int] = None
 ) -> Chart:
@@ -20,10 +25,9 @@ def build_admits_chart(
     color = "key:N"
     tooltip = ["date:T", alt.Tooltip("value:Q", format=".0f", title="Admit"), "key:N"]
 
-    # TODO fix the fold to allow any number of dispositions
     points = (
         alt.Chart()
-        .transform_fold(fold=["admits_hospitalized", "admits_icu", "admits_ventilated"])
+        .transform_fold(fold=get_fold(admits_floor_df, "admits_"))
         .encode(x=alt.X(**x), y=alt.Y(**y), color=color, tooltip=tooltip)
         .mark_line(point=True)
         .encode(
@@ -59,10 +63,9 @@ def build_census_chart(
     color = "key:N"
     tooltip = ["date:T", alt.Tooltip("value:Q", format=".0f", title="Census"), "key:N"]
 
-    # TODO fix the fold to allow any number of dispositions
     points = (
         alt.Chart()
-        .transform_fold(fold=["census_hospitalized", "census_icu", "census_ventilated"])
+        .transform_fold(fold=get_fold(census_floor_df, "census_"))
         .encode(x=alt.X(**x), y=alt.Y(**y), color=color, tooltip=tooltip)
         .mark_line(point=True)
         .encode(
@@ -98,7 +101,6 @@ def build_sim_sir_w_date_chart(
     color = "key:N"
     tooltip = ["key:N", "value:Q"]
 
-    # TODO fix the fold to allow any number of dispositions
     points = (
         alt.Chart()
         .transform_fold(fold=["susceptible", "infected", "recovered"])
@@ -5,8 +5,8 @@ import os
 import altair as alt  # type: ignore
 import streamlit as st  # type: ignore
 
+from ..model.cache import get_cache, warm_up
 from ..model.parameters import Parameters
-from ..model.sir import Sir
 from .charts import (
     build_admits_chart,
     build_census_chart,
@@ -28,9 +28,13 @@ def main():
     # In dev, this should be shown
     st.markdown(hide_menu_style, unsafe_allow_html=True)
 
+    # Streamlit imports this module when the first session runs the script,
+    # not at process start: warm_up runs once per process, so only that
+    # first run waits for it, and later runs reuse the warmed cache
+    warm_up(os.environ)
     d = Parameters.create(os.environ, [])
     p = display_sidebar(st, d)
-    m = Sir(p)
+    m = get_cache().model(p)
 
     display_header(st, m, p)
 
@@ -81,7 +81,7 @@ and daily growth rate of **{daily_growth_t:.2f}%**.
             market_share=p.market_share,
             recovery_days=p.infectious_days,
             r_naught=m.r_naught,
-            doubling_time=p.doubling_time,
+            doubling_time=m.doubling_time,
             relative_contact_rate=p.relative_contact_rate,
             r_t=m.r_t,
             doubling_time_t=abs(m.doubling_time_t),
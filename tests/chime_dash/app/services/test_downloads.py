@@ -0,0 +1,113 @@
+import gzip
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from penn_chime.model.cache import MemoryBackend, SharedMemoryBackend
+from src.chime_dash.app.services import downloads
+from src.chime_dash.app.services.downloads import (
+    add_download_route,
+    decode_parameters,
+    encode_parameters,
+    get_href,
+    iter_csv,
+    iter_gzip,
+    load_secret,
+)
+from src.chime_dash.app.utils import parameters_serializer
+
+
+def test_parameters_token():
+    parameters = '{"n_days": 100, "population": 3600000}'
+    token = encode_parameters(parameters)
+
+    assert decode_parameters(token) == parameters
+    assert get_href(token, "census") == f"/download/{token}/census.csv"
+    assert decode_parameters("not-a-token") is None
+    assert decode_parameters(encode_parameters("a" * (1 << 20))) is None
+    # Signed by another key, or not at all
+    assert decode_parameters(encode_parameters(parameters, b"other")) is None
+    assert decode_parameters(token.rpartition(".")[0]) is None
+
+
+def encode_with_shared_key(parameters, backend):
+    return encode_parameters(parameters, load_secret({}, backend))
+
+
+def test_shared_secret(tmp_path):
+    parameters = '{"n_days": 100, "population": 3600000}'
+    backend = SharedMemoryBackend(str(tmp_path))
+
+    # Another process sharing the backend links with the key it generated
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        token = executor.submit(encode_with_shared_key, parameters, backend).result()
+    secret = load_secret({}, backend)
+    assert decode_parameters(token, secret) == parameters
+    assert load_secret({}, backend) == secret
+    assert len(backend) == 0
+
+    # DOWNLOAD_SECRET wins, and rejects tokens of the shared key
+    other = load_secret({"DOWNLOAD_SECRET": "other"}, backend)
+    assert other == b"other"
+    assert decode_parameters(token, other) is None
+    assert decode_parameters(encode_parameters(parameters, other), other) == parameters
+
+    # Process-local backends get a key each
+    assert load_secret({}, MemoryBackend()) != load_secret({}, MemoryBackend())
+
+
+def test_iter_csv():
+    df = pd.DataFrame({"day": range(10), "census": [float(k) for k in range(10)]})
+    csv = df.to_csv(index=True)
+
+    assert "".join(iter_csv(df, chunk_rows=3)) == csv
+    assert gzip.decompress(b"".join(iter_gzip(iter_csv(df, chunk_rows=3)))).decode() == csv
+
+
+@pytest.fixture
+def client():
+    server = Flask(__name__)
+    add_download_route(server)
+    return server.test_client()
+
+
+def test_download(client, param, monkeypatch):
+    token = encode_parameters(parameters_serializer(param))
+
+    response = client.get(get_href(token, "census"))
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.get_data(as_text=True).splitlines()[0].startswith(",day,date,")
+
+    response = client.get(get_href(token, "admits", "csv.gz"))
+    assert response.status_code == 200
+    assert gzip.decompress(response.get_data()).decode().splitlines()[0].startswith(",day,date,")
+
+    # Unknown tables, formats and tokens
+    assert client.get(get_href(token, "unknown")).status_code == 404
+    assert client.get(get_href(token, "census", "pdf")).status_code == 404
+    assert client.get(get_href("not-a-token", "census")).status_code == 404
+    forged = encode_parameters(parameters_serializer(param), b"forged")
+    assert client.get(get_href(forged, "census")).status_code == 404
+
+    # Formats without their engine
+    def missing_engine(df, fmt):
+        raise ImportError(fmt)
+
+    monkeypatch.setattr(downloads, "to_bytes", missing_engine)
+    assert client.get(get_href(token, "census", "xlsx")).status_code == 501
+
+
+def test_download_bad_request(client, param):
+    # Sir projects either a doubling time or a date_first_hospitalized
+    param.date_first_hospitalized = date(2020, 3, 7)
+    token = encode_parameters(parameters_serializer(param))
+    assert client.get(get_href(token, "census")).status_code == 400
+
+    param.date_first_hospitalized = None
+    param.n_days = downloads.MAX_N_DAYS + 1
+    token = encode_parameters(parameters_serializer(param))
+    assert client.get(get_href(token, "census")).status_code == 400
@@ -1,3 +1,4 @@
+from datetime import date
 from unittest.mock import patch, MagicMock
 
 import dash_core_components as dcc
@@ -5,9 +6,13 @@ import dash_html_components as html
 import pytest
 from dash import Dash
 from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
 
+from penn_chime.model.cache import MemoryBackend
 from src.chime_dash.app.utils.callbacks import (
     ChimeCallback,
+    Memo,
+    canonical,
     register_callbacks,
     wrap_callbacks,
 )
@@ -68,3 +73,37 @@ def test_ChimeCallback_wrap(dash_app):
         {"id": "input-id", "property": "value"}
     ]
     assert dash_app.callback_map["..output-id.children.."]["callback"]
+
+
+def test_canonical():
+    a = {"inputs_dict": {"n_days": 30, "current_date": date(2020, 4, 1)}, "values": [1, 2]}
+    b = {"values": [1, 2], "inputs_dict": {"current_date": date(2020, 4, 1), "n_days": 30}}
+    assert canonical(a) == canonical(b)
+    assert hash(canonical(a)) == hash(canonical(b))
+    assert canonical(a) != canonical({**b, "values": [2, 1]})
+
+
+def test_memo():
+    calls = []
+
+    def callback_fn(modified_timestamp, data):
+        calls.append(data)
+        if data is None:
+            raise PreventUpdate
+        return [data["n_days"]]
+
+    memo = Memo(callback_fn, key=lambda modified_timestamp, data: data, backend=MemoryBackend(max_size=2))
+    assert memo(1, {"n_days": 30}) == [30]
+    assert memo(2, {"n_days": 30}) == [30]
+    assert len(calls) == 1
+
+    for modified_timestamp in (3, 4):
+        with pytest.raises(PreventUpdate):
+            memo(modified_timestamp, None)
+    assert len(calls) == 3
+
+    memo(5, {"n_days": 60})
+    memo(6, {"n_days": 90})
+    assert memo.stats == {
+        "hits": 1, "misses": 3, "evictions": 1, "size": 2, "hit_rate": 0.25,
+    }
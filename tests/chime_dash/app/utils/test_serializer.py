@@ -0,0 +1,15 @@
+from penn_chime.model.length_of_stay import Gamma, Histogram
+from penn_chime.model.parameters import Disposition
+from src.chime_dash.app.utils import parameters_deserializer, parameters_serializer
+
+
+def test_parameters_round_trip(param):
+    p = param.freeze().replace(
+        other_dispositions={"dialysis": Disposition.create(days=4, rate=0.001)},
+        lengths_of_stay={"icu": Gamma(9.0, 4.0), "dialysis": Histogram([1, 2, 3])},
+    ).thaw()
+    q = parameters_deserializer(parameters_serializer(p))
+
+    assert q.dispositions == p.dispositions
+    assert q.lengths_of_stay == p.lengths_of_stay
+    assert parameters_deserializer(parameters_serializer(param)).other_dispositions is None
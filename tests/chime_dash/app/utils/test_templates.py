@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from src.chime_dash.app.utils.templates import df_to_html_table
+
+
+def test_df_to_html_table():
+    df = pd.DataFrame({
+        "date": pd.date_range("2020-04-01", periods=10),
+        "census": np.arange(10) + 0.5,
+    })
+    df.loc[3, "census"] = np.nan
+    thead, tbody = df_to_html_table(df, data_only=True, formats={float: int}, date_format="%b, %d")
+
+    assert [th.children for th in thead.children[0].children] == ["#", "date", "census"]
+    assert [td.children for td in tbody.children[0].children] == [0, "Apr, 01", 0]
+    assert np.isnan(tbody.children[3].children[2].children)
+
+    _, thinned, tfoot = df_to_html_table(df, data_only=True, max_rows=4, skipped_text="{shown}/{total}")
+    assert [tr.children[0].children for tr in thinned.children] == [0, 3, 6, 9]
+    assert tfoot.children[0].children[0].children == "4/10"
+    assert tfoot.children[0].children[0].colSpan == 3
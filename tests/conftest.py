@@ -87,6 +87,26 @@ def param():
     )
 
 
+@pytest.fixture
+def first_hosp_param():
+    """Mirrors tests/by_date_first_hospitalized/settings.cfg."""
+    return Parameters(
+        current_date=datetime(year=2020, month=3, day=28),
+        current_hospitalized=14,
+        date_first_hospitalized=datetime(year=2020, month=3, day=7),
+        hospitalized=Disposition.create(rate=0.025, days=7),
+        icu=Disposition.create(rate=0.0075, days=9),
+        infectious_days=14,
+        market_share=0.15,
+        mitigation_date=datetime(year=2020, month=3, day=28),
+        n_days=60,
+        population=4119405,
+        recovered=0,
+        relative_contact_rate=0.3,
+        ventilated=Disposition.create(rate=0.005, days=10),
+    )
+
+
 @pytest.fixture
 def halving_param():
     return Parameters(
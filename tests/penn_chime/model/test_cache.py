@@ -0,0 +1,234 @@
+"""Test the projection cache."""
+
+import os
+
+import numpy as np
+import pytest
+
+from penn_chime.model import cache as cache_module
+from penn_chime.model.cache import (
+    MemoryBackend,
+    ProjectionCache,
+    SharedMemoryBackend,
+    SQLiteBackend,
+    get_served,
+    load_requests,
+    warm_up,
+)
+from penn_chime.model.parameters import Disposition, Parameters
+from penn_chime.model.sir import project
+
+
+def test_cache_hits(param, model):
+    cache = ProjectionCache()
+    first = cache.model(param)
+    second = cache.model(param.freeze())
+
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+    assert second.projection is first.projection
+    assert np.array_equal(first.census_df.values, model.census_df.values)
+    assert first.i_day == model.i_day
+    assert first.r_t == model.r_t
+    assert first.doubling_time == param.doubling_time
+
+
+def test_cache_read_only(param, first_hosp_param, model):
+    cache = ProjectionCache()
+    first = cache.model(param)
+    hit = cache.model(param)
+
+    assert not hit.projection.values.flags.writeable
+    with pytest.raises(ValueError):
+        hit.raw["census_hospitalized"][0] = 0.0
+    with pytest.raises(ValueError):
+        hit.projection.day[0] = 0
+    assert np.array_equal(first.census_df.values, model.census_df.values)
+    assert hit.rates == model.rates
+    assert hit.days == model.days
+    assert hit.keys == model.keys
+
+    fitted = cache.model(first_hosp_param)
+    assert fitted.fit is not None
+    assert fitted.population == first_hosp_param.population
+    assert fitted.current_hospitalized == first_hosp_param.current_hospitalized
+    assert cache.model(first_hosp_param).fit is fitted.fit
+
+
+def test_cache_lru(param):
+    cache = ProjectionCache(MemoryBackend(max_size=2))
+    frozen = param.freeze()
+    a, b, c = (frozen.replace(doubling_time=dt) for dt in (4.0, 5.0, 6.0))
+
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)
+    cache.get(c)  # evicts b, the least recently used
+    cache.get(a)
+    cache.get(b)
+
+    assert cache.stats == {"hits": 2, "misses": 4, "evictions": 2, "size": 2}
+
+
+def test_cache_key_version(param, monkeypatch):
+    cache = ProjectionCache()
+    cache.get(param)
+    monkeypatch.setattr(cache_module, "VERSION", "v0.0.0")
+    cache.get(param)
+
+    assert cache.misses == 2
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "shm"])
+def test_cache_shared_backends(param, model, tmp_path, backend):
+    def create():
+        if backend == "sqlite":
+            return SQLiteBackend(str(tmp_path / "cache.sqlite"), max_size=1)
+        return SharedMemoryBackend(str(tmp_path), max_size=1)
+
+    writer = ProjectionCache(create())
+    writer.get(param)
+    # A second process sees the entry the first stored
+    reader = ProjectionCache(create())
+    projection = reader.get(param)
+
+    assert reader.hits == 1
+    assert np.array_equal(projection.values, model.projection.values, equal_nan=True)
+    assert projection.summary == model.projection.summary
+
+    writer.get(param.freeze().replace(doubling_time=4.0))
+    assert writer.evictions == 1
+    assert len(reader.backend) == 1
+
+
+def test_cache_create():
+    assert isinstance(ProjectionCache.create({}).backend, MemoryBackend)
+    assert ProjectionCache.create({}).backend.ttl is None
+    assert ProjectionCache.create({"PROJECTION_CACHE_TTL": "3600"}).backend.ttl == 3600.0
+    with pytest.raises(ValueError):
+        ProjectionCache.create({"PROJECTION_CACHE": "redis"})
+
+
+def test_cache_horizons(param):
+    cache = ProjectionCache()
+    frozen = param.freeze()
+    cache.get(frozen)
+    longer = cache.get(frozen.replace(n_days=param.n_days + 50))
+    shorter = cache.get(frozen.replace(n_days=param.n_days - 10))
+
+    assert cache.stats == {"hits": 2, "misses": 1, "evictions": 0, "size": 1}
+    expected = project(frozen.replace(n_days=param.n_days + 50))
+    assert np.array_equal(longer.values, expected.values, equal_nan=True)
+    assert np.array_equal(shorter.values, longer.values[:, :shorter.values.shape[1]], equal_nan=True)
+    # Extended, the entry serves every horizon up to its longest
+    assert np.shares_memory(cache.get(frozen.replace(n_days=param.n_days + 10)).values, longer.values)
+    assert cache.hits == 3
+    # Fit on its last candidate, a horizon too short to hold the fit
+    cache.get(frozen.replace(n_days=20))
+    assert cache.stats == {"hits": 3, "misses": 2, "evictions": 0, "size": 2}
+
+
+def test_cache_stages(param):
+    cache = ProjectionCache()
+    frozen = param.freeze()
+    cache.get(frozen)
+    icu = frozen.replace(icu=Disposition.create(days=3, rate=0.01), n_days=param.n_days + 10)
+    projection = cache.get(icu)
+    cache.get(frozen.replace(max_y_axis=1000))
+
+    assert cache.stats == {"hits": 2, "misses": 1, "evictions": 0, "size": 1}
+    assert np.array_equal(projection.values, project(icu).values, equal_nan=True)
+    cache.get(frozen.replace(hospitalized=Disposition.create(days=3, rate=0.01)))
+    assert cache.misses == 2
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "shm"])
+def test_cache_ttl(param, tmp_path, monkeypatch, backend):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", lambda: now[0])
+    if backend == "memory":
+        cache = ProjectionCache(MemoryBackend(ttl=60.0))
+    elif backend == "sqlite":
+        cache = ProjectionCache(SQLiteBackend(str(tmp_path / "cache.sqlite"), ttl=60.0))
+    else:
+        cache = ProjectionCache(SharedMemoryBackend(str(tmp_path), ttl=60.0))
+
+    cache.get(param)
+    now[0] += 30.0
+    cache.get(param)
+    assert cache.hits == 1
+    # Reading an entry does not extend its life
+    now[0] += 31.0
+    cache.get(param)
+    assert cache.stats == {"hits": 1, "misses": 2, "evictions": 0, "size": 1}
+
+
+def test_cache_requests(param, tmp_path):
+    cache = ProjectionCache()
+    frozen = param.freeze()
+    popular = frozen.replace(doubling_time=5.0)
+    cache.warm([param])
+    for p in (popular, frozen, popular):
+        cache.get(p)
+
+    assert cache.requests == {popular: 2, frozen: 1}
+    path = str(tmp_path / "requests.pickle")
+    # Another process of the same run adds its counts
+    other = ProjectionCache()
+    other.get(frozen)
+    cache.save_requests(path)
+    other.save_requests(path)
+    assert load_requests(path) == {popular: 2, frozen: 2}
+
+    (tmp_path / "broken.pickle").write_bytes(b"not a pickle")
+    assert load_requests(str(tmp_path / "broken.pickle")) == {}
+    assert load_requests(str(tmp_path / "missing.pickle")) == {}
+
+
+def test_warm_up(param, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "_cache", ProjectionCache())
+    monkeypatch.setattr(cache_module, "_warmed", None)
+    monkeypatch.setattr(cache_module.atexit, "register", lambda *args: None)
+    popular = param.freeze().replace(doubling_time=5.0)
+    path = str(tmp_path / "requests.pickle")
+    recorder = ProjectionCache()
+    for _ in range(2):
+        recorder.get(popular)
+    recorder.get(param)
+    recorder.save_requests(path)
+    other = tmp_path / "other.cfg"
+    other.write_text(open("defaults/cli.cfg").read() + "\n--population 2000000\n")
+    missing = tmp_path / "missing.cfg"
+
+    env = {
+        "PARAMETERS": "defaults/cli.cfg",
+        "WARM_PARAMETERS": os.pathsep.join((str(other), str(missing))),
+        "REQUEST_LOG": path,
+        "WARM_REPLAY": "1",
+    }
+    warmed = warm_up(env)
+
+    assert warmed == [
+        Parameters.create({}, ["--parameters", "defaults/cli.cfg"]).freeze(),
+        Parameters.create({}, ["--parameters", str(other)]).freeze(),
+        popular,
+    ]
+    cache = cache_module.get_cache()
+    assert cache.misses == 3
+    assert not cache.requests
+    cache.get(popular)
+    assert cache.hits == 1
+    assert warm_up(env) is warmed
+
+
+def test_warm_up_webapp(monkeypatch):
+    """The webapp defaults set a doubling time and a date_first_hospitalized"""
+    monkeypatch.setattr(cache_module, "_cache", ProjectionCache())
+    monkeypatch.setattr(cache_module, "_warmed", None)
+    d = Parameters.create({"PARAMETERS": "defaults/webapp.cfg"}, [])
+    assert d.doubling_time is not None and d.date_first_hospitalized is not None
+
+    warmed = warm_up({"PARAMETERS": "defaults/webapp.cfg"})
+
+    assert warmed == [d.freeze().replace(date_first_hospitalized=None)]
+    assert warmed == [get_served(d)]
+    assert cache_module.get_cache().misses == 1
@@ -0,0 +1,55 @@
+"""Test length of stay distributions."""
+
+import pickle
+from math import erf, exp, sqrt
+
+import numpy as np
+import pytest
+
+from penn_chime.model.length_of_stay import (
+    MAX_DAYS,
+    Gamma,
+    Histogram,
+    LogNormal,
+    gammainc,
+    get_max_los,
+    get_pmf,
+)
+
+
+def test_gammainc():
+    for x in (0.1, 1.0, 3.0, 20.0):
+        assert gammainc(1.0, x) == pytest.approx(1.0 - exp(-x), rel=1e-12)
+        assert gammainc(0.5, x) == pytest.approx(erf(sqrt(x)), rel=1e-12)
+    assert gammainc(2.0, 0.0) == 0.0
+
+
+@pytest.mark.parametrize("stay", [Gamma(7, 3), LogNormal(7, 3), Gamma(9, 12), LogNormal(4, 1)])
+def test_pmf(stay):
+    pmf = get_pmf(stay)
+    days = np.arange(1, pmf.shape[0] + 1)
+
+    assert pmf.sum() == pytest.approx(1.0)
+    assert (pmf >= 0.0).all()
+    assert (pmf * days).sum() == pytest.approx(stay.mean, rel=0.05)
+    assert get_max_los(stay) == pmf.shape[0] <= MAX_DAYS
+    with pytest.raises(ValueError):
+        pmf[0] = 1.0
+
+
+def test_histogram():
+    stay = Histogram([0, 2, 6, 2, 0, 0])
+
+    assert stay.weights == (0.0, 2.0, 6.0, 2.0, 0.0, 0.0)
+    assert np.array_equal(get_pmf(stay), [0.0, 0.2, 0.6, 0.2])
+    assert [stay.cdf(days) for days in (0.5, 1.0, 2.5, 3.0, 4.0, 9.0)] == [0.0, 0.0, 0.2, 0.8, 1.0, 1.0]
+    assert get_max_los(np.array([3, 5])) == 5
+
+
+def test_equality():
+    assert Gamma(7, 3) == Gamma(7.0, 3.0)
+    assert Gamma(7, 3) != LogNormal(7, 3)
+    assert len({Gamma(7, 3), LogNormal(7, 3), Gamma(7.0, 3.0)}) == 2
+    assert not np.array_equal(get_pmf(Gamma(7, 3)), get_pmf(LogNormal(7, 3)))
+    stay = Histogram([1, 2])
+    assert pickle.loads(pickle.dumps(stay)) == stay
@@ -0,0 +1,156 @@
+"""Test Monte Carlo."""
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from penn_chime.model.monte_carlo import (
+    Fixed,
+    Triangular,
+    Uniform,
+    get_argmin_i_days,
+    get_seeds,
+    monte_carlo,
+    project_replicates,
+    sample,
+)
+from penn_chime.model.length_of_stay import Gamma, LogNormal
+from penn_chime.model.parameters import Disposition
+from penn_chime.model.sir import Sir
+
+
+DISTRIBUTIONS = {
+    "doubling_time": Uniform(3.0, 9.0),
+    "hospitalized_rate": Uniform(0.02, 0.08),
+    "market_share": Uniform(0.03, 0.2),
+    "relative_contact_rate": Uniform(0.0, 0.6),
+    "hospitalized_days": Triangular(4.0, 7.0, 12.0),
+    "icu_days": Uniform(5.0, 12.0),
+}
+
+
+@pytest.mark.parametrize("mitigation_days", [0, 10, -10, -70])
+def test_replicates_match_model(param, mitigation_days):
+    """
+    Every replicate is projected exactly as Sir projects its values
+    """
+    param.mitigation_date = param.current_date + timedelta(days=mitigation_days)
+    samples = sample(param, DISTRIBUTIONS, 12, seed=1)
+    result = project_replicates(param, samples)
+
+    frozen = param.freeze()
+    for k in range(12):
+        model = Sir(frozen.replace(
+            doubling_time=float(samples["doubling_time"][k]),
+            market_share=float(samples["market_share"][k]),
+            relative_contact_rate=float(samples["relative_contact_rate"][k]),
+            **{
+                key: Disposition.create(
+                    days=int(samples[f"{key}_days"][k]),
+                    rate=float(samples[f"{key}_rate"][k]),
+                )
+                for key in ("hospitalized", "icu", "ventilated")
+            },
+        ))
+
+        for key, values in result.items():
+            assert np.array_equal(values[k], model.raw[key][model.i_day:], equal_nan=True)
+
+
+@pytest.mark.parametrize("mitigation_days", [-10, -70])
+def test_argmin_i_days_checked(param, mitigation_days):
+    """
+    Checking the peak filter on the best candidates first fits the i_days
+    that checking it on every candidate does
+    """
+    param.mitigation_date = param.current_date + timedelta(days=mitigation_days)
+    param.n_days = 120
+    samples = sample(param, DISTRIBUTIONS, 200, seed=6)
+    seeds = get_seeds(param, samples)
+
+    exhaustive = get_argmin_i_days(param, samples, *seeds, n_checked=0)
+    for n_checked, max_rows in ((1, 4096), (3, 64)):
+        i_days = get_argmin_i_days(param, samples, *seeds, max_rows=max_rows, n_checked=n_checked)
+        assert np.array_equal(i_days, exhaustive)
+
+
+def test_monte_carlo_bands(param, model):
+    bands = monte_carlo(param, DISTRIBUTIONS, n_replicates=300, seed=2, chunk_size=64)
+    census = bands.values["census_hospitalized"]
+
+    assert census.shape == (5, param.n_days + 1)
+    assert (np.diff(census[:, 1:], axis=0) >= 0.0).all()
+    assert list(bands.frame("admits_icu").columns) == ["day", "date", "p5", "p25", "p50", "p75", "p95"]
+
+    fixed = monte_carlo(param, {"market_share": Fixed(param.market_share)}, n_replicates=3)
+    for band in fixed.values["census_hospitalized"]:
+        assert np.allclose(band, model.census_df.census_hospitalized.values[model.i_day:], rtol=1.e-12)
+
+
+@pytest.mark.parametrize("kwargs", [{"n_replicates": 0}, {"n_replicates": -1}, {"chunk_size": 0}])
+def test_monte_carlo_validation(param, kwargs):
+    with pytest.raises(ValueError):
+        monte_carlo(param, DISTRIBUTIONS, **kwargs)
+
+
+def test_monte_carlo_tolerance(param):
+    """
+    Streamed bands are within one percentage point of rank of the exact ones
+    """
+    bands = monte_carlo(param, DISTRIBUTIONS, n_replicates=600, seed=5, chunk_size=50)
+
+    seeds = np.random.SeedSequence(5).spawn(12)
+    exact = [project_replicates(param, sample(param, DISTRIBUTIONS, 50, seed)) for seed in seeds]
+    for key in ("census_hospitalized", "admits_ventilated"):
+        values = np.concatenate([result[key] for result in exact])[:, 1:]
+        for percentile, band in zip(bands.percentiles, bands.values[key][:, 1:]):
+            below = (values < band).mean(axis=0) * 100.0
+            at_or_below = (values <= band).mean(axis=0) * 100.0
+            assert (below <= percentile + 1.0).all()
+            assert (at_or_below >= percentile - 1.0).all()
+
+
+def test_monte_carlo_jobs(param):
+    one = monte_carlo(param, DISTRIBUTIONS, n_replicates=100, seed=3, chunk_size=32)
+    two = monte_carlo(param, DISTRIBUTIONS, n_replicates=100, seed=3, chunk_size=32, n_jobs=2)
+
+    for key, values in one.values.items():
+        assert np.array_equal(values, two.values[key], equal_nan=True)
+
+
+def test_sample(param):
+    samples = sample(param, {"hospitalized_days": Uniform(0.0, 3.0)}, 50, seed=4)
+
+    assert samples["hospitalized_days"].dtype.kind == "i"
+    assert samples["hospitalized_days"].min() >= 1
+    assert (samples["doubling_time"] == param.doubling_time).all()
+    with pytest.raises(ValueError):
+        sample(param, {"population": Uniform(1.0, 2.0)}, 10)
+
+
+@pytest.mark.parametrize("mitigation_days", [10, -10])
+def test_replicates_length_of_stay(param, mitigation_days):
+    """Stays by a distribution replace the sampled days, as in Sir"""
+    param.mitigation_date = param.current_date + timedelta(days=mitigation_days)
+    param.lengths_of_stay = {"hospitalized": Gamma(7, 4), "icu": LogNormal(9, 6)}
+    samples = sample(param, DISTRIBUTIONS, 6, seed=2)
+    result = project_replicates(param, samples)
+
+    frozen = param.freeze()
+    for k in range(6):
+        model = Sir(frozen.replace(
+            doubling_time=float(samples["doubling_time"][k]),
+            market_share=float(samples["market_share"][k]),
+            relative_contact_rate=float(samples["relative_contact_rate"][k]),
+            **{
+                key: Disposition.create(
+                    days=int(samples[f"{key}_days"][k]),
+                    rate=float(samples[f"{key}_rate"][k]),
+                )
+                for key in ("hospitalized", "icu", "ventilated")
+            },
+        ))
+
+        for key, values in result.items():
+            assert np.allclose(values[k], model.raw[key][model.i_day:], rtol=1e-9, atol=1e-9, equal_nan=True)
@@ -0,0 +1,49 @@
+"""Test networks of hospitals."""
+
+import numpy as np
+import pytest
+
+from penn_chime.model.network import Hospital, Network
+from penn_chime.model.parameters import Disposition
+from penn_chime.model.sir import Sir, calculate_admits, calculate_census, calculate_dispositions
+
+
+def test_network_matches_model(param):
+    hospitals = {
+        "all": Hospital.from_parameters(param),
+        "small": Hospital(0.01, {"icu": Disposition.create(days=4, rate=0.03)}),
+        "large": Hospital(0.04),
+    }
+    network = Network(param, hospitals)
+    model = Sir(param)
+
+    # A hospital like the region projects as the region
+    projection = network.projection("all")
+    assert np.array_equal(projection.values, model.projection.values, equal_nan=True)
+    assert projection.summary == model.projection.summary
+
+    # Other hospitals, as the region's dispositions with their own values
+    for name, hospital in hospitals.items():
+        raw = {"day": model.raw["day"], "ever_infected": model.raw["ever_infected"]}
+        rates = {key: hospital.dispositions.get(key, d).rate for key, d in param.dispositions.items()}
+        days = {key: hospital.dispositions.get(key, d).days for key, d in param.dispositions.items()}
+        calculate_dispositions(raw, rates, hospital.market_share)
+        calculate_admits(raw, rates)
+        calculate_census(raw, days)
+        m = network.models([name])[name]
+        for key in param.dispositions:
+            assert np.array_equal(m.raw["admits_" + key], raw["admits_" + key], equal_nan=True)
+            assert np.array_equal(m.raw["census_" + key], raw["census_" + key])
+        assert m.rates == rates
+        assert m.days == days
+
+    # Market shares add up
+    census = network.series["census_hospitalized"]
+    assert np.allclose(census[1] + census[2], census[0])
+
+
+def test_hospital_validation():
+    with pytest.raises(ValueError):
+        Hospital(1.5)
+    with pytest.raises(ValueError):
+        Hospital(0.1, {"icu": Disposition(0, 0.1)})
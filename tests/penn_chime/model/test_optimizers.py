@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from penn_chime.model.optimizers import (
+    Brent,
+    GoldenSection,
+    GridSearch,
+)
+
+
+def parabola(xs):
+    return (xs - 3.3) ** 2.0
+
+
+@pytest.mark.parametrize("optimizer", [GridSearch(), Brent(), GoldenSection()])
+def test_interior_minimum(optimizer):
+    result = optimizer(parabola, 1.0, 15.0)
+    assert abs(result.x - 3.3) < 1.e-3
+    assert result.loss == pytest.approx(parabola(np.array([result.x]))[0])
+
+
+@pytest.mark.parametrize("optimizer", [GridSearch(), Brent(), GoldenSection()])
+def test_edge_minimum(optimizer):
+    result = optimizer(lambda xs: xs, 1.0, 15.0)
+    assert abs(result.x - 1.0) < 1.e-3
+
+
+def test_evaluations():
+    assert GridSearch()(parabola, 1.0, 15.0).n_evaluations == 75
+    assert Brent()(parabola, 1.0, 15.0).n_evaluations < 30
+
+
+def test_max_evaluations():
+    result = Brent(xtol=1.e-12, max_evaluations=20)(parabola, 1.0, 15.0)
+    assert result.n_evaluations == 20
+
+
+def test_multimodal():
+    """The coarse grid keeps the refinement away from the local minimum."""
+    def loss(xs):
+        return np.minimum((xs - 2.0) ** 2.0 + 1.0, (xs - 11.2) ** 2.0)
+
+    for optimizer in (Brent(), GoldenSection()):
+        assert abs(optimizer(loss, 1.0, 15.0).x - 11.2) < 1.e-3
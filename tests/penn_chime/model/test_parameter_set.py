@@ -0,0 +1,85 @@
+"""Test parameter sets."""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from penn_chime.model.parameter_set import ParameterSet
+from penn_chime.model.parameters import Disposition
+from penn_chime.model.sir import project
+
+
+def get_rows(p):
+    row = {
+        "current_date": p.current_date,
+        "current_hospitalized": p.current_hospitalized,
+        "doubling_time": p.doubling_time,
+        "infectious_days": p.infectious_days,
+        "market_share": p.market_share,
+        "mitigation_date": p.mitigation_date,
+        "n_days": p.n_days,
+        "population": p.population,
+        "recovered": p.recovered,
+        "relative_contact_rate": p.relative_contact_rate,
+    }
+    for key, disposition in p.dispositions.items():
+        row[f"{key}_days"] = disposition.days
+        row[f"{key}_rate"] = disposition.rate
+    return [
+        row,
+        {**row, "market_share": 1.5},
+        {**row, "population": None},
+        {**row, "icu_days": 0},
+        {**row, "ventilated_rate": -0.1, "doubling_time": -1.0},
+        {**row, "infectious_days": None},
+        {**row, "relative_contact_rate": 0.5, "icu_days": 4},
+        {**row, "population": 1000000},
+        {**row, "doubling_time": None, "date_first_hospitalized": date(2020, 3, 7)},
+        {**row, "doubling_time": None},
+    ]
+
+
+def test_parameter_set_errors(param):
+    rows = get_rows(param)
+    ps = ParameterSet.from_rows(rows)
+
+    for k, error in enumerate(ps.errors):
+        try:
+            ps.row(k)
+        except (AssertionError, ValueError) as e:
+            # The same parameter fails, though values print as floats
+            assert error.split(":")[0] == str(e).split(":")[0]
+            assert error
+        else:
+            assert error == ""
+    assert ps.valid.tolist() == [True, False, False, False, False, False, True, True, True, True]
+
+
+def test_parameter_set_from_parameters(param, first_hosp_param):
+    ps = ParameterSet.from_parameters([param, first_hosp_param])
+
+    assert ps.valid.all()
+    dates = {"current_date": date(2020, 3, 28), "mitigation_date": date(2020, 3, 28)}
+    assert ps.row(0).freeze() == param.freeze().replace(**dates)
+    assert ps.row(1).freeze() == first_hosp_param.freeze().replace(
+        date_first_hospitalized=date(2020, 3, 7), **dates
+    )
+    with pytest.raises(ValueError):
+        ParameterSet(2, hospitalized=[Disposition(7, 0.1)] * 2)
+
+
+def test_parameter_set_project(param):
+    ps = ParameterSet.from_rows(get_rows(param))
+    series, errors = ps.project()
+
+    assert (errors != "").tolist() == [False, True, True, True, True, True, False, False, False, True]
+    assert errors[9] == "doubling_time or date_first_hospitalized must be provided."
+    for k in np.flatnonzero(errors == ""):
+        projection = project(ps.row(k))
+        i_day = int(projection.summary["i_day"])
+        for key, values in series.items():
+            assert np.allclose(
+                values[k], projection.column(key)[i_day:], rtol=1e-12, equal_nan=True
+            ), (k, key)
+    assert np.isnan(series["census_icu"][errors != ""]).all()
@@ -1,6 +1,19 @@
 """Test Parameters."""
 
-from penn_chime.model.parameters import Parameters
+import pickle
+from datetime import timedelta
+
+import pytest
+
+from penn_chime.model.length_of_stay import Gamma, Histogram, LogNormal
+from penn_chime.model.parameters import (
+    LABELS,
+    Disposition,
+    Parameters,
+    Regions,
+    get_labels,
+    get_lengths_of_stay,
+)
 
 
 def test_cypress_defaults():
@@ -19,3 +32,105 @@ def test_webapp_defaults():
     """Ensure the webapp defaults have been updated."""
     # TODO how to make this work when the module is installed?
     _ = Parameters.create({"PARAMETERS": "./defaults/webapp.cfg"}, [])
+
+
+def test_freeze(param):
+    frozen = param.freeze()
+
+    assert frozen == param.freeze()
+    assert hash(frozen) == hash(param.freeze())
+    assert frozen.digest == param.freeze().digest
+    assert frozen.dispositions == param.dispositions
+    with pytest.raises(AttributeError):
+        frozen.doubling_time = 3.0
+    assert not hasattr(frozen, "__dict__")
+
+
+def test_freeze_changes(param):
+    frozen = param.freeze()
+
+    for changed in (
+        frozen.replace(doubling_time=3.0),
+        frozen.replace(mitigation_date=frozen.mitigation_date + timedelta(days=1)),
+        frozen.replace(icu=Disposition.create(days=10, rate=0.0075)),
+    ):
+        assert changed != frozen
+        assert changed.digest != frozen.digest
+
+    assert frozen.replace(doubling_time=param.doubling_time) == frozen
+    assert frozen.thaw().freeze() == frozen
+
+
+def test_freeze_regions(param):
+    param.region = Regions(delaware=100, chester=200)
+    frozen = param.freeze()
+    param.region.delaware = 300
+
+    assert frozen.region.delaware == 100
+    assert frozen.region.population == 300
+    assert frozen == frozen.replace(region=Regions(chester=200, delaware=100))
+    assert frozen != param.freeze()
+
+
+def test_freeze_pickle(param):
+    frozen = param.freeze()
+
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+
+
+def test_other_dispositions(param):
+    dialysis = Disposition.create(days=4, rate=0.001)
+    p = Parameters.create({}, [
+        "--parameters", "./defaults/cli.cfg",
+        "--disposition", "dialysis:4:0.001",
+        "--disposition", "step_down:3:0.01",
+    ])
+    assert list(p.dispositions) == ["hospitalized", "icu", "ventilated", "dialysis", "step_down"]
+    assert p.dispositions["dialysis"] == dialysis
+    assert p.labels["step_down"] == "Step down"
+    assert get_labels(p.dispositions, {"step_down": "Step-down beds"})["step_down"] == "Step-down beds"
+    with pytest.raises(TypeError):
+        LABELS["dialysis"] = "Dialysis"
+    assert "dialysis" not in LABELS
+
+    frozen = param.freeze().replace(other_dispositions={"dialysis": dialysis})
+    assert frozen.dispositions["dialysis"] == dialysis
+    assert frozen != param.freeze()
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+    assert frozen.thaw().other_dispositions == {"dialysis": dialysis}
+
+    with pytest.raises(ValueError):
+        param.freeze().replace(other_dispositions={"icu": dialysis})
+    with pytest.raises(ValueError):
+        param.freeze().replace(other_dispositions={"dialysis": Disposition(0, 0.1)})
+
+
+def test_lengths_of_stay(param):
+    p = Parameters.create({}, [
+        "--parameters", "./defaults/cli.cfg",
+        "--disposition", "dialysis:4:0.001",
+        "--length-of-stay", "icu:gamma:9:4",
+        "--length-of-stay", "dialysis:histogram:1,2,1",
+    ])
+    assert p.lengths_of_stay == {"icu": Gamma(9.0, 4.0), "dialysis": Histogram([1, 2, 1])}
+    assert get_lengths_of_stay(p) == {
+        "hospitalized": p.hospitalized.days,
+        "icu": Gamma(9.0, 4.0),
+        "ventilated": p.ventilated.days,
+        "dialysis": Histogram([1, 2, 1]),
+    }
+
+    frozen = param.freeze()
+    gamma = frozen.replace(lengths_of_stay={"icu": Gamma(9, 4)})
+    assert gamma != frozen.replace(lengths_of_stay={"icu": LogNormal(9, 4)})
+    assert pickle.loads(pickle.dumps(gamma)) == gamma
+
+    for lengths_of_stay in (
+        {"dialysis": Gamma(9, 4)},
+        {"icu": Gamma(9, 0)},
+        {"icu": Histogram([0, -1, 2])},
+        {"icu": Histogram([])},
+        {"icu": 9},
+    ):
+        with pytest.raises(ValueError):
+            frozen.replace(lengths_of_stay=lengths_of_stay)
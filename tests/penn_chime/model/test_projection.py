@@ -0,0 +1,34 @@
+import numpy as np
+
+from penn_chime.model.projection import Projection
+
+
+def test_frames_share_the_block(model):
+    projection = model.projection
+    for group in ("dispositions", "admits", "census", "sir", "admits_floor"):
+        df = projection.frame(group)
+        assert list(df.columns[:2]) == ["day", "date"]
+        for column in projection.groups[group]:
+            assert np.shares_memory(df[column].values, projection.values)
+
+    for key, values in model.raw.items():
+        if key not in ("day", "date"):
+            assert np.shares_memory(values, projection.values)
+
+
+def test_floor(model):
+    projection = model.projection
+    assert (
+        projection.column("census_icu", "census_floor")
+        == np.floor(projection.column("census_icu"))
+    ).all()
+    assert (model.sim_sir_w_date_floor_df.infected == np.floor(model.raw["infected"])).all()
+
+
+def test_from_raw_round_trip(model):
+    raw = model.raw
+    projection = Projection.from_raw(raw, ("hospitalized", "icu", "ventilated"))
+    assert list(projection.raw) == list(raw)
+    for key, values in projection.raw.items():
+        assert np.array_equal(values, raw[key], equal_nan=key != "date")
+    assert projection.nbytes == model.projection.nbytes
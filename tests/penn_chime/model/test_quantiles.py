@@ -0,0 +1,47 @@
+"""Test Quantiles."""
+
+import numpy as np
+
+from penn_chime.model.quantiles import Digest
+
+
+PERCENTILES = (1.0, 5.0, 25.0, 50.0, 75.0, 95.0, 99.0)
+
+
+def test_digest_tolerance():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(0.0, 1.5, size=(20000, 3, 4))
+    digest = Digest((3, 4))
+    for start in range(0, values.shape[0], 256):
+        digest.update(values[start:start + 256])
+
+    estimates = digest.quantiles(PERCENTILES)
+    assert estimates.shape == (len(PERCENTILES), 3, 4)
+    for percentile, estimate in zip(PERCENTILES, estimates):
+        rank = (values <= estimate).mean(axis=0) * 100.0
+        assert (np.abs(rank - percentile) <= 1.0).all()
+
+
+def test_digest_constant_memory():
+    rng = np.random.default_rng(1)
+    digest = Digest((10,), compression=50)
+    sizes = []
+    for _ in range(20):
+        digest.update(rng.normal(size=(100, 10)))
+        sizes.append(digest.nbytes)
+
+    assert digest.count == 2000
+    assert sizes[-1] == sizes[0] == 10 * 50 * 2 * 8
+
+
+def test_digest_nan():
+    digest = Digest((2,))
+    values = np.array([[np.nan, 1.0], [np.nan, 2.0], [np.nan, 3.0]])
+    digest.update(values)
+    digest.update(values)
+
+    estimates = digest.quantiles((0.0, 50.0, 100.0))
+    assert np.isnan(estimates[:, 0]).all()
+    assert estimates[1, 1] == 2.0
+    assert estimates[0, 1] == 1.0
+    assert estimates[2, 1] == 3.0
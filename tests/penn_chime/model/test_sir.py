@@ -5,11 +5,23 @@ import pandas as pd
 import numpy as np
 from datetime import timedelta
 
+import penn_chime.model.sir
 from penn_chime.constants import EPSILON
+from penn_chime.model.length_of_stay import Gamma, Histogram, LogNormal, get_pmf
+from penn_chime.model.optimizers import Brent, GridSearch
+from penn_chime.model.parameters import Disposition
 from penn_chime.model.sir import (
     sir,
     sim_sir,
+    sim_sir_batch,
+    calculate_admits,
+    calculate_census,
+    calculate_dispositions,
     get_growth_rate,
+    get_stage,
+    project,
+    resize,
+    restage,
     Sir,
 )
 
@@ -76,6 +88,54 @@ def test_sim_sir():
     assert round(raw["recovered"][-1], 2) == 17.82
 
 
+def test_sim_sir_batch():
+    """
+    Each row of the batch should match the scalar simulation exactly
+    """
+    s = np.array([5.0, 499600.0, 1000.0])
+    i = np.array([6.0, 400.0, 1.0])
+    r = np.array([7.0, 0.0, 0.0])
+    gamma = np.array([0.1, 1.0 / 14, 0.2])
+    betas = np.array([0.1, 4.2e-07, 3.0e-04])
+    betas_t = betas * 0.7
+    policies = [(betas, 10), (betas_t, 30)]
+
+    batch = sim_sir_batch(s, i, r, gamma, -10, policies)
+    assert batch["susceptible"].shape == (3, 41)
+    assert list(batch["day"]) == list(range(-10, 31))
+
+    for k in range(3):
+        raw = sim_sir(
+            s[k], i[k], r[k], gamma[k], -10, [(betas[k], 10), (betas_t[k], 30)]
+        )
+        for key in ("susceptible", "infected", "recovered", "ever_infected"):
+            assert (batch[key][k] == raw[key]).all()
+
+    # Scalars are broadcast across the scenarios
+    batch = sim_sir_batch(5, 6, 7, 0.1, 0, [(np.array([0.1, 0.2]), 40)])
+    raw = sim_sir(5, 6, 7, 0.1, 0, [(0.1, 40)])
+    assert batch["infected"].shape == (2, 41)
+    assert (batch["infected"][0] == raw["infected"]).all()
+
+
+def test_batch_dispositions():
+    rates = {"hospitalized": 0.05, "icu": 0.02}
+    days = {"hospitalized": 7, "icu": 9}
+    policies = [(np.array([4.2e-07, 3.0e-07]), 20)]
+    batch = sim_sir_batch(499600.0, 400.0, 0.0, 1.0 / 14, 0, policies)
+    calculate_dispositions(batch, rates, 0.05)
+    calculate_admits(batch, rates)
+    calculate_census(batch, days)
+
+    raw = sim_sir(499600.0, 400.0, 0.0, 1.0 / 14, 0, [(3.0e-07, 20)])
+    calculate_dispositions(raw, rates, 0.05)
+    calculate_admits(raw, rates)
+    calculate_census(raw, days)
+    for key in ("admits_hospitalized", "census_hospitalized", "census_icu"):
+        assert batch[key].shape == (2, 21)
+        assert np.array_equal(batch[key][1], raw[key], equal_nan=True)
+
+
 def test_growth_rate():
     assert np.round(get_growth_rate(5) * 100.0, decimals=4) == 14.8698
     assert np.round(get_growth_rate(0) * 100.0, decimals=4) == 0.0
@@ -112,6 +172,102 @@ def test_model_first_hosp_fit(param):
     assert abs(my_model.doubling_time_t - 7.71)/7.71 < 0.01
 
 
+def test_model_argmin_i_day(param):
+    """
+    The batched search should match trying every i_day one at a time
+    """
+    param.n_days = 90
+    param.mitigation_date = param.current_date + timedelta(days=10)
+    my_model = Sir(param)
+    fit_i_day, census = my_model.i_day, my_model.raw["census_hospitalized"]
+    infected = my_model.raw["infected"]
+
+    # Sir overwrites the seed with the state on the present day
+    my_model.infected = 1.0 / param.market_share / param.hospitalized.rate
+    my_model.susceptible = param.population - my_model.infected
+
+    best_i_day = -1
+    best_i_day_loss = float("inf")
+    for i_day in range(param.n_days):
+        my_model.i_day = i_day
+        raw = my_model.run_projection(param, my_model.gen_policy(param))
+        if raw["census_hospitalized"].argmax() < i_day:
+            continue
+        loss = (raw["census_hospitalized"][i_day] - param.current_hospitalized) ** 2.0
+        if loss < best_i_day_loss:
+            best_i_day_loss = loss
+            best_i_day = i_day
+            best_raw = raw
+
+    assert fit_i_day == best_i_day
+    assert (census == best_raw["census_hospitalized"]).all()
+    assert (infected == best_raw["infected"]).all()
+    assert my_model.get_argmin_i_day(param, chunk_size=7) == best_i_day
+
+
+def test_model_argmin_i_day_unreachable(param):
+    """
+    A current_hospitalized no candidate can match raises instead of i_day -1
+    """
+    param.mitigation_date = param.current_date + timedelta(days=10)
+    param.current_hospitalized = 10 ** 200
+    with pytest.raises(ValueError, match=str(10 ** 200)):
+        Sir(param)
+
+
+def test_model_fit_projection(model, param):
+    """
+    The truncated fit projection agrees with the full one where they overlap
+    """
+    model.i_day = 20
+    policy = model.gen_policy(param)
+    raw = model.run_projection(param, policy)
+    fit = model.run_fit_projection(param, policy, model.i_day)
+
+    assert fit["census_hospitalized"].shape == (1, 21)
+    assert "census_icu" not in fit
+    assert fit["census_hospitalized"][0, 20] == raw["census_hospitalized"][20]
+
+
+def test_model_first_hosp_fixture(first_hosp_param):
+    my_model = Sir(first_hosp_param)
+
+    assert my_model.doubling_time == 5.312786339025406
+    assert first_hosp_param.doubling_time is None
+    assert my_model.i_day == 21
+    assert my_model.fit.n_evaluations == 75
+
+    # The default optimizer is the baseline grid
+    grid_model = Sir(first_hosp_param, optimizer=GridSearch())
+    assert grid_model.fit == my_model.fit
+    assert (grid_model.census_df.values == my_model.census_df.values).all()
+
+
+def test_model_first_hosp_brent(first_hosp_param):
+    my_model = Sir(first_hosp_param, optimizer=Brent())
+
+    assert abs(my_model.doubling_time - 5.312786339025406) < 1.e-3
+    assert my_model.fit.n_evaluations < 75
+
+
+def test_project_first_hosp(first_hosp_param):
+    frozen = first_hosp_param.freeze()
+    projection = project(frozen)
+
+    assert frozen.doubling_time is None
+    assert projection.summary["doubling_time"] == 5.312786339025406
+    assert projection.summary["i_day"] == 21
+    assert frozen == first_hosp_param.freeze()
+
+
+def test_project_matches_model(model, param):
+    projection = project(param.freeze())
+
+    assert np.array_equal(projection.values, model.projection.values, equal_nan=True)
+    assert projection.summary["r_t"] == model.r_t
+    assert projection.summary["doubling_time"] == param.doubling_time
+
+
 def test_model_raw_start(model, param):
     raw_df = model.raw_df
 
@@ -151,6 +307,19 @@ def test_model_raw_start(model, param):
     assert [round(v, 0) for v in (d, hosp, icu, vent)] == [17, 549.0, 220.0, 110.0]
 
 
+def test_model_lazy_frames(model):
+    assert "census_df" not in vars(model)
+    census_df = model.census_df
+    assert "census_df" in vars(model)
+    assert model.census_df is census_df
+    assert "raw_df" not in vars(model)
+
+    assert list(census_df.columns) == [
+        "day", "date", "census_hospitalized", "census_icu", "census_ventilated",
+    ]
+    assert (model.census_floor_df.census_icu == np.floor(census_df.census_icu)).all()
+
+
 def test_model_conservation(param, model):
     raw_df = model.raw_df
 
@@ -198,3 +367,127 @@ def test_model_cumulative_census(param, model):
         param.market_share * param.hospitalized.rate * (raw_df.infected[1:-1] + raw_df.recovered[1:-1]) - 1.0
     )
     assert (diff.abs() < 0.1).all()
+
+
+def test_model_other_dispositions(param, model):
+    frozen = param.freeze()
+    other = Sir(frozen.replace(other_dispositions={
+        "dialysis": Disposition.create(days=4, rate=0.001),
+        "ed": Disposition.create(days=1, rate=0.1),
+    }))
+
+    # The others are projected like any disposition, leaving the rest as they were
+    assert list(other.census_df.columns) == [
+        "day", "date", *(f"census_{key}" for key in ("hospitalized", "icu", "ventilated", "dialysis", "ed"))
+    ]
+    pd.testing.assert_frame_equal(other.census_df[model.census_df.columns], model.census_df)
+    icu = Sir(frozen.replace(icu=Disposition.create(days=1, rate=0.1)))
+    assert np.array_equal(other.raw["census_ed"], icu.raw["census_icu"])
+
+
+@pytest.mark.parametrize("fft_cost", [0.0, np.inf])
+def test_census_length_of_stay(monkeypatch, fft_cost):
+    """Stays convolve admits the same by FFT as directly; stays of one length match days."""
+    monkeypatch.setattr(penn_chime.model.sir, "FFT_COST", fft_cost)
+    admits = np.random.default_rng(0).uniform(0.0, 10.0, (3, 200))
+    admits[:, 0] = np.nan
+    raw = {"day": np.arange(200), "admits_fixed": admits, "admits_stay": admits}
+
+    calculate_census(raw, {"fixed": 6, "stay": Histogram([0] * 5 + [1])})
+    assert np.allclose(raw["census_stay"], raw["census_fixed"], rtol=1e-12, atol=1e-9)
+
+    stay = Gamma(9, 6)
+    calculate_census(raw, {"fixed": 6, "stay": stay})
+    # Still staying after k days, convolved with each day's admits
+    staying = 1.0 - np.cumsum(get_pmf(stay)) + get_pmf(stay)
+    for row, census in zip(np.nan_to_num(admits), raw["census_stay"]):
+        assert np.allclose(census, np.convolve(row, staying)[:200], rtol=1e-9, atol=1e-9)
+
+
+def test_model_length_of_stay(param, model):
+    stays = Sir(param.freeze().replace(lengths_of_stay={"icu": LogNormal(9, 5)}))
+
+    assert stays.i_day == model.i_day
+    assert np.array_equal(stays.raw["admits_icu"], model.raw["admits_icu"], equal_nan=True)
+    assert np.array_equal(stays.raw["census_hospitalized"], model.raw["census_hospitalized"])
+    assert not np.allclose(stays.raw["census_icu"], model.raw["census_icu"])
+    # Patients stay about as long, on average
+    assert stays.raw["census_icu"].sum() == pytest.approx(model.raw["census_icu"].sum(), rel=0.05)
+
+
+@pytest.mark.parametrize("mitigation_days", [0, -20, 150])
+@pytest.mark.parametrize("date_first_hospitalized", [False, True])
+def test_resize(param, mitigation_days, date_first_hospitalized):
+    """Projections of other horizons, sliced or extended, are projections of their own."""
+    p = param.freeze().replace(
+        mitigation_date=param.current_date + timedelta(days=mitigation_days),
+        lengths_of_stay={"icu": Gamma(9, 4)},
+    )
+    if date_first_hospitalized:
+        p = p.replace(date_first_hospitalized=param.current_date - timedelta(days=20), doubling_time=None)
+    projection = project(p)
+    i_day = int(projection.summary["i_day"])
+
+    for n_days in (i_day + 2, param.n_days - 1, 100, 300):
+        expected = project(p.replace(n_days=n_days))
+        resized = resize(projection, p.replace(n_days=n_days))
+        assert resized.summary == expected.summary
+        assert np.array_equal(resized.day, expected.day)
+        assert np.array_equal(resized.date, expected.date)
+        assert np.allclose(resized.values, expected.values, rtol=1e-12, atol=1e-9, equal_nan=True)
+        assert np.array_equal(resized.group("sir"), expected.group("sir"))
+    assert resize(projection, p.replace(n_days=param.n_days)) is projection
+    assert np.shares_memory(resize(projection, p.replace(n_days=param.n_days - 1)).values, projection.values)
+
+
+def test_resize_boundary(param):
+    """A fit on the last candidate i_day only holds for its own horizon."""
+    p = param.freeze().replace(n_days=5)
+    projection = project(p)
+
+    assert projection.summary["i_day"] == 4
+    assert resize(projection, p.replace(n_days=10)) is None
+    assert resize(projection, p.replace(n_days=4)) is None
+
+
+def test_stages():
+    assert get_stage("doubling_time") == "sir"
+    assert get_stage("hospitalized.rate") == "sir"
+    assert get_stage("hospitalized.length_of_stay") == "sir"
+    assert get_stage("icu.rate") == "dispositions"
+    assert get_stage("dialysis.days") == "census"
+    assert get_stage("max_y_axis") is None
+    with pytest.raises(KeyError):
+        get_stage("unknown")
+
+
+@pytest.mark.parametrize("changes,stage", [
+    ({"icu": Disposition.create(days=4, rate=0.01)}, "dispositions"),
+    ({"ventilated": Disposition.create(days=10, rate=0.03)}, "dispositions"),
+    ({"icu": Disposition.create(days=4, rate=0.02)}, "census"),
+    ({"lengths_of_stay": {"ventilated": Gamma(10, 4)}}, "census"),
+    ({"other_dispositions": {"ed": Disposition.create(days=1, rate=0.1)}}, "dispositions"),
+])
+def test_restage(param, monkeypatch, changes, stage):
+    """Only the stages after a change run, for the same values as a new projection."""
+    p = param.freeze()
+    projection = project(p)
+    q = p.replace(**changes)
+    expected = project(q)
+
+    names = [each.name for each in penn_chime.model.sir.STAGES]
+    runs = []
+    monkeypatch.setattr(penn_chime.model.sir, "STAGES", tuple(
+        each._replace(run=lambda raw, p, run=each.run, name=each.name: runs.append(name) or run(raw, p))
+        if each.run is not None else each
+        for each in penn_chime.model.sir.STAGES
+    ))
+    restaged = restage(projection, q)
+
+    assert runs == names[names.index(stage):]
+    assert restaged.digests == expected.digests
+    assert restaged.summary == expected.summary
+    assert np.array_equal(restaged.values, expected.values, equal_nan=True)
+    assert restage(projection, p.replace(max_y_axis=100)) is projection
+    with pytest.raises(ValueError):
+        restage(projection, p.replace(market_share=0.5))
@@ -0,0 +1,70 @@
+"""Allocations of fit projections with and without a workspace."""
+
+import tracemalloc
+
+import numpy as np
+
+from penn_chime.model.sir import (
+    calculate_admits,
+    calculate_census,
+    calculate_dispositions,
+    sim_sir_batch,
+)
+from penn_chime.model.workspace import Workspace
+
+N_CANDIDATES = 50
+RATES = {"hospitalized": 0.05}
+DAYS = {"hospitalized": 7}
+
+
+def fit_loop(workspace=None):
+    """Project one batch per candidate, the way an optimizer would."""
+    for beta in np.linspace(3.0e-07, 5.0e-07, N_CANDIDATES):
+        raw = sim_sir_batch(
+            499600.0, 400.0, 0.0, 1.0 / 14, 0, [(np.full(15, beta), 90)], workspace
+        )
+        calculate_dispositions(raw, RATES, 0.05, workspace)
+        calculate_admits(raw, RATES, workspace)
+        calculate_census(raw, DAYS, workspace)
+    return raw
+
+
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def test_workspace_matches_allocating():
+    expected = fit_loop()
+    actual = fit_loop(Workspace())
+    for key in ("infected", "admits_hospitalized", "census_hospitalized"):
+        assert np.array_equal(expected[key], actual[key], equal_nan=True)
+
+
+def test_workspace_allocations():
+    workspace = Workspace()
+    fit_loop(workspace)
+    n_allocations = workspace.n_allocations
+
+    fit_loop(workspace)
+    assert workspace.n_allocations == n_allocations
+
+
+def test_workspace_memory():
+    workspace = Workspace()
+    fit_loop(workspace)  # Warm the buffers up
+    n_allocations = workspace.n_allocations
+    nbytes = workspace.nbytes
+
+    allocating_peak = peak_memory(fit_loop)
+    workspace_peak = peak_memory(fit_loop, workspace)
+
+    # Reused: no buffer grew, and the loop's peak is below allocating anew
+    assert workspace.n_allocations == n_allocations
+    assert workspace.nbytes == nbytes
+    assert workspace_peak < allocating_peak
@@ -0,0 +1,102 @@
+"""Test batch projections."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import penn_chime.cli
+from penn_chime.batch import batch, parse_row, read_base
+from penn_chime.model.parameters import Parameters
+from penn_chime.model.sir import Sir
+
+
+ROWS = [
+    {"id": "north", "population": "1000000", "market-share": "0.1"},
+    {"id": "south", "population": "2000000", "doubling_time": "3.5"},
+    {"id": "east", "population": "-1"},
+    {"id": "north", "population": "3000000"},
+    {"id": "", "current_hospitalized": "12", "unknown": "1"},
+    {"id": "", "current_hospitalized": "12"},
+]
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def test_parse_row():
+    base = read_base("defaults/cli.cfg")
+    p = parse_row({"id": "a", "population": "1000", "icu-days": "4", "n_days": ""}, base)
+    expected = Parameters.create({}, ["--parameters", "defaults/cli.cfg"])
+
+    assert p.population == 1000
+    assert p.icu.days == 4
+    assert p.icu.rate == expected.icu.rate
+    assert p.n_days == expected.n_days
+    with pytest.raises(ValueError):
+        parse_row({"population": "0"}, base)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_batch(tmp_path, fmt):
+    path = tmp_path / f"rows.{fmt}"
+    if fmt == "csv":
+        write_csv(path, ROWS)
+    else:
+        path.write_text("\n".join(json.dumps(row) for row in ROWS))
+    output = tmp_path / "output"
+
+    errors = batch(str(path), str(output), read_base("defaults/cli.cfg"), chunk_size=2)
+
+    assert errors.row.tolist() == [2, 3, 4]
+    assert errors.id.tolist() == ["east", "north", "4"]
+    assert sorted(p.name for p in output.iterdir()) == ["errors.csv", "id=5", "id=north", "id=south"]
+
+    census = pd.read_csv(output / "id=south" / "projected_census.csv")
+    expected = Sir(parse_row(ROWS[1], read_base("defaults/cli.cfg")))
+    assert np.allclose(census.census_hospitalized[1:], expected.census_df.census_hospitalized[1:])
+    assert pd.read_csv(output / "errors.csv").shape[0] == 3
+
+
+def test_batch_cli_jobs(tmp_path):
+    path = tmp_path / "rows.csv"
+    write_csv(path, [{"id": str(k), "population": str(1000000 + k)} for k in range(5)])
+    output = tmp_path / "output"
+    penn_chime.cli.run([
+        "penn_chime", "batch", str(path),
+        "--parameters", "defaults/cli.cfg",
+        "--output", str(output),
+        "--jobs", "2",
+        "--chunk-size", "2",
+    ])
+
+    assert sorted(p.name for p in output.iterdir()) == ["errors.csv"] + [f"id={k}" for k in range(5)]
+    assert pd.read_csv(output / "errors.csv").empty
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_batch_network(tmp_path, jobs):
+    path = tmp_path / "hospitals.csv"
+    write_csv(path, [
+        {"id": "a", "market_share": "0.05", "icu_rate": ""},
+        {"id": "b", "market_share": "0.1", "icu_rate": "0.01"},
+        {"id": "c", "market_share": "0.1", "population": "10"},
+        {"id": "d", "market_share": "2", "icu_rate": ""},
+    ])
+    output = tmp_path / "output"
+    penn_chime.cli.run([
+        "penn_chime", "batch", str(path),
+        "--parameters", "defaults/cli.cfg",
+        "--output", str(output),
+        "--network",
+        "--jobs", jobs,
+        "--chunk-size", "1",
+    ])
+
+    errors = pd.read_csv(output / "errors.csv")
+    assert errors.id.tolist() == ["c", "d"]
+    a = pd.read_csv(output / "id=a" / "projected_census.csv")
+    b = pd.read_csv(output / "id=b" / "projected_census.csv")
+    assert np.allclose(2 * a.census_hospitalized, b.census_hospitalized)
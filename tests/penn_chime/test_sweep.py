@@ -0,0 +1,96 @@
+"""Test parameter sweeps."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import penn_chime.cli
+from penn_chime.model.sir import project
+from penn_chime.sweep import override, parse_values, project_each, sweep
+
+
+def test_parse_values():
+    assert parse_values("doubling_time", "3:4:0.25") == [3.0, 3.25, 3.5, 3.75, 4.0]
+    assert parse_values("relative_contact_rate", "0.1:0.3:0.1") == [0.1, 0.2, 0.3]
+    assert parse_values("hospitalized_days", "5,7, 9") == [5, 7, 9]
+    assert parse_values("mitigation_date", "2020-03-01:2020-03-05:2") == [
+        date(2020, 3, 1), date(2020, 3, 3), date(2020, 3, 5),
+    ]
+    with pytest.raises(ValueError):
+        parse_values("market_share", "0.5:1.5:0.5")
+    with pytest.raises(ValueError):
+        parse_values("doubling_time", "3:4:0")
+    with pytest.raises(ValueError):
+        parse_values("parameters", "a.cfg")
+
+
+def test_sweep_matches_model(param):
+    p = param.freeze()
+    sweeps = {
+        "doubling_time": [3.0, 4.0],
+        "relative_contact_rate": [0.1, 0.5],
+        "icu_days": [5, 9],
+    }
+    capacity = {"hospitalized": 100.0}
+    (summary, trajectory), = sweep(p, sweeps, capacity, trajectories=True)
+
+    assert summary.shape[0] == 8
+    assert (summary.error == "").all()
+    for row in summary.itertuples():
+        q = override(p, {name: getattr(row, name) for name in sweeps})
+        projection = project(q)
+        i_day = int(projection.summary["i_day"])
+        census = projection.column("census_hospitalized")[i_day:]
+        assert row.peak_census_hospitalized == census.max()
+        assert row.peak_date_hospitalized == (q.current_date + timedelta(days=int(census.argmax()))).date()
+        over = np.flatnonzero(census > 100.0)
+        assert row.over_capacity_date_hospitalized == (q.current_date + timedelta(days=int(over[0]))).date()
+        assert pd.isnull(row.over_capacity_date_icu)
+
+        rows = trajectory[trajectory.combination == row.combination]
+        assert np.allclose(rows.census_icu.values, projection.column("census_icu")[i_day:], rtol=1e-12)
+
+    # Projected one at a time, combinations give the same series
+    combinations = [{name: getattr(row, name) for name in sweeps} for row in summary.itertuples()]
+    series, _, _ = project_each(p, combinations)
+    (vectorized, _), = sweep(p, sweeps, capacity)
+    assert np.allclose(series["census_hospitalized"].max(axis=1), vectorized.peak_census_hospitalized, rtol=1e-12)
+
+
+def test_sweep_errors(param):
+    p = param.freeze()
+    (summary, _), = sweep(p, {"n_days": [30, 60], "population": [1000, 0]})
+
+    assert list(summary.error == "") == [True, False, True, False]
+    assert summary.peak_census_hospitalized.isnull().tolist() == [False, True, False, True]
+
+
+def test_sweep_chunks(param):
+    p = param.freeze()
+    sweeps = {"doubling_time": [3.0, 3.5, 4.0], "market_share": [0.1, 0.2]}
+    whole = pd.concat(summary for summary, _ in sweep(p, sweeps))
+    chunked = pd.concat(summary for summary, _ in sweep(p, sweeps, chunk_size=4, n_jobs=2))
+
+    assert chunked.combination.tolist() == list(range(6))
+    pd.testing.assert_frame_equal(whole.reset_index(drop=True), chunked.reset_index(drop=True))
+
+
+def test_sweep_cli(tmp_path):
+    output = tmp_path / "sweep.csv"
+    trajectories = tmp_path / "trajectories.csv"
+    penn_chime.cli.run([
+        "penn_chime", "sweep",
+        "--parameters", "defaults/cli.cfg",
+        "--sweep", "doubling-time=4:5:0.5",
+        "--sweep", "relative-contact-rate=0.1,0.3",
+        "--capacity", "hospitalized=100",
+        "--output", str(output),
+        "--trajectories", str(trajectories),
+    ])
+
+    summary = pd.read_csv(output)
+    assert summary.shape[0] == 6
+    assert list(summary.columns[:4]) == ["combination", "doubling_time", "relative_contact_rate", "error"]
+    assert pd.read_csv(trajectories).shape[0] == 6 * 101
@@ -1,6 +1,8 @@
 import altair as alt
 import pytest
 
+from penn_chime.model.parameters import Disposition
+from penn_chime.model.sir import Sir
 from penn_chime.view.charts import (
     build_admits_chart,
     build_census_chart,
@@ -28,3 +30,11 @@ def test_census_chart(census_floor_df):
     # test fx call with no params
     with pytest.raises(TypeError):
         build_census_chart()
+
+
+def test_census_chart_dispositions(param):
+    param = param.freeze().replace(other_dispositions={"dialysis": Disposition.create(days=4, rate=0.001)})
+    chart = build_census_chart(alt=alt, census_floor_df=Sir(param).census_floor_df)
+    fold = chart.layer[0].transform[0].fold
+
+    assert list(fold) == [f"census_{key}" for key in (*DISPOSITION_KEYS, "dialysis")]